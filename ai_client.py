@@ -0,0 +1,329 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# HTTP statuses (google.api_core exceptions carry them as `.code`) that mean "overloaded, try later".
+OVERLOAD_CODES = {429, 500, 502, 503, 504}
+
+
+class AIUnavailable(Exception):
+    """Raised instead of calling Gemini when it is rate limited, saturated or failing; retry_after is in seconds."""
+
+    def __init__(self, message, retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def overloaded(error):
+    code = getattr(error, 'code', None)
+    return isinstance(error, (TimeoutError, ConnectionError)) or (isinstance(code, int) and code in OVERLOAD_CODES)
+
+
+class TokenBucket:
+    """`rate` requests per second on average, bursts of up to `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, timeout):
+        """Takes a token and returns how long to wait before using it, or None (taking nothing) if that exceeds timeout."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > timeout:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive overload failures and fails calls fast for `reset_after`
+    seconds; then one trial call is let through, which closes it again or re-opens it."""
+
+    def __init__(self, threshold=5, reset_after=30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'half-open' if time.monotonic() - self._opened_at >= self.reset_after else 'open'
+
+    def check(self):
+        """Raises AIUnavailable while open; claims nothing, so it is safe to call before queueing."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.reset_after - time.monotonic()
+            if remaining <= 0 and not self._trial:
+                return
+        raise AIUnavailable('AI service is temporarily unavailable', max(1.0, remaining))
+
+    def before(self):
+        """Admits a call that is about to be sent; returns True if it is the half-open trial, which
+        must then end in success(), failure() or abandon()."""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            remaining = self._opened_at + self.reset_after - time.monotonic()
+            if remaining <= 0 and not self._trial:
+                self._trial = True
+                return True
+        raise AIUnavailable('AI service is temporarily unavailable', max(1.0, remaining))
+
+    def abandon(self):
+        """Gives the trial back when it ended without an answer from the service."""
+        with self._lock:
+            self._trial = False
+
+    def success(self):
+        with self._lock:
+            self._failures, self._opened_at, self._trial = 0, None, False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Concurrent do() calls with the same key share one execution of fn and its result (or exception)."""
+
+    def __init__(self):
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+class AIClient:
+    """The one way this app calls Gemini.
+
+    Every request, including each retry, takes a token from a TokenBucket and holds one of
+    `max_concurrent` slots; a caller that would wait longer than `queue_timeout` for either
+    gets AIUnavailable instead of piling up. Overload errors (429/5xx, timeouts) are retried
+    with jittered exponential backoff and feed a CircuitBreaker that fails fast while Gemini
+    is down. generate() coalesces identical in-flight prompts. Models are built once per
+    name and settings; genai is imported and configured on first use.
+    """
+
+    def __init__(self, api_key=None, rate=2.0, burst=10, max_concurrent=8, queue_timeout=10.0,
+                 retries=3, backoff=0.5, max_backoff=8.0, breaker=None):
+        self.api_key = api_key
+        self.bucket = TokenBucket(rate, burst)
+        self.queue_timeout = queue_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.flights = SingleFlight()
+        self.retried = 0
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._genai = None
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def configure(self, api_key):
+        with self._lock:
+            if api_key and api_key != self.api_key:
+                self.api_key = api_key
+                if self._genai is not None:
+                    self._genai.configure(api_key=api_key)
+
+    @property
+    def genai(self):
+        with self._lock:
+            if self._genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._genai = genai
+            return self._genai
+
+    def model(self, name, **settings):
+        key = (name, json.dumps(settings, sort_keys=True, default=str))
+        model = self._models.get(key)
+        if model is None:
+            model = self._models.setdefault(key, self.genai.GenerativeModel(model_name=name, **settings))
+        return model
+
+    def _reserve(self):
+        wait = self.bucket.reserve(self.queue_timeout)
+        if wait is None:
+            self.rejected += 1
+            raise AIUnavailable('AI is busy, try again shortly', 1 / self.bucket.rate)
+        return wait
+
+    def _busy(self):
+        self.rejected += 1
+        return AIUnavailable('AI is busy, try again shortly', self.queue_timeout)
+
+    def _admit(self):
+        """Takes the slot (already held) past the breaker; releases it if the breaker says no."""
+        try:
+            return self.breaker.before()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _acquire(self):
+        """Waits for a rate token and a concurrency slot, then asks the breaker. The half-open trial
+        is only claimed once the call can actually be sent, so a caller turned away by the limits
+        never holds it. Returns (holding the slot) whether this call is the trial."""
+        self.breaker.check()
+        time.sleep(self._reserve())
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise self._busy()
+        return self._admit()
+
+    async def _acquire_async(self):
+        self.breaker.check()
+        await asyncio.sleep(self._reserve())
+        if not await asyncio.to_thread(self._slots.acquire, timeout=self.queue_timeout):
+            raise self._busy()
+        return self._admit()
+
+    def _release(self, trial):
+        self._slots.release()
+        if trial:
+            self.breaker.abandon()  # no-op after success()/failure()
+
+    def _failed(self, error, attempt):
+        """Re-raises errors that aren't overload (or are past the last retry); otherwise returns the backoff delay."""
+        if not overloaded(error):
+            self.breaker.success()  # Gemini answered; the request itself was bad
+            raise error
+        self.breaker.failure()
+        if attempt >= self.retries:
+            raise AIUnavailable('AI service is overloaded', self.max_backoff) from error
+        self.retried += 1
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def call(self, fn, key=None):
+        """Runs fn() under the limits, retrying overload errors; calls sharing a `key` are coalesced."""
+        if key is not None:
+            return self.flights.do(key, lambda: self.call(fn))
+        for attempt in range(self.retries + 1):
+            trial = self._acquire()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._failed(e, attempt)
+            else:
+                self.breaker.success()
+                return result
+            finally:
+                self._release(trial)
+            time.sleep(delay)
+
+    async def call_async(self, fn):
+        """call() for a coroutine function, e.g. lambda: chat.send_message_async(prompt)."""
+        for attempt in range(self.retries + 1):
+            trial = await self._acquire_async()
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._failed(e, attempt)
+            else:
+                self.breaker.success()
+                return result
+            finally:
+                self._release(trial)
+            await asyncio.sleep(delay)
+
+    def stream(self, open_stream):
+        """Yields the chunks of open_stream() (e.g. generate_content(..., stream=True)), holding a slot
+        until the stream ends. Opening is retried like call() until the first chunk arrives."""
+        for attempt in range(self.retries + 1):
+            trial = self._acquire()
+            try:
+                chunks = iter(open_stream())
+                first = next(chunks, None)
+            except Exception as e:
+                try:
+                    delay = self._failed(e, attempt)
+                finally:
+                    self._release(trial)
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self._release(trial)
+                raise
+            self.breaker.success()
+            try:
+                if first is not None:
+                    yield first
+                yield from chunks
+            finally:
+                self._slots.release()
+            return
+
+    def generate(self, prompt, model, **settings):
+        """Reply text for a single prompt; identical concurrent prompts share one request."""
+        key = hashlib.sha256(json.dumps([model, settings, prompt], sort_keys=True, default=str).encode()).hexdigest()
+        return self.call(lambda: self.model(model, **settings).generate_content(prompt).text, key=key)
+
+    def stats(self):
+        return {"breaker": self.breaker.state, "retried": self.retried, "rejected": self.rejected, "coalesced": self.flights.coalesced}
+
+
+gemini = AIClient(
+    api_key=os.environ.get('GEMINI_API_KEY') or os.environ.get('GOOGLE_API_KEY'),
+    rate=float(os.environ.get('GEMINI_RATE_PER_SEC', 2)),
+    burst=int(os.environ.get('GEMINI_BURST', 10)),
+    max_concurrent=int(os.environ.get('GEMINI_MAX_CONCURRENT', 8)),
+    queue_timeout=float(os.environ.get('GEMINI_QUEUE_TIMEOUT', 10)),
+    retries=int(os.environ.get('GEMINI_RETRIES', 3)),
+    breaker=CircuitBreaker(int(os.environ.get('GEMINI_BREAKER_FAILURES', 5)), float(os.environ.get('GEMINI_BREAKER_RESET', 30))),
+)
@@ -1,19 +1,27 @@
 import os
 import datetime
-import json
 import random
 import string
+import time
+import tempfile
+import click
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, render_template, request, redirect, url_for, session, jsonify
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
-import google.generativeai as genai
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 from dotenv import load_dotenv
 
 
 from flask_login import LoginManager, login_user, logout_user, current_user, login_required
-from models import User
+from models import User, user_cache
+from config import Config
+from leaderboard import leaderboard
+from lifey_context import ContextBuilder
+from fit_sync import FitClientFactory, FitSyncEngine, FitSyncScheduler, StubFitClient
+from dashboard_loader import dashboard_loader
+from streaming import stream_reply, ttft_stats
+from xp_scorer import XPScoringQueue, ScoreCache, PROVISIONAL_XP, parse_scores
+from unique_keys import UniqueKeys
+from lazy import Lazy, lazy_import
+from ai_client import AIUnavailable, gemini
 
 load_dotenv()
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
@@ -22,14 +30,41 @@ app = Flask(__name__)
 app.secret_key = "LifeOS_Secret_Key_Change_Me"
 
 
-cred = credentials.Certificate("firebase-credentials.json")
-firebase_admin.initialize_app(cred)
-db = firestore.client()
-
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
 CLIENT_ID = os.getenv("CLIENT_ID", "")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET", "")
-genai.configure(api_key=GOOGLE_API_KEY)
+
+# SDK imports and clients are created on first use so cold starts (and pages that
+# never touch Firestore, Gemini or Fit) don't pay for them.
+gemini.configure(GOOGLE_API_KEY)
+LIFEY_MODEL = 'gemini-flash-latest'
+
+def init_firebase():
+    import firebase_admin
+    from firebase_admin import credentials
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate("firebase-credentials.json"))
+    return firebase_admin.get_app()
+
+def init_firestore():
+    firebase_app.resolve()
+    return firestore.client()
+
+def init_auth():
+    firebase_app.resolve()
+    from firebase_admin import auth
+    return auth
+
+firebase_app = Lazy(init_firebase)
+firestore = lazy_import('firebase_admin.firestore')
+db = Lazy(init_firestore)
+auth = Lazy(init_auth)
+unique_keys = UniqueKeys(db)
+
+SQUAD_FIELDS = ['name', 'level', 'total_xp', 'steps']
+SQUAD_SIZE = 100
+FRIEND_BATCH_SIZE = 100
+friend_pool = ThreadPoolExecutor(max_workers=4)
 
 SCOPES = ['https://www.googleapis.com/auth/fitness.activity.read', 'https://www.googleapis.com/auth/userinfo.profile']
 
@@ -47,8 +82,70 @@ def generate_friend_id():
     random_string = ''.join(random.choices(chars, k=5))
     return f"FIT-{random_string}"
 
+def user_tasks_query(uid, status=None):
+    query = db.collection('tasks').where('user_id', '==', uid)
+    if status:
+        query = query.where('status', '==', status)
+    return query
+
+def get_user_tasks(uid, limit=Config.ITEMS_PER_PAGE, start_after=None):
+    """Returns one page of the user's tasks (newest first) and the cursor for the next page."""
+    query = user_tasks_query(uid).order_by('created_at', direction=firestore.Query.DESCENDING).limit(limit)
+    if start_after:
+        cursor_doc = db.collection('tasks').document(start_after).get()
+        if cursor_doc.exists:
+            query = query.start_after(cursor_doc)
+    tasks = [{"id": doc.id, **doc.to_dict()} for doc in query.stream()]
+    next_cursor = tasks[-1]['id'] if len(tasks) == limit else None
+    return tasks, next_cursor
+
+def count_user_tasks(uid, status=None):
+    return user_tasks_query(uid, status).count().get()[0][0].value
+
+def fetch_users(uids, field_paths=SQUAD_FIELDS):
+    """Batch-reads user docs with get_all, projected to field_paths, in concurrent chunks."""
+    users_ref = db.collection('users')
+    chunks = [uids[i:i + FRIEND_BATCH_SIZE] for i in range(0, len(uids), FRIEND_BATCH_SIZE)]
+
+    def fetch_chunk(chunk):
+        return [{**doc.to_dict(), "id": doc.id} for doc in db.get_all([users_ref.document(uid) for uid in chunk], field_paths=field_paths) if doc.exists]
+
+    if len(chunks) <= 1:
+        return fetch_chunk(chunks[0]) if chunks else []
+    return [user for chunk in friend_pool.map(fetch_chunk, chunks) for user in chunk]
+
 def update_user(doc_id, data):
     db.collection('users').document(doc_id).update(data)
+    user_changed(doc_id, data)
+
+def user_changed(doc_id, data):
+    """Drops the cached profile and updates squads after `data` was written to the user doc."""
+    user_cache.invalidate(doc_id)
+    leaderboard.update_member(doc_id, {k: v for k, v in data.items() if isinstance(v, (int, float, str))})
+
+def credit_xp(transaction, user_ref, xp):
+    """Adds xp to the user's committed total inside `transaction` (after its reads); returns the new fields."""
+    total = ((user_ref.get(['total_xp'], transaction=transaction).to_dict() or {}).get('total_xp') or 0) + xp
+    return {"total_xp": total, "level": 1 + (total // 500)}
+
+def finish_task(task_ref, uid):
+    """Marks the user's pending task Done and credits its XP in one transaction, so neither a
+    second completion nor XP credited meanwhile by another request or worker is lost.
+    Returns (task before the change, new user fields), or (task, None) if nothing changed."""
+    user_ref = db.collection('users').document(uid)
+
+    @firestore.transactional
+    def run(transaction):
+        task = task_ref.get(transaction=transaction).to_dict()
+        if not task or task.get('user_id') != uid or task.get('status') != "Pending":
+            return task, None
+        xp = task.get('xp', 10)
+        fields = credit_xp(transaction, user_ref, xp)
+        transaction.update(task_ref, {"status": "Done", "xp_credited": xp})
+        transaction.update(user_ref, fields)
+        return task, fields
+
+    return run(db.transaction())
 
 
 @app.route('/login')
@@ -73,21 +170,18 @@ def api_login():
 
         if not user_doc.exists:
             
-            friend_id = generate_friend_id()
-            user_ref.set({
+            unique_keys.create_user(user_ref, {
                 "name": name,
                 "email": email,
-                "friend_id": friend_id,
                 "friends": [], 
                 "level": 1,
                 "total_xp": 0,
                 "is_connected": False,
                 "steps": 0,
                 "calories": 0,
-                "step_history": "[]",
-                "calorie_history": "[]",
                 "health_conditions": ""
-            })
+            }, friend_code=generate_friend_id)
+            user_cache.invalidate(uid)
 
         
         user = User(uid, db)
@@ -111,15 +205,45 @@ def get_google_auth_flow():
     client_config = {
         "web": {"client_id": CLIENT_ID, "client_secret": CLIENT_SECRET, "auth_uri": "https://accounts.google.com/o/oauth2/auth", "token_uri": "https://oauth2.googleapis.com/token", "redirect_uris": ["http://127.0.0.1:5000/callback"]}
     }
+    from google_auth_oauthlib.flow import Flow
     return Flow.from_client_config(client_config=client_config, scopes=SCOPES)
 
-def decide_points_with_ai(task_description):
-    try:
-        model = genai.GenerativeModel('gemini-flash-latest')
-        prompt = f"Task: {task_description}\nRules: Difficulty 1-100. Assign XP strictly from: 5, 10, 20, 50, 100. Reply ONLY with the raw number. No text."
-        return int(model.generate_content(prompt).text.strip())
-    except Exception:
-        return 10
+XP_PROMPT_VERSION = 2
+xp_cache = ScoreCache(os.getenv("XP_CACHE_PATH", os.path.join(tempfile.gettempdir(), "lifeos_xp_cache.sqlite3")), XP_PROMPT_VERSION)
+
+def decide_points_with_ai(task_descriptions):
+    task_lines = "\n".join(f"{i + 1}. {t}" for i, t in enumerate(task_descriptions))
+    prompt = f"Tasks:\n{task_lines}\nRules: Difficulty 1-100. Assign XP strictly from: 5, 10, 20, 50, 100. Reply ONLY with one raw number per line, in task order. No text."
+    return parse_scores(gemini.generate(prompt, LIFEY_MODEL), len(task_descriptions))
+
+def save_task_xp(task_id, xp):
+    """Stores a task's scored XP. A task completed while still on provisional XP has its owner's
+    total corrected by the difference in the same transaction."""
+    task_ref = db.collection('tasks').document(task_id)
+
+    @firestore.transactional
+    def run(transaction):
+        task = task_ref.get(transaction=transaction).to_dict()
+        if not task:
+            return None, None
+        update, fields = {"xp": xp, "xp_pending": False}, None
+        if task.get('status') == "Done":
+            delta = xp - task.get('xp_credited', task.get('xp', 10))
+            user_ref = db.collection('users').document(task['user_id'])
+            fields = credit_xp(transaction, user_ref, delta) if delta else None
+            update["xp_credited"] = xp
+            if fields:
+                transaction.update(user_ref, fields)
+        transaction.update(task_ref, update)
+        return task.get('user_id'), fields
+
+    uid, fields = run(db.transaction())
+    dashboard_loader.invalidate(uid)
+    if fields:
+        user_changed(uid, fields)
+
+xp_queue = XPScoringQueue(decide_points_with_ai, save_task_xp, cache=xp_cache)
+lifey_context = ContextBuilder(db, token_budget=int(os.getenv("LIFEY_CONTEXT_TOKENS", 1000)), summary_ttl=int(os.getenv("LIFEY_SUMMARY_TTL", 300)))
 
 @app.route('/login_google')
 @login_required
@@ -133,9 +257,27 @@ def login_google():
 @app.route('/logout_fit')
 @login_required
 def logout_fit():
-    update_user(current_user.id, {"is_connected": False, "steps": 0, "calories": 0, "step_history": "[]", "calorie_history": "[]"})
+    fit_sync.disconnect(current_user.id)
+    update_user(current_user.id, {"is_connected": False, "steps": 0, "calories": 0})
     return redirect(url_for('fitness'))
 
+# One discovery doc, service object and connection pool for every user; StubFitClient(conn) works offline.
+fit_client_factory = StubFitClient if os.getenv("FIT_CLIENT") == "stub" else FitClientFactory(CLIENT_ID, CLIENT_SECRET, os.getenv("FIT_DISCOVERY_PATH"))
+
+def publish_fit_summary(uid, now):
+    """Copies today's totals onto the user doc; history stays in the time-series store."""
+    today = fit_history.daily(uid, now.date(), now.date())[0]
+    update_user(uid, {"is_connected": True, "steps": today['steps'], "calories": today['calories']})
+
+def init_fit_history():
+    from timeseries import DailySeriesStore
+    return DailySeriesStore(db)
+
+fit_history = Lazy(init_fit_history)
+fit_sync = FitSyncEngine(db, fit_history, fit_client_factory, on_synced=publish_fit_summary)
+if os.getenv("FIT_SYNC_INTERVAL"):
+    FitSyncScheduler(fit_sync, int(os.getenv("FIT_SYNC_INTERVAL"))).start()
+
 @app.route('/callback')
 @login_required
 def callback():
@@ -143,28 +285,9 @@ def callback():
     flow.redirect_uri = "http://127.0.0.1:5000/callback"
     try:
         flow.fetch_token(authorization_response=request.url)
-        service = build('fitness', 'v1', credentials=flow.credentials)
-        now = datetime.datetime.now()
-        start_time = now.replace(hour=0, minute=0, second=0, microsecond=0) - datetime.timedelta(days=6)
-        body = {"aggregateBy": [{"dataSourceId": "derived:com.google.step_count.delta:com.google.android.gms:estimated_steps"}, {"dataTypeName": "com.google.calories.expended"}], "bucketByTime": {"durationMillis": 86400000}, "startTimeMillis": int(start_time.timestamp() * 1000), "endTimeMillis": int(now.timestamp() * 1000)}
-        daily_data = {(start_time + datetime.timedelta(days=i)).strftime('%a'): {'steps': 0, 'calories': 0} for i in range(7)}
-        
-        response = service.users().dataset().aggregate(userId="me", body=body).execute()
-        if 'bucket' in response:
-            for bucket in response['bucket']:
-                day_name = datetime.datetime.fromtimestamp(int(bucket['startTimeMillis']) / 1000.0).strftime('%a')
-                for dataset in bucket['dataset']:
-                    for point in dataset['point']:
-                        if point.get('value'):
-                            val = point['value'][0]
-                            if 'intVal' in val and day_name in daily_data: daily_data[day_name]['steps'] += val['intVal']
-                            if 'fpVal' in val and day_name in daily_data: daily_data[day_name]['calories'] += int(val['fpVal'])
-        
-        daily_steps = [{"day": k, "value": v['steps']} for k, v in daily_data.items()]
-        daily_calories = [{"day": k, "value": v['calories']} for k, v in daily_data.items()]
-        
-        if daily_steps:
-            update_user(current_user.id, {"is_connected": True, "steps": daily_steps[-1]["value"], "calories": daily_calories[-1]["value"], "step_history": json.dumps(daily_steps), "calorie_history": json.dumps(daily_calories)})
+        fit_sync.connect(current_user.id, flow.credentials)
+        update_user(current_user.id, {"is_connected": True})
+        fit_sync.sync_async(current_user.id)
     except Exception as e:
         print(f"❌ Login Failed: {e}")
     return redirect(url_for('fitness'))
@@ -175,20 +298,58 @@ def callback():
 def dashboard():
     user_data = current_user.to_dict()
     
-    tasks = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('tasks').stream()]
-    completed = len([t for t in tasks if t.get('status') == "Done"])
-    task_percent = int((completed / max(len(tasks), 1)) * 100)
-    return render_template('dashboard.html', page='dashboard', user=user_data, tasks=tasks, task_percent=task_percent)
+    uid = current_user.id
+    view = dashboard_loader.load(uid, {
+        'tasks': lambda: get_user_tasks(uid)[0],
+        'completed': lambda: count_user_tasks(uid, "Done"),
+        'total': lambda: count_user_tasks(uid),
+    }, defaults={'completed': 0, 'total': 0})
+    task_percent = int((view['completed'] / max(view['total'], 1)) * 100)
+    return render_template('dashboard.html', page='dashboard', user=user_data, tasks=view['tasks'], task_percent=task_percent)
 
 @app.route('/tasks')
 @login_required
 def tasks():
-    return render_template('tasks.html', page='tasks', user=current_user.to_dict(), tasks=[{"id": doc.id, **doc.to_dict()} for doc in db.collection('tasks').stream()])
+    tasks, next_cursor = get_user_tasks(current_user.id, start_after=request.args.get('cursor'))
+    return render_template('tasks.html', page='tasks', user=current_user.to_dict(), tasks=tasks, next_cursor=next_cursor, pending_count=count_user_tasks(current_user.id, "Pending"))
 
 @app.route('/fitness')
 @login_required
 def fitness():
-    return render_template('fitness.html', page='fitness', user=current_user.to_dict())
+    today = datetime.date.today()
+    week = fit_history.daily(current_user.id, today - datetime.timedelta(days=6), today) if current_user.is_connected else []
+    from timeseries import parse_day
+    step_history = [{"day": parse_day(d['date']).strftime('%a'), "value": d['steps']} for d in week]
+    calorie_history = [{"day": parse_day(d['date']).strftime('%a'), "value": d['calories']} for d in week]
+    return render_template('fitness.html', page='fitness', user=current_user.to_dict(), step_history=step_history, calorie_history=calorie_history)
+
+FIT_HISTORY_PERIODS = ('day', 'week', 'month', 'rolling')
+
+@app.route('/api/fitness/history')
+@login_required
+def fitness_history():
+    from timeseries import MAX_RANGE_DAYS, METRICS, parse_day
+    today = datetime.date.today()
+    period, metric = request.args.get('period', 'day'), request.args.get('metric', 'steps')
+    if period not in FIT_HISTORY_PERIODS:
+        return jsonify({"error": f"period must be one of {', '.join(FIT_HISTORY_PERIODS)}"}), 400
+    if metric not in METRICS:
+        return jsonify({"error": f"metric must be one of {', '.join(METRICS)}"}), 400
+    try:
+        window = int(request.args.get('window', 7))
+        start = parse_day(request.args.get('start') or (today - datetime.timedelta(days=29)).isoformat())
+        end = parse_day(request.args.get('end') or today.isoformat())
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD dates and window an integer"}), 400
+    if window < 1:
+        return jsonify({"error": "window must be at least 1"}), 400
+    if start > end or (end - start).days >= MAX_RANGE_DAYS:
+        return jsonify({"error": f"start must not be after end, and the range is limited to {MAX_RANGE_DAYS} days"}), 400
+    if period in ('week', 'month'):
+        return jsonify(fit_history.rollup(current_user.id, start, end, period))
+    if period == 'rolling':
+        return jsonify(fit_history.rolling_mean(current_user.id, start, end, metric, window))
+    return jsonify(fit_history.daily(current_user.id, start, end))
 
 @app.route('/health')
 @login_required
@@ -205,22 +366,12 @@ def chat_page():
 @login_required
 def social():
     user_data = current_user.to_dict()
-    friends_list = user_data.get('friends', [])
-    
-    squad_data = []
-   
-    for friend_uid in friends_list:
-        friend_doc = db.collection('users').document(friend_uid).get()
-        if friend_doc.exists:
-            friend_dict = friend_doc.to_dict()
-            friend_dict['id'] = friend_doc.id
-            squad_data.append(friend_dict)
-            
-    
-    squad_data.append(user_data)
-            
-    squad = sorted(squad_data, key=lambda x: x.get('total_xp', 0), reverse=True)
-    return render_template('social.html', page='social', user=user_data, squad=squad)
+    if not leaderboard.has_squad(current_user.id):
+        leaderboard.build_squad(current_user.id, fetch_users(current_user.friends) + [user_data])
+
+    squad = leaderboard.top(current_user.id, SQUAD_SIZE)
+    my_rank = leaderboard.rank(current_user.id, current_user.id)
+    return render_template('social.html', page='social', user=user_data, squad=squad, my_rank=my_rank)
 
 @app.route('/add_friend', methods=['POST'])
 @login_required
@@ -228,27 +379,25 @@ def add_friend():
     friend_code = request.form.get('friend_code', '').strip().upper()
     
     
-    users_ref = db.collection('users').where('friend_id', '==', friend_code).stream()
-    
-    friend_uid = None
-    for doc in users_ref:
-        friend_uid = doc.id
-        break
-        
+    friend_uid = unique_keys.lookup('friend_code', friend_code)
     
     if friend_uid and friend_uid != current_user.id:
-        db.collection('users').document(current_user.id).update({
+        update_user(current_user.id, {
             "friends": firestore.ArrayUnion([friend_uid])
         })
+        if leaderboard.has_squad(current_user.id):
+            for friend_data in fetch_users([friend_uid]):
+                leaderboard.add_member(current_user.id, friend_data)
         
     return redirect('/social')
 
 @app.route('/remove_friend/<friend_id>')
 @login_required
 def remove_friend(friend_id):
-    db.collection('users').document(current_user.id).update({
+    update_user(current_user.id, {
         "friends": firestore.ArrayRemove([friend_id])
     })
+    leaderboard.remove_member(current_user.id, friend_id)
     return redirect('/social')
 
 
@@ -256,27 +405,42 @@ def remove_friend(friend_id):
 @app.route('/add_task', methods=['POST'])
 @login_required
 def add_task():
-    db.collection('tasks').add({"title": request.form.get('task_name'), "category": request.form.get('category', 'General'), "xp": decide_points_with_ai(request.form.get('task_name')), "status": "Pending", "due_date": request.form.get('due_date'), "due_time": request.form.get('due_time')})
+    title = request.form.get('task_name')
+    cached_xp = xp_cache.get(title)
+    task = {"user_id": current_user.id, "created_at": firestore.SERVER_TIMESTAMP, "title": title, "category": request.form.get('category', 'General'), "xp": cached_xp or PROVISIONAL_XP, "xp_pending": cached_xp is None, "status": "Pending", "due_date": request.form.get('due_date'), "due_time": request.form.get('due_time')}
+    _, task_ref = db.collection('tasks').add(task)
+    lifey_context.record_task_change(current_user.id, after=task)
+    dashboard_loader.invalidate(current_user.id)
+    if cached_xp is None:
+        xp_queue.submit(task_ref.id, title)
     return redirect(request.referrer)
 
 @app.route('/complete/<task_id>')
 @login_required
 def complete_task(task_id):
-    task_ref = db.collection('tasks').document(task_id)
-    task = task_ref.get().to_dict()
-    if task and task.get('status') == "Pending":
-        task_ref.update({"status": "Done"})
-        user_data = current_user.to_dict()
-        new_xp = user_data['total_xp'] + task.get('xp', 10)
-        update_user(current_user.id, {"total_xp": new_xp, "level": 1 + (new_xp // 500)})
+    task, credited = finish_task(db.collection('tasks').document(task_id), current_user.id)
+    if credited:
+        lifey_context.record_task_change(current_user.id, before=task, after={**task, "status": "Done"})
+        dashboard_loader.invalidate(current_user.id)
+        user_changed(current_user.id, credited)
     return redirect(request.referrer)
 
 @app.route('/delete/<task_id>')
 @login_required
 def delete_task(task_id):
-    db.collection('tasks').document(task_id).delete()
+    task_ref = db.collection('tasks').document(task_id)
+    task = task_ref.get().to_dict()
+    if task and task.get('user_id') == current_user.id:
+        task_ref.delete()
+        lifey_context.record_task_change(current_user.id, before=task)
+        dashboard_loader.invalidate(current_user.id)
     return redirect(request.referrer)
 
+@app.route('/api/stats')
+@login_required
+def api_stats():
+    return jsonify({"users": user_cache.stats(), "lifey_ttft": ttft_stats.stats(), "gemini": gemini.stats()})
+
 @app.route('/update_conditions', methods=['POST'])
 @login_required
 def update_conditions():
@@ -304,18 +468,86 @@ def delete_med(med_id):
     db.collection('medications').document(med_id).delete()
     return redirect('/health')
 
+def build_lifey_prompt():
+    return lifey_context.build(current_user.id, current_user.to_dict(), request.json.get('message'))
+
 @app.route('/ask_lifey', methods=['POST'])
 @login_required
 def ask_lifey():
-    user_data = current_user.to_dict()
-    tasks = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('tasks').stream()]
-    task_list = "\n".join([f"- {t.get('title')} ({t.get('status')})" for t in tasks])
-    context = f"You are 'Lifey', a strict AI Coach. Conditions: {user_data.get('health_conditions')}. Tasks: {task_list}. Msg: {request.json.get('message')}"
+    context = build_lifey_prompt()
     try:
-        model = genai.GenerativeModel("gemini-flash-latest")
-        return jsonify({"reply": model.generate_content(context).text})
+        return jsonify({"reply": gemini.generate(context, LIFEY_MODEL)})
+    except AIUnavailable as e:
+        return jsonify({"reply": f"Lots of people are talking to me right now! Try again in {max(1, round(e.retry_after))} seconds. ⏳", "retry_after": e.retry_after})
     except Exception:
         return jsonify({"reply": "My brain is overheating! Try again in 30 seconds. 🧊"})
 
+@app.route('/ask_lifey/stream', methods=['POST'])
+@login_required
+def ask_lifey_stream():
+    started = time.perf_counter()
+    context = build_lifey_prompt()
+    return stream_reply(lambda: gemini.stream(lambda: gemini.model(LIFEY_MODEL).generate_content(context, stream=True)), started)
+
+@app.cli.command('backfill-task-owners')
+@click.argument('owner_uid')
+def backfill_task_owners(owner_uid):
+    """Assigns tasks created before tasks had an owner to OWNER_UID."""
+    batch, pending, updated = db.batch(), 0, 0
+    for doc in db.collection('tasks').stream():
+        data = doc.to_dict()
+        if data.get('user_id'):
+            continue
+        batch.update(doc.reference, {"user_id": owner_uid, "created_at": data.get('created_at') or firestore.SERVER_TIMESTAMP})
+        pending += 1
+        updated += 1
+        if pending == 500:
+            batch.commit()
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+    print(f"✅ Backfilled owner on {updated} tasks")
+
+@app.cli.command('migrate-fit-history')
+def migrate_fit_history():
+    """Drops the old JSON history strings from user docs and re-backfills every Fit connection."""
+    updated = 0
+    for doc in db.collection('users').select(['step_history']).stream():
+        if 'step_history' in (doc.to_dict() or {}):
+            doc.reference.update({"step_history": firestore.DELETE_FIELD, "calorie_history": firestore.DELETE_FIELD})
+            updated += 1
+    for doc in db.collection('fit_connections').select([]).stream():
+        doc.reference.update({"synced_until_ms": None})
+    print(f"✅ Dropped legacy history from {updated} users; run sync-fit to backfill")
+
+@app.cli.command('backfill-unique-keys')
+def backfill_unique_keys():
+    """Creates friend_codes/usernames/emails index docs for users created before they existed."""
+    created, conflicts = unique_keys.backfill()
+    for key, value, uid in conflicts:
+        print(f"⚠️ {key} '{value}' on {uid} is already held by another user")
+    print(f"✅ Created {created} unique-key index docs ({len(conflicts)} conflicts)")
+    if not conflicts:
+        print("   Set UNIQUE_KEYS_LEGACY_LOOKUP=0 to stop querying users on index misses")
+
+@app.cli.command('rescore-pending-xp')
+@click.option('--limit', default=500, show_default=True, help='Most pending tasks to score in this run.')
+def rescore_pending_xp(limit):
+    """Scores tasks still on provisional XP. The background queue needs a long-lived server; on
+    serverless hosts, run this on a schedule (e.g. every 10 minutes) instead."""
+    pending = [(doc.id, (doc.to_dict() or {}).get('title')) for doc in
+               db.collection('tasks').where('xp_pending', '==', True).select(['title']).limit(limit).stream()]
+    print(f"✅ Scored {xp_queue.score_now(pending)} of {len(pending)} pending tasks")
+
+@app.cli.command('sync-fit')
+def sync_fit():
+    """Pulls new Google Fit buckets for every connected user."""
+    print(f"✅ Synced {fit_sync.sync_all()} Fit connections")
+
+if os.getenv("EAGER_INIT"):
+    for singleton in (db, auth, fit_history):
+        singleton.resolve()
+    gemini.model(LIFEY_MODEL)
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -1,22 +1,50 @@
-from flask import Flask
+import asyncio
+import threading
+import weakref
+from flask import Flask, jsonify
 from flask_login import LoginManager
 from flask_cors import CORS
+from flask_sqlalchemy import SQLAlchemy
 from config import config
 import firebase_admin
 from firebase_admin import credentials, firestore
+from app.repositories import SessionUser, firestore_repositories, sql_repositories
+from app.services.pagination import BadCursor
+from app.services.passwords import PasswordHasher
 
+db = SQLAlchemy()
 login_manager = LoginManager()
 cors = CORS()
 
-def create_app(config_name='development'):
+def create_app(config_name='development', firestore_db=None, async_db=None, **overrides):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.config.update(overrides)
 
-    if not firebase_admin._apps:
-        cred = credentials.Certificate(app.config['FIREBASE_CREDENTIALS'])
-        firebase_admin.initialize_app(cred)
-    
-    app.config['db'] = firestore.client()
+    if app.config['STORAGE_BACKEND'] == 'sql':
+        db.init_app(app)
+        with app.app_context():
+            from app import models  # registers the tables on db.metadata
+            db.create_all()
+            app.config['repos'] = sql_repositories(db.engine)
+        firestore_db = async_db = None
+    else:
+        if firestore_db is None:
+            if not firebase_admin._apps:
+                cred = credentials.Certificate(app.config['FIREBASE_CREDENTIALS'])
+                firebase_admin.initialize_app(cred)
+            firestore_db = firestore.client()
+            if app.config.get('ASYNC_FIRESTORE') and async_db is None:
+                async_db = PerLoopClient(async_firestore_client)
+        app.config['repos'] = firestore_repositories(firestore_db)
+
+    app.config['db'] = firestore_db
+    app.config['async_db'] = async_db
+    app.config['passwords'] = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_QUEUE']
+    )
 
     login_manager.init_app(app)
     cors.init_app(app)
@@ -24,7 +52,7 @@ def create_app(config_name='development'):
     login_manager.login_view = 'auth.login'
     login_manager.login_message_category = 'info'
 
-    from app.routes import auth, dashboard, tasks, fitness, social, health, nutrition, sleep, ai_chat
+    from app.routes import auth, dashboard, tasks, fitness, social, health, nutrition, sleep, ai_chat, imports
 
     app.register_blueprint(auth.bp)
     app.register_blueprint(dashboard.bp)
@@ -35,10 +63,40 @@ def create_app(config_name='development'):
     app.register_blueprint(nutrition.bp, url_prefix='/nutrition')
     app.register_blueprint(sleep.bp, url_prefix='/sleep')
     app.register_blueprint(ai_chat.bp, url_prefix='/ai')
+    app.register_blueprint(imports.bp, url_prefix='/import')
+    app.register_error_handler(BadCursor, lambda e: (jsonify({'error': 'Invalid cursor'}), 400))
 
     return app
 
+def async_firestore_client():
+    from google.cloud import firestore as cloud_firestore
+    firebase_app = firebase_admin.get_app()
+    return cloud_firestore.AsyncClient(credentials=firebase_app.credential.get_credential(), project=firebase_app.project_id)
+
+class PerLoopClient:
+    """Stands in for an async client, creating one per event loop: gRPC aio channels are bound to
+    the loop they were made on. Behind asgi.py every async view runs on the server's loop and
+    shares one client; under a plain WSGI server Flask gives each async view a fresh loop, so
+    ASYNC_FIRESTORE costs a client per request there and is meant for the ASGI deployment."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def client(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = self._clients[loop] = self.factory()
+            return client
+
+    def __getattr__(self, name):
+        return getattr(self.client(), name)
+
 @login_manager.user_loader
 def load_user(user_id):
-    from app.models import User
-    return User.get(user_id)
\ No newline at end of file
+    from flask import current_app
+    data = current_app.config['repos'].users.get(user_id)
+    return SessionUser(data) if data else None
\ No newline at end of file
@@ -4,6 +4,11 @@ from app import db
 
 class Fitness(db.Model):
     __tablename__ = 'fitness_activities'
+    __table_args__ = (
+        # bulk_import.dedupe_key; manual entries may repeat
+        db.Index('uq_fitness_activities_import', 'user_id', 'source', 'performed_at', unique=True,
+                 sqlite_where=db.text("source != 'manual'"), postgresql_where=db.text("source != 'manual'")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -26,5 +31,7 @@ class Fitness(db.Model):
     ai_generated_plan = db.Column(db.Boolean, default=False)
     ai_form_feedback = db.Column(db.Text)  # AI analysis of form
 
+    source = db.Column(db.String(50), default='manual')  # manual, import, upload, fitbit, ...
+
     performed_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
@@ -4,6 +4,11 @@ from app import db
 
 class HealthMetric(db.Model):
     __tablename__ = 'health_metrics'
+    __table_args__ = (
+        # bulk_import.dedupe_key; manual entries may repeat
+        db.Index('uq_health_metrics_import', 'user_id', 'source', 'recorded_at', 'metric_type', unique=True,
+                 sqlite_where=db.text("source != 'manual'"), postgresql_where=db.text("source != 'manual'")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
@@ -4,6 +4,11 @@ from app import db
 
 class Meal(db.Model):
     __tablename__ = 'meals'
+    __table_args__ = (
+        # bulk_import.dedupe_key; manual entries may repeat
+        db.Index('uq_meals_import', 'user_id', 'source', 'logged_at', unique=True,
+                 sqlite_where=db.text("source != 'manual'"), postgresql_where=db.text("source != 'manual'")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -19,4 +24,5 @@ class Meal(db.Model):
     fiber_g = db.Column(db.Float)
 
     ai_analyzed = db.Column(db.Boolean, default=False)
+    source = db.Column(db.String(50), default='manual')  # manual, import, upload, fitbit, ...
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
@@ -4,6 +4,11 @@ from app import db
 
 class SleepSession(db.Model):
     __tablename__ = 'sleep_sessions'
+    __table_args__ = (
+        # bulk_import.dedupe_key; manual entries may repeat
+        db.Index('uq_sleep_sessions_import', 'user_id', 'source', 'sleep_start', unique=True,
+                 sqlite_where=db.text("source != 'manual'"), postgresql_where=db.text("source != 'manual'")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -19,4 +24,5 @@ class SleepSession(db.Model):
     awake_minutes = db.Column(db.Integer)
 
     notes = db.Column(db.Text)
+    source = db.Column(db.String(50), default='manual')  # manual, import, upload, fitbit, ...
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
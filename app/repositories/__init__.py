@@ -0,0 +1,72 @@
+from typing import Dict
+from flask_login import UserMixin
+
+
+class Repositories:
+    """One repo per collection for the configured storage backend (STORAGE_BACKEND=firestore|sql).
+
+    Routes read and write through `current_app.config['repos']` instead of a backend client.
+    """
+
+    def __init__(self, users, tasks, metrics, meals, fitness, sleep, posts, insights, read_rollups):
+        self.users = users
+        self.tasks = tasks
+        self.metrics = metrics
+        self.meals = meals
+        self.fitness = fitness
+        self.sleep = sleep
+        self.posts = posts
+        self.insights = insights
+        self._read_rollups = read_rollups
+
+    def rollups(self, user_id, period: str = 'day', count: int = 7):
+        return self._read_rollups(user_id, period, count)
+
+
+class SessionUser(UserMixin):
+    """The logged-in user as a plain record, whichever backend loaded it."""
+
+    def __init__(self, data: Dict):
+        self.id = data['id']
+        self.data = data
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['data'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def firestore_repositories(db) -> Repositories:
+    from app.repositories.firestore import FirestorePostsRepo, FirestoreRepo, FirestoreUsersRepo, rollups
+    return Repositories(
+        users=FirestoreUsersRepo(db),
+        tasks=FirestoreRepo(db, 'tasks', 'created_at'),
+        metrics=FirestoreRepo(db, 'health_metrics', 'recorded_at'),
+        meals=FirestoreRepo(db, 'meals', 'logged_at'),
+        fitness=FirestoreRepo(db, 'fitness', 'performed_at'),
+        sleep=FirestoreRepo(db, 'sleep_sessions', 'sleep_start'),
+        posts=FirestorePostsRepo(db),
+        insights=FirestoreRepo(db, 'ai_insights', 'generated_at'),
+        read_rollups=lambda user_id, period, count: rollups(db, user_id, period, count),
+    )
+
+
+def sql_repositories(engine) -> Repositories:
+    from app.models import AIInsight, Fitness, HealthMetric, Meal, SleepSession, Social, Task, User
+    from app.repositories.sql import SqlPostsRepo, SqlRepo, SqlUsersRepo, rollups
+    metrics = SqlRepo(engine, HealthMetric, 'health_metrics', 'recorded_at')
+    meals = SqlRepo(engine, Meal, 'meals', 'logged_at')
+    fitness = SqlRepo(engine, Fitness, 'fitness', 'performed_at')
+    sleep = SqlRepo(engine, SleepSession, 'sleep_sessions', 'sleep_start')
+    return Repositories(
+        users=SqlUsersRepo(engine, User, 'users', 'created_at'),
+        tasks=SqlRepo(engine, Task, 'tasks', 'created_at'),
+        metrics=metrics,
+        meals=meals,
+        fitness=fitness,
+        sleep=sleep,
+        posts=SqlPostsRepo(engine, Social, 'social', 'created_at'),
+        insights=SqlRepo(engine, AIInsight, 'ai_insights', 'generated_at'),
+        read_rollups=lambda user_id, period, count: rollups([metrics, meals, fitness, sleep], user_id, period, count),
+    )
@@ -0,0 +1,113 @@
+import hashlib
+from typing import Callable, Dict, List, Optional, Tuple
+from google.cloud import firestore
+from app.services.feed import feed_service
+from app.services.pagination import paginate
+from app.services.rollups import BATCH_LIMIT, ROLLUPS, add_many_with_rollups, add_with_rollups, create_batch, read_days, read_weeks
+from unique_keys import INDEXES, UniqueKeys
+
+
+class FirestoreRepo:
+    """A user-owned collection ordered by `order_field`; entries feeding rollups are written with add_with_rollups."""
+
+    def __init__(self, db, collection: str, order_field: str):
+        self.db = db
+        self.collection = collection
+        self.order_field = order_field
+
+    def _ref(self):
+        return self.db.collection(self.collection)
+
+    def get(self, item_id: str) -> Optional[Dict]:
+        snapshot = self._ref().document(item_id).get()
+        return {"id": snapshot.id, **snapshot.to_dict()} if snapshot.exists else None
+
+    def add(self, doc: Dict) -> str:
+        if self.collection in ROLLUPS:
+            return add_with_rollups(self.db, self.collection, doc)
+        _, ref = self._ref().add(doc)
+        return ref.id
+
+    def add_many(self, docs: List[Dict], key: Callable[[Dict], tuple]) -> int:
+        """Creates docs under ids derived from (user_id, key(doc)), skipping ids that already exist; returns how many were new.
+
+        The get_all check only saves work: writes use create(), so a concurrent import of the
+        same rows can't write (or count in rollups) a doc twice."""
+        refs = {}
+        for doc in docs:
+            digest = hashlib.sha1('|'.join(map(str, (doc['user_id'], *key(doc)))).encode()).hexdigest()[:20]
+            refs.setdefault(digest, (self._ref().document(digest), doc))
+        existing = {snapshot.id for snapshot in self.db.get_all([ref for ref, _ in refs.values()], field_paths=[]) if snapshot.exists}
+        fresh = [(ref, doc) for doc_id, (ref, doc) in refs.items() if doc_id not in existing]
+        if self.collection in ROLLUPS:
+            return add_many_with_rollups(self.db, self.collection, fresh, self.order_field)
+        return sum(create_batch(self.db, fresh[start:start + BATCH_LIMIT]) for start in range(0, len(fresh), BATCH_LIMIT))
+
+    def update(self, item_id: str, data: Dict) -> None:
+        self._ref().document(item_id).update(data)
+
+    def delete(self, item_id: str) -> None:
+        self._ref().document(item_id).delete()
+
+    def page(self, user_id: str, cursor: Optional[str] = None, limit: int = 20,
+             fields: Optional[List[str]] = None) -> Tuple[List[Dict], Optional[str]]:
+        return paginate(self._ref().where('user_id', '==', user_id), self._ref(), self.order_field, cursor=cursor, limit=limit, fields=fields)
+
+    def recent(self, user_id: str, limit: int, order_field: Optional[str] = None, descending: bool = True, **equals) -> List[Dict]:
+        query = self._ref().where('user_id', '==', user_id)
+        for field, value in equals.items():
+            query = query.where(field, '==', value)
+        direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+        query = query.order_by(order_field or self.order_field, direction=direction).limit(limit)
+        return [{"id": doc.id, **doc.to_dict()} for doc in query.stream()]
+
+    def between(self, user_id: str, start, end, fields: Optional[List[str]] = None, **equals) -> List[Dict]:
+        query = self._ref().where('user_id', '==', user_id)
+        for field, value in equals.items():
+            query = query.where(field, '==', value)
+        query = query.where(self.order_field, '>=', start).where(self.order_field, '<=', end)
+        if fields:
+            query = query.select(list(dict.fromkeys(fields + [self.order_field])))
+        return [{"id": doc.id, **doc.to_dict()} for doc in query.stream()]
+
+
+class FirestoreUsersRepo(FirestoreRepo):
+    """Usernames and emails are resolved through their unique-key index docs (UniqueKeys.lookup
+    also finds, and indexes, users created before the index existed)."""
+
+    def __init__(self, db):
+        super().__init__(db, 'users', 'created_at')
+        self.keys = UniqueKeys(db)
+
+    def find(self, field: str, value) -> Optional[Dict]:
+        if field in INDEXES:
+            uid = self.keys.lookup(field, value)
+            return self.get(uid) if uid else None
+        docs = list(self._ref().where(field, '==', value).limit(1).stream())
+        return {"id": docs[0].id, **docs[0].to_dict()} if docs else None
+
+    def create(self, data: Dict, unique: Dict) -> str:
+        """Adds a user while claiming `unique` ({'username': ..., 'email': ...}); raises KeyTaken."""
+        ref = self._ref().document()
+        self.keys.create_user(ref, data, unique)
+        return ref.id
+
+
+class FirestorePostsRepo(FirestoreRepo):
+    """Social posts go through the fan-out feed service."""
+
+    def __init__(self, db):
+        super().__init__(db, 'social', 'created_at')
+
+    def publish(self, post: Dict) -> str:
+        return feed_service.publish(self.db, post)
+
+    def feed(self, viewer_id: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        return feed_service.read(self.db, viewer_id, limit=limit, cursor=cursor)
+
+    def backfill_feeds(self) -> Tuple[int, int]:
+        return feed_service.backfill(self.db)
+
+
+def rollups(db, user_id: str, period: str, count: int) -> List[Dict]:
+    return read_weeks(db, user_id, count) if period == 'week' else read_days(db, user_id, count)
@@ -0,0 +1,224 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import DateTime, and_, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, load_only
+from app.services.pagination import BadCursor, decode_cursor, encode_cursor
+from app.services.rollups import accumulate, day_ids, period_ids, week_ids
+from unique_keys import KeyTaken
+
+
+# Dialects with INSERT ... ON CONFLICT DO NOTHING; others insert row by row in savepoints.
+UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def _naive_utc(value):
+    """SQLite DateTime columns drop tzinfo, so everything is stored and compared as naive UTC."""
+    if isinstance(value, datetime) and value.tzinfo:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class SqlRepo:
+    """SQLAlchemy counterpart of FirestoreRepo over one app.models table.
+
+    Every call opens its own short session on the engine, so repos can be used from
+    the dashboard loader's worker threads outside the app context.
+    """
+
+    def __init__(self, engine, model, collection: str, order_field: str):
+        self.engine = engine
+        self.model = model
+        self.collection = collection
+        self.order_field = order_field
+        self.columns = {column.key: column for column in model.__table__.columns}
+
+    def _session(self) -> Session:
+        return Session(self.engine, expire_on_commit=False)
+
+    def _row(self, row) -> Dict:
+        return {key: value for key, value in vars(row).items() if key in self.columns}
+
+    def _coerce(self, doc: Dict) -> Dict:
+        values = {}
+        for key, value in doc.items():
+            column = self.columns.get(key)
+            if column is None or key == 'id':
+                continue
+            if isinstance(column.type, DateTime) and isinstance(value, str):
+                try:
+                    value = datetime.fromisoformat(value)
+                except ValueError:
+                    value = None
+            values[key] = _naive_utc(value)
+        return values
+
+    @staticmethod
+    def _id(item_id) -> Optional[int]:
+        try:
+            return int(item_id)
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, item_id) -> Optional[Dict]:
+        item_id = self._id(item_id)
+        if item_id is None:
+            return None
+        with self._session() as session:
+            row = session.get(self.model, item_id)
+            return self._row(row) if row else None
+
+    def add(self, doc: Dict) -> int:
+        with self._session() as session:
+            row = self.model(**self._coerce(doc))
+            session.add(row)
+            session.commit()
+            return row.id
+
+    def add_many(self, docs: List[Dict], key: Callable[[Dict], tuple]) -> int:
+        """Inserts docs whose key(doc) (over this table's columns) isn't already stored for the user; returns how many were new.
+
+        The SELECT skips most duplicates up front; rows a concurrent import stored in between
+        are rejected by the model's unique dedupe index and not counted.
+        """
+        rows = [self._coerce(doc) for doc in docs]
+        if not rows:
+            return 0
+        order = getattr(self.model, self.order_field)
+        times = [row[self.order_field] for row in rows if row.get(self.order_field) is not None]
+        seen = set()
+        if times:
+            stmt = select(self.model).where(self.model.user_id == rows[0]['user_id'], order >= min(times), order <= max(times))
+            seen = {key(row) for row in self._fetch(stmt)}
+        fresh = []
+        for row in rows:
+            if key(row) not in seen:
+                seen.add(key(row))
+                fresh.append(row)
+        with self._session() as session:
+            written = self._insert_new(session, fresh)
+            session.commit()
+        return written
+
+    def _insert_new(self, session: Session, rows: List[Dict]) -> int:
+        insert = UPSERT_INSERTS.get(self.engine.dialect.name)
+        if insert is None:
+            written = 0
+            for row in rows:
+                try:
+                    with session.begin_nested():
+                        session.add(self.model(**row))
+                    written += 1
+                except IntegrityError:
+                    pass
+            return written
+        # executemany takes its columns from the first row, so rows missing optional fields go in their own statement
+        groups: Dict[frozenset, List[Dict]] = {}
+        for row in rows:
+            groups.setdefault(frozenset(row), []).append(row)
+        stmt = insert(self.model).on_conflict_do_nothing().returning(self.model.id)
+        return sum(len(session.execute(stmt, group).all()) for group in groups.values())
+
+    def update(self, item_id, data: Dict) -> None:
+        with self._session() as session:
+            row = session.get(self.model, self._id(item_id))
+            if row is not None:
+                for key, value in self._coerce(data).items():
+                    setattr(row, key, value)
+                session.commit()
+
+    def delete(self, item_id) -> None:
+        with self._session() as session:
+            row = session.get(self.model, self._id(item_id))
+            if row is not None:
+                session.delete(row)
+                session.commit()
+
+    def _select(self, fields: Optional[List[str]] = None, order_field: Optional[str] = None):
+        stmt = select(self.model)
+        if fields:
+            keep = [getattr(self.model, f) for f in dict.fromkeys(fields + [order_field or self.order_field]) if f in self.columns]
+            stmt = stmt.options(load_only(*keep))
+        return stmt
+
+    def _fetch(self, stmt) -> List[Dict]:
+        with self._session() as session:
+            return [self._row(row) for row in session.scalars(stmt)]
+
+    def _page(self, stmt, cursor: Optional[str], limit: int) -> Tuple[List[Dict], Optional[str]]:
+        """Keyset pagination on (order_field, id) descending, with the same opaque cursors as paginate()."""
+        order, key = getattr(self.model, self.order_field), self.model.id
+        stmt = stmt.where(order.isnot(None))
+        if cursor:
+            value, doc_id = decode_cursor(cursor)
+            try:
+                value, doc_id = _naive_utc(value), int(doc_id)
+            except (ValueError, TypeError, AttributeError) as e:
+                raise BadCursor(cursor) from e
+            stmt = stmt.where(or_(order < value, and_(order == value, key < doc_id)))
+        items = self._fetch(stmt.order_by(order.desc(), key.desc()).limit(limit))
+        next_cursor = encode_cursor(items[-1][self.order_field], str(items[-1]['id'])) if len(items) == limit else None
+        return items, next_cursor
+
+    def page(self, user_id, cursor: Optional[str] = None, limit: int = 20,
+             fields: Optional[List[str]] = None) -> Tuple[List[Dict], Optional[str]]:
+        return self._page(self._select(fields).where(self.model.user_id == user_id), cursor, limit)
+
+    def recent(self, user_id, limit: int, order_field: Optional[str] = None, descending: bool = True, **equals) -> List[Dict]:
+        order = getattr(self.model, order_field or self.order_field)
+        stmt = select(self.model).where(self.model.user_id == user_id, order.isnot(None))
+        for field, value in equals.items():
+            stmt = stmt.where(getattr(self.model, field) == value)
+        return self._fetch(stmt.order_by(order.desc() if descending else order.asc()).limit(limit))
+
+    def between(self, user_id, start, end, fields: Optional[List[str]] = None, **equals) -> List[Dict]:
+        order = getattr(self.model, self.order_field)
+        stmt = self._select(fields).where(self.model.user_id == user_id, order >= _naive_utc(start), order <= _naive_utc(end))
+        for field, value in equals.items():
+            stmt = stmt.where(getattr(self.model, field) == value)
+        return self._fetch(stmt)
+
+
+class SqlUsersRepo(SqlRepo):
+    def find(self, field: str, value) -> Optional[Dict]:
+        items = self._fetch(select(self.model).where(getattr(self.model, field) == value).limit(1))
+        return items[0] if items else None
+
+    def create(self, data: Dict, unique: Dict) -> int:
+        """Adds a user; the users table's unique constraints reject taken values, surfaced as KeyTaken."""
+        try:
+            return self.add({**data, **unique})
+        except IntegrityError:
+            for key, value in unique.items():
+                if self.find(key, value):
+                    raise KeyTaken(key, value)
+            raise
+
+
+class SqlPostsRepo(SqlRepo):
+    """The SQL schema has no friend graph, so the feed is every post, newest first."""
+
+    def publish(self, post: Dict) -> int:
+        return self.add(post)
+
+    def feed(self, viewer_id, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        return self._page(select(self.model), cursor, limit)
+
+
+def rollups(repos: List[SqlRepo], user_id, period: str, count: int, end: Optional[date] = None) -> List[Dict]:
+    """Same shape as read_days/read_weeks, summed from the entry tables instead of stored rollup docs."""
+    end = end or datetime.now(timezone.utc).date()
+    if period == 'week':
+        ids, index, oldest = week_ids(count, end), 1, end - timedelta(weeks=count - 1)
+        start = oldest - timedelta(days=oldest.weekday())
+    else:
+        ids, index, start = day_ids(count, end), 0, end - timedelta(days=count - 1)
+    found = {period_id: {'period': period_id} for period_id in ids}
+    window = (datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.max.time()))
+    for repo in repos:
+        for doc in repo.between(user_id, *window):
+            rollup = found.get(period_ids(doc[repo.order_field].date())[index])
+            if rollup is not None:
+                accumulate(rollup, repo.collection, doc)
+    return list(found.values())
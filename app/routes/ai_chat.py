@@ -1,49 +1,88 @@
+import asyncio
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
-from google.cloud import firestore
 from datetime import datetime, timezone
+import time
 from app.services.gemini_service import gemini_service
+from streaming import stream_reply
+from ai_client import AIUnavailable
 
 bp = Blueprint('ai_chat', __name__)
 
 @bp.route('/chat', methods=['POST'])
 @login_required
-def chat():
+async def chat():
     data = request.get_json()
     user_message = data.get('message', '')
     if not user_message: return jsonify({'error': 'No message provided'}), 400
     try:
-        db = current_app.config['db']
-        user_doc = db.collection('users').document(current_user.id).get().to_dict() or {}
+        repos, async_db = current_app.config['repos'], current_app.config.get('async_db')
+        if async_db is not None:
+            user_doc = (await async_db.collection('users').document(current_user.id).get()).to_dict() or {}
+        else:
+            user_doc = await asyncio.to_thread(repos.users.get, current_user.id) or {}
         context = f"You are LifeOS, a health coach. User: {user_doc.get('username', 'User')}. Goals: {user_doc.get('goals', 'Not set')}."
-        ai_response = gemini_service.chat(message=user_message, context=context)
-        
-        if any(word in ai_response.lower() for word in ['recommend', 'suggest', 'try', 'consider']):
-            db.collection('ai_insights').add({
-                'user_id': current_user.id, 'category': 'general', 'insight_type': 'recommendation',
-                'title': 'AI Coach Recommendation', 'description': ai_response[:500],
-                'confidence_score': 0.85, 'model_version': current_app.config.get('GEMINI_MODEL', 'gemini-pro'),
-                'generated_at': datetime.now(timezone.utc), 'is_read': False
-            })
+        ai_response = await gemini_service.chat_async(message=user_message, context=context, user_id=current_user.id)
+        if async_db is not None:
+            await save_recommendation_async(async_db, current_user.id, ai_response)
+        else:
+            await asyncio.to_thread(save_recommendation, repos, current_user.id, ai_response)
         return jsonify({'response': ai_response, 'model': current_app.config.get('GEMINI_MODEL', 'gemini-pro')})
+    except AIUnavailable as e:
+        return jsonify({'error': str(e), 'retry_after': e.retry_after}), 503, {'Retry-After': str(max(1, round(e.retry_after)))}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/chat/stream', methods=['POST'])
+@login_required
+def chat_stream():
+    started = time.perf_counter()
+    data = request.get_json()
+    user_message = data.get('message', '')
+    if not user_message: return jsonify({'error': 'No message provided'}), 400
+    repos, user_id = current_app.config['repos'], current_user.id
+    user_doc = repos.users.get(user_id) or {}
+    context = f"You are LifeOS, a health coach. User: {user_doc.get('username', 'User')}. Goals: {user_doc.get('goals', 'Not set')}."
+    return stream_reply(lambda: gemini_service.chat_stream(message=user_message, context=context, user_id=user_id), started,
+                        on_complete=lambda reply: save_recommendation(repos, user_id, reply), error_message='AI coach is unavailable right now.')
+
+def recommendation_insight(user_id, ai_response):
+    if any(word in ai_response.lower() for word in ['recommend', 'suggest', 'try', 'consider']):
+        return {
+            'user_id': user_id, 'category': 'general', 'insight_type': 'recommendation',
+            'title': 'AI Coach Recommendation', 'description': ai_response[:500],
+            'confidence_score': 0.85, 'model_version': current_app.config.get('GEMINI_MODEL', 'gemini-pro'),
+            'generated_at': datetime.now(timezone.utc), 'is_read': False
+        }
+
+def save_recommendation(repos, user_id, ai_response):
+    insight = recommendation_insight(user_id, ai_response)
+    if insight: repos.insights.add(insight)
+
+async def save_recommendation_async(async_db, user_id, ai_response):
+    insight = recommendation_insight(user_id, ai_response)
+    if insight: await async_db.collection('ai_insights').add(insight)
+
+@bp.route('/chat/reset', methods=['POST'])
+@login_required
+def reset_chat():
+    gemini_service.sessions.reset(current_user.id)
+    return jsonify({'status': 'success'})
+
 @bp.route('/insights', methods=['GET'])
 @login_required
 def get_insights():
-    db = current_app.config['db']
-    insights = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('ai_insights').where('user_id', '==', current_user.id).order_by('generated_at', direction=firestore.Query.DESCENDING).limit(10).stream()]
+    insights = current_app.config['repos'].insights.recent(current_user.id, 10)
     return jsonify(insights)
 
 @bp.route('/analyze-health', methods=['POST'])
 @login_required
 def analyze_health():
-    db = current_app.config['db']
-    metrics = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('health_metrics').where('user_id', '==', current_user.id).order_by('recorded_at', direction=firestore.Query.DESCENDING).limit(100).stream()]
+    repos = current_app.config['repos']
+    metrics = repos.metrics.recent(current_user.id, current_app.config.get('HEALTH_ANALYSIS_WINDOW', 100))
     if not metrics: return jsonify({'error': 'No health data available'}), 400
     try: 
-        user_doc = db.collection('users').document(current_user.id).get().to_dict() or {}
+        user_doc = repos.users.get(current_user.id) or {}
         return jsonify(gemini_service.analyze_health_trends(user_doc, metrics))
     except Exception as e: 
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
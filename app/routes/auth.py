@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.repositories import SessionUser
+from app.services.passwords import HasherBusy
+from unique_keys import KeyTaken
 
 bp = Blueprint('auth', __name__)
 
@@ -8,33 +10,36 @@ bp = Blueprint('auth', __name__)
 def register():
     if current_user.is_authenticated: return redirect(url_for('dashboard.index'))
     if request.method == 'POST':
-        db = current_app.config['db']
+        users = current_app.config['repos'].users
         username, email, password = request.form['username'], request.form['email'], request.form['password']
-        if list(db.collection('users').where('username', '==', username).stream()):
-            flash('Username already exists', 'error')
+        try:
+            users.create({'password_hash': current_app.config['passwords'].hash(password)}, unique={'username': username, 'email': email})
+        except KeyTaken as e:
+            flash('Username already exists' if e.key == 'username' else 'Email already registered', 'error')
             return render_template('auth/register.html')
-        if list(db.collection('users').where('email', '==', email).stream()):
-            flash('Email already registered', 'error')
-            return render_template('auth/register.html')
-        db.collection('users').add({'username': username, 'email': email, 'password_hash': generate_password_hash(password)})
+        except HasherBusy:
+            flash('We are busy right now, please try again in a moment', 'error')
+            return render_template('auth/register.html'), 503
         flash('Registration successful!', 'success')
         return redirect(url_for('auth.login'))
     return render_template('auth/register.html')
 
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
-    from app.models import User
     if current_user.is_authenticated: return redirect(url_for('dashboard.index'))
     if request.method == 'POST':
-        db = current_app.config['db']
         username, password, remember = request.form['username'], request.form['password'], bool(request.form.get('remember'))
-        users = list(db.collection('users').where('username', '==', username).stream())
-        if users:
-            user_data = users[0].to_dict()
-            if check_password_hash(user_data['password_hash'], password):
-                user = User(users[0].id) 
-                login_user(user, remember=remember)
+        users, passwords = current_app.config['repos'].users, current_app.config['passwords']
+        user_data = users.find('username', username)
+        try:
+            if user_data and passwords.verify(user_data.get('password_hash'), password):
+                if passwords.needs_rehash(user_data['password_hash']):
+                    users.update(user_data['id'], {'password_hash': passwords.hash(password)})
+                login_user(SessionUser(user_data), remember=remember)
                 return redirect(request.args.get('next') or url_for('dashboard.index'))
+        except HasherBusy:
+            flash('We are busy right now, please try again in a moment', 'error')
+            return render_template('auth/login.html'), 503
         flash('Invalid username or password', 'error')
     return render_template('auth/login.html')
 
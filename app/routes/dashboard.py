@@ -1,15 +1,37 @@
-from flask import Blueprint, render_template, current_app
+import asyncio
+from flask import Blueprint, render_template, request, jsonify, current_app
 from flask_login import login_required, current_user
 from google.cloud import firestore
+from dashboard_loader import dashboard_loader
 
 bp = Blueprint('dashboard', __name__)
 
 @bp.route('/')
 @login_required
-def index():
-    db = current_app.config['db']
-    recent_metrics = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('health_metrics').where('user_id', '==', current_user.id).order_by('recorded_at', direction=firestore.Query.DESCENDING).limit(5).stream()]
-    pending_tasks = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('tasks').where('user_id', '==', current_user.id).where('status', '==', 'pending').order_by('due_date', direction=firestore.Query.ASCENDING).limit(5).stream()]
-    recent_workouts = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('fitness').where('user_id', '==', current_user.id).order_by('performed_at', direction=firestore.Query.DESCENDING).limit(3).stream()]
+async def index():
+    repos, async_db, user_id = current_app.config['repos'], current_app.config.get('async_db'), current_user.id
+    if async_db is not None:
+        view = await dashboard_loader.load_async(user_id, {
+            'metrics': lambda: fetch_async(async_db.collection('health_metrics').where('user_id', '==', user_id).order_by('recorded_at', direction=firestore.Query.DESCENDING).limit(5)),
+            'tasks': lambda: fetch_async(async_db.collection('tasks').where('user_id', '==', user_id).where('status', '==', 'pending').order_by('due_date', direction=firestore.Query.ASCENDING).limit(5)),
+            'workouts': lambda: fetch_async(async_db.collection('fitness').where('user_id', '==', user_id).order_by('performed_at', direction=firestore.Query.DESCENDING).limit(3)),
+        })
+    else:
+        view = await asyncio.to_thread(dashboard_loader.load, user_id, {
+            'metrics': lambda: repos.metrics.recent(user_id, 5),
+            'tasks': lambda: repos.tasks.recent(user_id, 5, order_field='due_date', descending=False, status='pending'),
+            'workouts': lambda: repos.fitness.recent(user_id, 3),
+        })
     
-    return render_template('dashboard.html', user=current_user, metrics=recent_metrics, tasks=pending_tasks, workouts=recent_workouts)
\ No newline at end of file
+    return render_template('dashboard.html', user=current_user, metrics=view['metrics'], tasks=view['tasks'], workouts=view['workouts'])
+
+async def fetch_async(query):
+    return [{"id": doc.id, **doc.to_dict()} async for doc in query.stream()]
+
+@bp.route('/api/rollups')
+@login_required
+def rollups():
+    repos = current_app.config['repos']
+    if request.args.get('period') == 'week':
+        return jsonify(repos.rollups(current_user.id, 'week', min(request.args.get('n', 4, type=int), 52)))
+    return jsonify(repos.rollups(current_user.id, 'day', min(request.args.get('n', 7, type=int), 90)))
\ No newline at end of file
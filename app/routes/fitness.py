@@ -1,23 +1,23 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
-from google.cloud import firestore
 from datetime import datetime, timezone
+from dashboard_loader import dashboard_loader
+from app.services.pagination import user_page, page_response
 
 bp = Blueprint('fitness', __name__)
+ACTIVITY_FIELDS = ['activity_type', 'duration_minutes', 'calories_burned', 'intensity', 'notes']
 
 @bp.route('/', methods=['GET'])
 @login_required
 def index():
-    db = current_app.config['db']
-    activities = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('fitness').where('user_id', '==', current_user.id).order_by('performed_at', direction=firestore.Query.DESCENDING).stream()]
-    return render_template('fitness.html', activities=activities)
+    activities, next_cursor = user_page(current_app.config['repos'].fitness, current_user.id, ACTIVITY_FIELDS)
+    return render_template('fitness.html', activities=activities, next_cursor=next_cursor)
 
 @bp.route('/add', methods=['GET', 'POST'])
 @login_required
 def add():
     if request.method == 'POST':
-        db = current_app.config['db']
-        db.collection('fitness').add({
+        current_app.config['repos'].fitness.add({
             'user_id': current_user.id,
             'activity_type': request.form.get('activity_type'),
             'duration_minutes': request.form.get('duration', type=int),
@@ -26,6 +26,12 @@ def add():
             'notes': request.form.get('notes'),
             'performed_at': datetime.now(timezone.utc)
         })
+        dashboard_loader.invalidate(current_user.id)
         flash('Workout logged!', 'success')
         return redirect(url_for('fitness.index'))
-    return render_template('fitness_add.html')
\ No newline at end of file
+    return render_template('fitness_add.html')
+
+@bp.route('/api/activities', methods=['GET'])
+@login_required
+def api_activities():
+    return page_response(*user_page(current_app.config['repos'].fitness, current_user.id, ACTIVITY_FIELDS))
\ No newline at end of file
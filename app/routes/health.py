@@ -1,23 +1,24 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_required, current_user
-from google.cloud import firestore
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from dashboard_loader import dashboard_loader
+from app.services.pagination import user_page, list_response
+from app.services.metric_aggregation import BUCKETS, aggregate, downsample
 
 bp = Blueprint('health', __name__)
+METRIC_FIELDS = ['metric_type', 'value', 'unit', 'notes']
 
 @bp.route('/', methods=['GET'])
 @login_required
 def index():
-    db = current_app.config['db']
-    metrics = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('health_metrics').where('user_id', '==', current_user.id).order_by('recorded_at', direction=firestore.Query.DESCENDING).stream()]
-    return render_template('health.html', metrics=metrics)
+    metrics, next_cursor = user_page(current_app.config['repos'].metrics, current_user.id, METRIC_FIELDS)
+    return render_template('health.html', metrics=metrics, next_cursor=next_cursor)
 
 @bp.route('/add', methods=['GET', 'POST'])
 @login_required
 def add():
     if request.method == 'POST':
-        db = current_app.config['db']
-        db.collection('health_metrics').add({
+        current_app.config['repos'].metrics.add({
             'user_id': current_user.id,
             'metric_type': request.form.get('metric_type'),
             'value': request.form.get('value', type=float),
@@ -25,6 +26,7 @@ def add():
             'notes': request.form.get('notes'),
             'recorded_at': datetime.now(timezone.utc)
         })
+        dashboard_loader.invalidate(current_user.id)
         flash('Health metric recorded!', 'success')
         return redirect(url_for('health.index'))
     return render_template('health_add.html')
@@ -32,6 +34,23 @@ def add():
 @bp.route('/api/metrics', methods=['GET'])
 @login_required
 def api_metrics():
-    db = current_app.config['db']
-    metrics = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('health_metrics').where('user_id', '==', current_user.id).stream()]
-    return jsonify(metrics)
\ No newline at end of file
+    metric_type = request.args.get('metric_type')
+    if not metric_type:
+        return list_response(*user_page(current_app.config['repos'].metrics, current_user.id, METRIC_FIELDS))
+    bucket = request.args.get('bucket', '1d')
+    if bucket not in BUCKETS: return jsonify({'error': f"bucket must be one of {', '.join(BUCKETS)}"}), 400
+    try:
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.now(timezone.utc)
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else end - timedelta(days=30)
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO 8601 timestamps'}), 400
+    start, end = [t if t.tzinfo else t.replace(tzinfo=timezone.utc) for t in (start, end)]
+
+    rows = current_app.config['repos'].metrics.between(current_user.id, start, end, fields=['value'], metric_type=metric_type)
+    timestamps, values = [r['recorded_at'] for r in rows if r.get('value') is not None], [r['value'] for r in rows if r.get('value') is not None]
+
+    result = {'metric_type': metric_type, 'start': start.isoformat(), 'end': end.isoformat(), 'bucket': bucket, 'buckets': aggregate(timestamps, values, bucket)}
+    points = request.args.get('points', type=int)
+    if points:
+        result['points'] = downsample(timestamps, values, min(points, 2000))
+    return jsonify(result)
\ No newline at end of file
@@ -0,0 +1,43 @@
+import click
+from flask import Blueprint, request, jsonify, current_app
+from flask_login import login_required, current_user
+from dashboard_loader import dashboard_loader
+from app.services.bulk_import import IMPORTS, detect_format, import_rows, read_rows
+
+bp = Blueprint('imports', __name__, cli_group=None)
+
+@bp.route('/<collection>', methods=['POST'])
+@login_required
+def upload(collection):
+    if collection not in IMPORTS: return jsonify({'error': f"collection must be one of {', '.join(IMPORTS)}"}), 404
+    limit = current_app.config.get('IMPORT_MAX_BYTES')
+    if limit:
+        if request.content_length is None: return jsonify({'error': 'Content-Length required'}), 411
+        if request.content_length > limit: return jsonify({'error': f'Upload is larger than {limit} bytes; use the import-data command'}), 413
+    export = request.files.get('file')
+    if not export: return jsonify({'error': 'No file uploaded'}), 400
+    rows = read_rows(export.stream, request.form.get('format') or detect_format(export.filename))
+    report = import_rows(current_app.config['repos'], collection, current_user.id, rows, source=request.form.get('source', 'upload'))
+    dashboard_loader.invalidate(current_user.id)
+    return jsonify(report)
+
+@bp.cli.command('import-data')
+@click.argument('user_id')
+@click.argument('collection', type=click.Choice(list(IMPORTS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--source', default='import', help='Stored on each row and used for dedupe, e.g. fitbit or apple_health.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'json']), help='Defaults to the file extension.')
+def import_data(user_id, collection, path, source, fmt):
+    """Stream a CSV/JSON export into COLLECTION for USER_ID, e.g.
+
+    flask --app "app:create_app()" import-data UID health_metrics export.csv --source fitbit
+    """
+    repos = current_app.config['repos']
+    user = repos.users.get(user_id)
+    if not user:
+        raise click.ClickException(f"No user {user_id}")
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        report = import_rows(repos, collection, user['id'], read_rows(f, fmt or detect_format(path)), source=source)
+    click.echo(f"{report['imported']} imported, {report['duplicates']} duplicates, {report['invalid']} invalid of {report['read']} rows")
+    for error in report['errors']:
+        click.echo(f"  {error}")
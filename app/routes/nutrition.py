@@ -1,23 +1,22 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
-from google.cloud import firestore
 from datetime import datetime, timezone
+from app.services.pagination import user_page, page_response
 
 bp = Blueprint('nutrition', __name__)
+MEAL_FIELDS = ['meal_name', 'meal_type', 'total_calories', 'protein_g', 'carbs_g', 'fat_g']
 
 @bp.route('/', methods=['GET'])
 @login_required
 def index():
-    db = current_app.config['db']
-    meals = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('meals').where('user_id', '==', current_user.id).order_by('logged_at', direction=firestore.Query.DESCENDING).stream()]
-    return render_template('nutrition.html', meals=meals)
+    meals, next_cursor = user_page(current_app.config['repos'].meals, current_user.id, MEAL_FIELDS)
+    return render_template('nutrition.html', meals=meals, next_cursor=next_cursor)
 
 @bp.route('/add', methods=['GET', 'POST'])
 @login_required
 def add():
     if request.method == 'POST':
-        db = current_app.config['db']
-        db.collection('meals').add({
+        current_app.config['repos'].meals.add({
             'user_id': current_user.id,
             'meal_name': request.form.get('meal_name'),
             'meal_type': request.form.get('meal_type'),
@@ -29,4 +28,9 @@ def add():
         })
         flash('Meal logged!', 'success')
         return redirect(url_for('nutrition.index'))
-    return render_template('nutrition_add.html')
\ No newline at end of file
+    return render_template('nutrition_add.html')
+
+@bp.route('/api/meals', methods=['GET'])
+@login_required
+def api_meals():
+    return page_response(*user_page(current_app.config['repos'].meals, current_user.id, MEAL_FIELDS))
\ No newline at end of file
@@ -1,23 +1,22 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
-from google.cloud import firestore
 from datetime import datetime, timezone
+from app.services.pagination import user_page, page_response
 
 bp = Blueprint('sleep', __name__)
+SESSION_FIELDS = ['sleep_end', 'duration_minutes', 'sleep_quality', 'notes']
 
 @bp.route('/', methods=['GET'])
 @login_required
 def index():
-    db = current_app.config['db']
-    sessions = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('sleep_sessions').where('user_id', '==', current_user.id).order_by('sleep_start', direction=firestore.Query.DESCENDING).stream()]
-    return render_template('sleep.html', sessions=sessions)
+    sessions, next_cursor = user_page(current_app.config['repos'].sleep, current_user.id, SESSION_FIELDS)
+    return render_template('sleep.html', sessions=sessions, next_cursor=next_cursor)
 
 @bp.route('/add', methods=['GET', 'POST'])
 @login_required
 def add():
     if request.method == 'POST':
-        db = current_app.config['db']
-        db.collection('sleep_sessions').add({
+        current_app.config['repos'].sleep.add({
             'user_id': current_user.id,
             'sleep_start': request.form.get('sleep_start'),
             'sleep_end': request.form.get('sleep_end'),
@@ -27,4 +26,9 @@ def add():
         })
         flash('Sleep recorded!', 'success')
         return redirect(url_for('sleep.index'))
-    return render_template('sleep_add.html')
\ No newline at end of file
+    return render_template('sleep_add.html')
+
+@bp.route('/api/sessions', methods=['GET'])
+@login_required
+def api_sessions():
+    return page_response(*user_page(current_app.config['repos'].sleep, current_user.id, SESSION_FIELDS))
\ No newline at end of file
@@ -1,26 +1,45 @@
+import click
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
-from google.cloud import firestore
 from datetime import datetime, timezone
+from app.services.pagination import page_limit, page_response
 
-bp = Blueprint('social', __name__)
+bp = Blueprint('social', __name__, cli_group=None)
 
 @bp.route('/', methods=['GET'])
 @login_required
 def index():
-    db = current_app.config['db']
-    posts = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('social').order_by('created_at', direction=firestore.Query.DESCENDING).stream()]
-    return render_template('social.html', posts=posts)
+    posts, next_cursor = posts_page()
+    return render_template('social.html', posts=posts, next_cursor=next_cursor)
+
+def posts_page():
+    return current_app.config['repos'].posts.feed(current_user.id, limit=page_limit(), cursor=request.args.get('cursor'))
 
 @bp.route('/post', methods=['POST'])
 @login_required
 def post():
-    db = current_app.config['db']
-    db.collection('social').add({
+    current_app.config['repos'].posts.publish({
         'user_id': current_user.id,
         'content': request.form.get('content'),
         'post_type': request.form.get('post_type', 'update'),
         'created_at': datetime.now(timezone.utc)
     })
     flash('Post shared!', 'success')
-    return redirect(url_for('social.index'))
\ No newline at end of file
+    return redirect(url_for('social.index'))
+
+@bp.route('/api/posts', methods=['GET'])
+@login_required
+def api_posts():
+    return page_response(*posts_page())
+
+@bp.cli.command('backfill-feeds')
+def backfill_feeds():
+    """Copy posts made before feeds existed into their author's and followers' feeds, e.g.
+
+    flask --app "app:create_app()" backfill-feeds
+    """
+    posts = current_app.config['repos'].posts
+    if not hasattr(posts, 'backfill_feeds'):
+        raise click.ClickException('Only the Firestore backend keeps per-viewer feeds')
+    count, written = posts.backfill_feeds()
+    click.echo(f"{written} feed items written for {count} posts")
@@ -1,23 +1,23 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
-from google.cloud import firestore
 from datetime import datetime, timezone
+from dashboard_loader import dashboard_loader
+from app.services.pagination import user_page, page_response
 
 bp = Blueprint('tasks', __name__)
+TASK_FIELDS = ['title', 'category', 'priority', 'status', 'due_date']
 
 @bp.route('/', methods=['GET'])
 @login_required
 def index():
-    db = current_app.config['db']
-    tasks = [{"id": doc.id, **doc.to_dict()} for doc in db.collection('tasks').where('user_id', '==', current_user.id).order_by('created_at', direction=firestore.Query.DESCENDING).stream()]
-    return render_template('tasks.html', tasks=tasks)
+    tasks, next_cursor = user_page(current_app.config['repos'].tasks, current_user.id, TASK_FIELDS)
+    return render_template('tasks.html', tasks=tasks, next_cursor=next_cursor)
 
 @bp.route('/add', methods=['GET', 'POST'])
 @login_required
 def add():
     if request.method == 'POST':
-        db = current_app.config['db']
-        db.collection('tasks').add({
+        current_app.config['repos'].tasks.add({
             'user_id': current_user.id,
             'title': request.form.get('title'),
             'description': request.form.get('description'),
@@ -26,6 +26,7 @@ def add():
             'status': 'pending',
             'created_at': datetime.now(timezone.utc)
         })
+        dashboard_loader.invalidate(current_user.id)
         flash('Task added successfully!', 'success')
         return redirect(url_for('tasks.index'))
     return render_template('tasks_add.html')
@@ -33,25 +34,30 @@ def add():
 @bp.route('/complete/<id>', methods=['POST'])
 @login_required
 def complete(id):
-    db = current_app.config['db']
-    task_ref = db.collection('tasks').document(id)
-    task = task_ref.get().to_dict()
+    tasks = current_app.config['repos'].tasks
+    task = tasks.get(id)
     if not task or task.get('user_id') != current_user.id:
         flash('Unauthorized', 'error')
     else:
-        task_ref.update({'status': 'completed', 'completed_at': datetime.now(timezone.utc)})
+        tasks.update(id, {'status': 'completed', 'completed_at': datetime.now(timezone.utc)})
+        dashboard_loader.invalidate(current_user.id)
         flash('Task completed!', 'success')
     return redirect(url_for('tasks.index'))
 
 @bp.route('/delete/<id>', methods=['POST'])
 @login_required
 def delete(id):
-    db = current_app.config['db']
-    task_ref = db.collection('tasks').document(id)
-    task = task_ref.get().to_dict()
+    tasks = current_app.config['repos'].tasks
+    task = tasks.get(id)
     if not task or task.get('user_id') != current_user.id:
         flash('Unauthorized', 'error')
     else:
-        task_ref.delete()
+        tasks.delete(id)
+        dashboard_loader.invalidate(current_user.id)
         flash('Task deleted!', 'success')
-    return redirect(url_for('tasks.index'))
\ No newline at end of file
+    return redirect(url_for('tasks.index'))
+
+@bp.route('/api/tasks', methods=['GET'])
+@login_required
+def api_tasks():
+    return page_response(*user_page(current_app.config['repos'].tasks, current_user.id, TASK_FIELDS))
\ No newline at end of file
@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional, TextIO
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, String
+
+CHUNK_SIZE = 400
+MAX_ERRORS = 20
+TIME_ALIASES = ('timestamp', 'time', 'date')
+
+# collection -> (app.models class name, repos attribute, timestamp field)
+IMPORTS = {
+    'health_metrics': ('HealthMetric', 'metrics', 'recorded_at'),
+    'meals': ('Meal', 'meals', 'logged_at'),
+    'fitness': ('Fitness', 'fitness', 'performed_at'),
+    'sleep_sessions': ('SleepSession', 'sleep', 'sleep_start'),
+}
+# Filled in by the importer, never taken from the file.
+SERVER_FIELDS = ('id', 'user_id', 'created_at')
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_csv(stream: TextIO) -> Iterator[Dict]:
+    yield from csv.DictReader(stream)
+
+
+def read_json(stream: TextIO, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """Objects from a top-level JSON array or JSON Lines, decoded one at a time from fixed-size reads."""
+    decoder, buffer, eof = json.JSONDecoder(), '', False
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,[]')
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer:
+                    raise RowError(f"Malformed JSON near: {buffer[:40]!r}")
+                return
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        if not isinstance(obj, dict):
+            raise RowError('Expected a JSON object per row')
+        yield obj
+
+
+def read_rows(stream, fmt: str) -> Iterator[Dict]:
+    """Rows from a binary or text stream; fmt is 'csv' or 'json' (JSON Lines included)."""
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return read_csv(stream) if fmt == 'csv' else read_json(stream)
+
+
+def _timestamp(value) -> datetime:
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.replace('.', '', 1).isdigit()):
+        seconds = float(value)
+        return datetime.fromtimestamp(seconds / 1000 if seconds > 1e11 else seconds, tz=timezone.utc)
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00')) if isinstance(value, str) else value
+    if not isinstance(parsed, datetime):
+        raise ValueError(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _convert(column, value):
+    kind = column.type
+    if isinstance(kind, DateTime):
+        return _timestamp(value)
+    if isinstance(kind, Boolean):
+        return value if isinstance(value, bool) else str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+    if isinstance(kind, Integer):
+        return int(float(value))
+    if isinstance(kind, Float):
+        return float(value)
+    if isinstance(kind, JSON):
+        return json.loads(value) if isinstance(value, str) else value
+    value = str(value)
+    if isinstance(kind, String) and kind.length and len(value) > kind.length:
+        raise ValueError(f"longer than {kind.length} characters")
+    return value
+
+
+def validate(model, time_field: str, row: Dict) -> Dict:
+    """A Firestore-ready document built from one export row, typed by the model's columns.
+
+    Unknown keys are dropped; raises RowError for bad values or missing required columns.
+    """
+    columns = {column.key: column for column in model.__table__.columns if column.key not in SERVER_FIELDS}
+    if time_field not in row:
+        row = {**row, time_field: next((row[alias] for alias in TIME_ALIASES if row.get(alias) not in (None, '')), None)}
+    doc = {}
+    for key, column in columns.items():
+        value = row.get(key)
+        if value is None or value == '':
+            if key == time_field or (not column.nullable and column.default is None):
+                raise RowError(f"missing {key}")
+            continue
+        try:
+            doc[key] = _convert(column, value)
+        except (TypeError, ValueError) as e:
+            raise RowError(f"invalid {key} {value!r}: {e}")
+    return doc
+
+
+def dedupe_key(time_field: str):
+    """Rows are the same reading when source, timestamp (and metric type, for health metrics) match."""
+    return lambda doc: (doc.get('source'), doc.get(time_field), doc.get('metric_type'))
+
+
+def import_rows(repos, collection: str, user_id, rows: Iterator[Dict], source: str = 'import',
+                chunk_size: int = CHUNK_SIZE) -> Dict:
+    """Validates and writes rows in chunks through the collection's repo; returns counts and the first errors."""
+    from app import models
+    model_name, repo_name, time_field = IMPORTS[collection]
+    model, repo, key = getattr(models, model_name), getattr(repos, repo_name), dedupe_key(time_field)
+    report = {'collection': collection, 'read': 0, 'imported': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+    created_at, chunk = datetime.now(timezone.utc), []
+
+    def flush():
+        written = repo.add_many(chunk, key)
+        report['imported'] += written
+        report['duplicates'] += len(chunk) - written
+        chunk.clear()
+
+    line = 0
+    try:
+        for line, row in enumerate(rows, start=1):
+            report['read'] += 1
+            try:
+                doc = validate(model, time_field, row)
+            except RowError as e:
+                report['invalid'] += 1
+                if len(report['errors']) < MAX_ERRORS:
+                    report['errors'].append(f"row {line}: {e}")
+                continue
+            chunk.append({'source': source, **doc, 'user_id': user_id, 'created_at': created_at})
+            if len(chunk) >= chunk_size:
+                flush()
+    except (RowError, csv.Error, UnicodeDecodeError) as e:
+        report['errors'].append(f"stopped after row {line}: {e}")
+    if chunk:
+        flush()
+    return report
+
+
+def detect_format(filename: Optional[str]) -> str:
+    return 'csv' if (filename or '').lower().endswith('.csv') else 'json'
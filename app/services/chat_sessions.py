@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional
+from ai_client import AIUnavailable, gemini
+
+CHARS_PER_TOKEN = 4
+SUMMARY_PROMPT = "Summarize this coaching conversation in under 150 words. Keep the user's goals, constraints and any advice already given.\n\n"
+
+
+def serialize_history(history) -> List[Dict]:
+    return [{"role": content.role, "parts": [part.text for part in content.parts]} for content in history]
+
+
+def estimate_tokens(history: List[Dict]) -> int:
+    return sum(len(text) for message in history for text in message["parts"]) // CHARS_PER_TOKEN
+
+
+class _UserLock:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loop_locks = weakref.WeakKeyDictionary()
+        self.refs = 0
+
+
+class UserLocks:
+    """One lock per user, created on demand and dropped once nobody holds or waits for it.
+
+    Sync callers block on the user's threading.Lock. Async callers first queue on an
+    asyncio.Lock for their event loop, so waiting is cancellable and ties up no thread, and
+    then take the threading.Lock without blocking the loop (it is only contended by a sync
+    holder, e.g. a stream being relayed by a worker thread).
+    """
+
+    def __init__(self, poll: float = 0.01):
+        self.poll = poll
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _ref(self, user_id) -> _UserLock:
+        with self._lock:
+            entry = self._locks.get(user_id)
+            if entry is None:
+                entry = self._locks[user_id] = _UserLock()
+            entry.refs += 1
+            return entry
+
+    def _unref(self, user_id, entry: _UserLock) -> None:
+        with self._lock:
+            entry.refs -= 1
+            if not entry.refs:
+                del self._locks[user_id]
+
+    @contextmanager
+    def hold(self, user_id):
+        entry = self._ref(user_id)
+        try:
+            with entry.lock:
+                yield
+        finally:
+            self._unref(user_id, entry)
+
+    @asynccontextmanager
+    async def hold_async(self, user_id):
+        entry = self._ref(user_id)
+        try:
+            loop = asyncio.get_running_loop()
+            with self._lock:
+                loop_lock = entry.loop_locks.get(loop)
+                if loop_lock is None:
+                    loop_lock = entry.loop_locks[loop] = asyncio.Lock()
+            async with loop_lock:
+                while not entry.lock.acquire(blocking=False):
+                    await asyncio.sleep(self.poll)
+                try:
+                    yield
+                finally:
+                    entry.lock.release()
+        finally:
+            self._unref(user_id, entry)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._locks)
+
+
+class ChatSessionStore:
+    """Keeps one warm ChatSession per user in an LRU, spilling evicted histories to disk when spill_dir is set.
+
+    A ChatSession is not safe to share, so each exchange runs inside turn()/turn_async(), which
+    hold the user's lock and roll the session back if the exchange doesn't finish. Long
+    histories are summarized by a background worker afterwards.
+    """
+
+    def __init__(self, max_sessions: int = 500, token_limit: int = 3000, keep_messages: int = 6, spill_dir: Optional[str] = None):
+        self.max_sessions = max_sessions
+        self.token_limit = token_limit
+        self.keep_messages = keep_messages
+        self.spill_dir = spill_dir
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.locks = UserLocks()
+        self._compacting = set()
+        self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat-compact')
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _spill_path(self, user_id: str) -> str:
+        return os.path.join(self.spill_dir, hashlib.sha256(str(user_id).encode()).hexdigest() + ".json")
+
+    def _spill(self, user_id: str, session) -> None:
+        if not self.spill_dir: return
+        with open(self._spill_path(user_id), "w") as f:
+            json.dump(serialize_history(session.history), f)
+
+    def _load_spilled(self, user_id: str) -> Optional[List[Dict]]:
+        if not self.spill_dir or not os.path.exists(self._spill_path(user_id)): return None
+        with open(self._spill_path(user_id)) as f:
+            return json.load(f)
+
+    def get(self, user_id: str, model):
+        """Returns (session, is_new); is_new means no turn has completed on it yet, so the caller
+        should send the system context. Use turn() instead when sending on the session."""
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None:
+                self._sessions.move_to_end(user_id)
+        if session is None:
+            session = model.start_chat(history=self._load_spilled(user_id) or [])
+            self._put(user_id, session)
+        return session, not session.history
+
+    def _put(self, user_id: str, session) -> None:
+        with self._lock:
+            self._sessions[user_id] = session
+            self._sessions.move_to_end(user_id)
+            evicted = []
+            while len(self._sessions) > self.max_sessions:
+                evicted.append(self._sessions.popitem(last=False))
+        for evicted_id, evicted_session in evicted:
+            self._spill(evicted_id, evicted_session)
+
+    def _begin(self, user_id: str, model):
+        session, is_new = self.get(user_id, model)
+        return session, is_new, list(session.history)
+
+    def _abort(self, user_id: str, model, history) -> None:
+        """Replaces a session whose exchange failed or was abandoned (e.g. a stream the client left)
+        with one holding only the completed turns, instead of reusing its half-recorded state."""
+        if not history:
+            with self._lock:
+                self._sessions.pop(user_id, None)
+            return
+        self._put(user_id, model.start_chat(history=history))
+
+    @contextmanager
+    def turn(self, user_id: str, model):
+        """Yields (session, is_new) for one exchange, holding the user's lock until it finishes."""
+        with self.locks.hold(user_id):
+            session, is_new, history = self._begin(user_id, model)
+            try:
+                yield session, is_new
+            except BaseException:
+                self._abort(user_id, model, history)
+                raise
+        self.compact_later(user_id, model)
+
+    @asynccontextmanager
+    async def turn_async(self, user_id: str, model):
+        """turn() for async views; waits for the user's lock without blocking the event loop."""
+        async with self.locks.hold_async(user_id):
+            session, is_new, history = await asyncio.to_thread(self._begin, user_id, model)  # may read a spilled history
+            try:
+                yield session, is_new
+            except BaseException:
+                self._abort(user_id, model, history)
+                raise
+        self.compact_later(user_id, model)
+
+    def compact_later(self, user_id: str, model) -> None:
+        """Queues compact() on the background worker unless one is already queued for the user."""
+        with self._lock:
+            if user_id in self._compacting: return
+            self._compacting.add(user_id)
+        self._compactor.submit(self._safe_compact, user_id, model)
+
+    def _safe_compact(self, user_id: str, model) -> None:
+        try:
+            self.compact(user_id, model)
+        except Exception as e:
+            print(f"⚠️ Chat compaction failed for {user_id}: {e}")
+        finally:
+            with self._lock:
+                self._compacting.discard(user_id)
+
+    def compact(self, user_id: str, model) -> None:
+        """Folds older turns into a summary once the history passes token_limit.
+
+        The summary call runs without the user's lock; turns sent meanwhile are kept after it."""
+        with self.locks.hold(user_id):
+            with self._lock:
+                session = self._sessions.get(user_id)
+            if session is None: return
+            history = serialize_history(session.history)
+        if estimate_tokens(history) <= self.token_limit or len(history) <= self.keep_messages: return
+        older, recent = history[:-self.keep_messages], history[-self.keep_messages:]
+        transcript = "\n".join(f"{m['role']}: {' '.join(m['parts'])}" for m in older)
+        try:
+            summary = gemini.call(lambda: model.generate_content(SUMMARY_PROMPT + transcript).text)
+        except AIUnavailable:
+            return  # keep the long history; compaction is retried after the next turn
+        compacted = [
+            {"role": "user", "parts": [f"Summary of our earlier conversation: {summary}"]},
+            {"role": "model", "parts": ["Understood, I'll keep that in mind."]},
+        ] + recent
+        with self.locks.hold(user_id):
+            with self._lock:
+                session = self._sessions.get(user_id)
+            if session is None: return  # reset meanwhile
+            current = list(session.history)
+            if len(current) < len(history): return  # rolled back meanwhile; the next turn retries
+            self._put(user_id, model.start_chat(history=compacted + current[len(history):]))
+
+    def reset(self, user_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(user_id, None)
+        if self.spill_dir and os.path.exists(self._spill_path(user_id)):
+            os.remove(self._spill_path(user_id))
@@ -0,0 +1,130 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from app.services.pagination import encode_cursor, paginate
+
+BATCH_LIMIT = 500
+IN_QUERY_LIMIT = 30
+
+
+class FeedService:
+    """Per-viewer feeds: posts are copied into feeds/{viewer}/items on write.
+
+    Authors with more than `fanout_limit` followers are not fanned out; their posts are
+    marked fanout='read' and merged into followers' feeds at read time instead.
+    Followers of an author are the users whose `friends` array contains the author.
+    """
+
+    def __init__(self, fanout_limit: int = 5000, workers: int = 2, authors_ttl: int = 300):
+        self.fanout_limit = fanout_limit
+        self.authors_ttl = authors_ttl
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._high_fanout = (0.0, frozenset())
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _item(post_id: str, post: Dict) -> Dict:
+        return {'post_id': post_id, 'user_id': post['user_id'], 'content': post.get('content'),
+                'post_type': post.get('post_type'), 'created_at': post['created_at']}
+
+    def publish(self, db, post: Dict) -> str:
+        """Stores the post, puts it in the author's own feed and queues the follower fan-out."""
+        author = db.collection('feed_authors').document(post['user_id']).get().to_dict() or {}
+        post = {**post, 'fanout': 'read' if author.get('high_fanout') else 'write'}
+        _, post_ref = db.collection('social').add(post)
+        db.collection('feeds').document(post['user_id']).collection('items').document(post_ref.id).set(self._item(post_ref.id, post))
+        if post['fanout'] == 'write':
+            self._pool.submit(self._safe_fan_out, db, post_ref.id, post)
+        return post_ref.id
+
+    def _safe_fan_out(self, db, post_id: str, post: Dict) -> None:
+        try:
+            self.fan_out(db, post_id, post)
+        except Exception as e:
+            print(f"❌ Feed fan-out failed for {post_id}: {e}")
+
+    @staticmethod
+    def _followers(db, author_id: str):
+        return (doc.id for doc in db.collection('users').where('friends', 'array_contains', author_id).select([]).stream())
+
+    def fan_out(self, db, post_id: str, post: Dict) -> int:
+        item, written = self._item(post_id, post), 0
+        batch = db.batch()
+        for follower_id in self._followers(db, post['user_id']):
+            batch.set(db.collection('feeds').document(follower_id).collection('items').document(post_id), item)
+            written += 1
+            if written % BATCH_LIMIT == 0:
+                batch.commit()
+                batch = db.batch()
+        batch.commit()
+        if written > self.fanout_limit:
+            db.collection('feed_authors').document(post['user_id']).set({'high_fanout': True, 'followers': written}, merge=True)
+        return written
+
+    def backfill(self, db) -> Tuple[int, int]:
+        """Fans posts stored in `social` before feeds existed out to their author's and followers' feeds.
+
+        Followers are looked up once per author. Authors over `fanout_limit` are flagged high
+        fan-out and their posts marked fanout='read' instead of copied. Feed items share the
+        post's id, so re-running only rewrites the same docs. Returns (posts, items written).
+        """
+        followers, posts, written = {}, 0, 0
+        batch, pending = db.batch(), 0
+        for doc in db.collection('social').stream():
+            post, posts = doc.to_dict(), posts + 1
+            author_id = post['user_id']
+            if author_id not in followers:
+                followers[author_id] = list(self._followers(db, author_id))
+                if len(followers[author_id]) > self.fanout_limit:
+                    db.collection('feed_authors').document(author_id).set({'high_fanout': True, 'followers': len(followers[author_id])}, merge=True)
+            fanout = 'read' if len(followers[author_id]) > self.fanout_limit else 'write'
+            writes = [(db.collection('feeds').document(viewer_id).collection('items').document(doc.id), self._item(doc.id, post))
+                      for viewer_id in ([author_id] if fanout == 'read' else [author_id, *followers[author_id]])]
+            written += len(writes)
+            if post.get('fanout') != fanout:
+                writes.append((db.collection('social').document(doc.id), {'fanout': fanout}))
+            for ref, data in writes:
+                batch.set(ref, data, merge=True)
+                pending += 1
+                if pending == BATCH_LIMIT:
+                    batch.commit()
+                    batch, pending = db.batch(), 0
+        batch.commit()
+        return posts, written
+
+    def _high_fanout_authors(self, db) -> frozenset:
+        with self._lock:
+            loaded_at, authors = self._high_fanout
+            if time.monotonic() - loaded_at < self.authors_ttl:
+                return authors
+        authors = frozenset(doc.id for doc in db.collection('feed_authors').where('high_fanout', '==', True).select([]).stream())
+        with self._lock:
+            self._high_fanout = (time.monotonic(), authors)
+        return authors
+
+    def read(self, db, viewer_id: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """One page of the viewer's feed, with posts from followed high-fan-out authors merged in.
+
+        Feed items share their post's doc id, so one (created_at, id) cursor positions both the
+        feed bucket and the high-fan-out posts query; each page is the newest `limit` of the two.
+        """
+        items_ref = db.collection('feeds').document(viewer_id).collection('items')
+        items, next_cursor = paginate(items_ref, items_ref, 'created_at', cursor=cursor, limit=limit)
+        high_fanout = self._high_fanout_authors(db)
+        if not high_fanout:
+            return items, next_cursor
+        friends = (db.collection('users').document(viewer_id).get(['friends']).to_dict() or {}).get('friends', [])
+        followed = [uid for uid in friends if uid in high_fanout][:IN_QUERY_LIMIT]
+        if not followed:
+            return items, next_cursor
+        posts_ref = db.collection('social')
+        posts, posts_cursor = paginate(posts_ref.where('user_id', 'in', followed), posts_ref, 'created_at', cursor=cursor, limit=limit)
+        merged = {item['id']: item for item in items}
+        merged.update((post['id'], {'id': post['id'], **self._item(post['id'], post)}) for post in posts)
+        merged = sorted(merged.values(), key=lambda i: (i['created_at'], i['id']), reverse=True)
+        page = merged[:limit]
+        more = len(merged) > limit or next_cursor or posts_cursor
+        return page, encode_cursor(page[-1]['created_at'], page[-1]['id']) if more and page else None
+
+feed_service = FeedService()
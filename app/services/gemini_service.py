@@ -1,7 +1,16 @@
+import hashlib
+import json
 import os
-import google.generativeai as genai
+import re
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Optional
 from flask import current_app
+from app.services.chat_sessions import ChatSessionStore
+from app.services.metric_aggregation import summarize
+from ai_client import gemini
+
+ANALYSIS_PROMPT_VERSION = 2
 
 class GeminiService:
     _instance = None
@@ -17,12 +26,20 @@ class GeminiService:
         if self._initialized: return
         api_key = current_app.config.get('GEMINI_API_KEY') or os.environ.get('GEMINI_API_KEY')
         if not api_key: raise ValueError("GEMINI_API_KEY not configured.")
-        genai.configure(api_key=api_key)
-        self._model = genai.GenerativeModel(
-            model_name=current_app.config.get('GEMINI_MODEL', 'gemini-pro'),
+        gemini.configure(api_key)
+        self._model = gemini.model(
+            current_app.config.get('GEMINI_MODEL', 'gemini-pro'),
             generation_config={"temperature": 0.7, "top_p": 0.95, "top_k": 40, "max_output_tokens": 2048},
             safety_settings=[{"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_ONLY_HIGH"}]
         )
+        self._sessions = ChatSessionStore(
+            max_sessions=current_app.config.get('CHAT_SESSION_MAX', 500),
+            token_limit=current_app.config.get('CHAT_HISTORY_TOKEN_LIMIT', 3000),
+            spill_dir=current_app.config.get('CHAT_SPILL_DIR')
+        )
+        self._analyses = OrderedDict()
+        self._analyses_max = current_app.config.get('HEALTH_ANALYSIS_CACHE_SIZE', 1000)
+        self._analyses_lock = threading.Lock()
         self._initialized = True
 
     @property
@@ -30,20 +47,77 @@ class GeminiService:
         if not self._initialized: self._initialize()
         return self._model
 
-    def chat(self, message: str, context: str = "", chat_history: List[Dict] = None) -> str:
-        chat = self.model.start_chat(history=chat_history or [])
-        return chat.send_message(f"{context}\n\nUser: {message}" if context else message).text
+    @property
+    def sessions(self) -> ChatSessionStore:
+        if not self._initialized: self._initialize()
+        return self._sessions
+
+    @staticmethod
+    def _prompt(message: str, context: str, is_new: bool) -> str:
+        """A user's warm session only gets the context on its first turn."""
+        return f"{context}\n\nUser: {message}" if context and is_new else message
+
+    def chat(self, message: str, context: str = "", chat_history: List[Dict] = None, user_id: Optional[str] = None) -> str:
+        if user_id is None:
+            chat = self.model.start_chat(history=chat_history or [])
+            return gemini.call(lambda: chat.send_message(self._prompt(message, context, True)).text)
+        with self.sessions.turn(user_id, self.model) as (chat, is_new):
+            prompt = self._prompt(message, context, is_new)
+            return gemini.call(lambda: chat.send_message(prompt).text)
+
+    async def chat_async(self, message: str, context: str = "", chat_history: List[Dict] = None, user_id: Optional[str] = None) -> str:
+        if user_id is None:
+            chat = self.model.start_chat(history=chat_history or [])
+            return (await gemini.call_async(lambda: chat.send_message_async(self._prompt(message, context, True)))).text
+        async with self.sessions.turn_async(user_id, self.model) as (chat, is_new):
+            prompt = self._prompt(message, context, is_new)
+            return (await gemini.call_async(lambda: chat.send_message_async(prompt))).text
+
+    def chat_stream(self, message: str, context: str = "", chat_history: List[Dict] = None, user_id: Optional[str] = None):
+        """Yields reply chunks; for a user's warm session the lock is held until the stream is consumed or closed."""
+        if user_id is None:
+            chat = self.model.start_chat(history=chat_history or [])
+            yield from gemini.stream(lambda: chat.send_message(self._prompt(message, context, True), stream=True))
+            return
+        with self.sessions.turn(user_id, self.model) as (chat, is_new):
+            prompt = self._prompt(message, context, is_new)
+            yield from gemini.stream(lambda: chat.send_message(prompt, stream=True))
+
+    @staticmethod
+    def analysis_fingerprint(user_dict, metrics_list) -> str:
+        """Identifies the analysis input: the user plus every reading in the window, in time order."""
+        readings = sorted((str(m.get('recorded_at')), m.get('metric_type'), m.get('value'), m.get('unit')) for m in metrics_list)
+        payload = json.dumps([ANALYSIS_PROMPT_VERSION, user_dict.get('id'), user_dict.get('username'), readings], default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
 
     def analyze_health_trends(self, user_dict, metrics_list) -> Dict:
-        metrics_summary = "\n".join([f"- {m.get('metric_type')}: {m.get('value')} {m.get('unit')} ({m.get('recorded_at')})" for m in metrics_list[-30:]]) if metrics_list else "No recent metrics available."
-        prompt = f"Analyze health data for {user_dict.get('username', 'user')}.\nMetrics:\n{metrics_summary}\nProvide JSON: {{\"trends\": [], \"concerns\": [], \"recommendations\": [], \"health_score\": 85, \"summary\": \"\"}}"
-        
-        import json, re
+        """Model analysis of per-type window statistics; results are cached by the window's fingerprint,
+        so repeat requests make no API call until a new reading arrives."""
+        if not metrics_list:
+            return {"trends": [], "concerns": [], "recommendations": [], "health_score": None, "summary": "No recent metrics available."}
+        if not self._initialized: self._initialize()
+        fingerprint = self.analysis_fingerprint(user_dict, metrics_list)
+        with self._analyses_lock:
+            if fingerprint in self._analyses:
+                self._analyses.move_to_end(fingerprint)
+                return self._analyses[fingerprint]
+
+        stats = summarize(metrics_list)
+        metrics_summary = "\n".join(
+            f"- {metric_type} ({s['unit'] or 'no unit'}): {s['count']} readings {s['first'][:10]} to {s['last'][:10]}, latest {s['latest']}, "
+            f"mean {s['mean']}, min {s['min']}, max {s['max']}, std {s['std']}, trend {s['slope_per_day']:+}/day"
+            for metric_type, s in stats.items())
+        prompt = f"Analyze health data for {user_dict.get('username', 'user')}.\nMetric statistics:\n{metrics_summary}\nProvide JSON: {{\"trends\": [], \"concerns\": [], \"recommendations\": [], \"health_score\": 85, \"summary\": \"\"}}"
         try:
-            text = self.model.generate_content(prompt).text
+            text = gemini.call(lambda: self.model.generate_content(prompt).text, key=fingerprint)
             json_match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL)
-            return json.loads(json_match.group(1) if json_match else text)
+            result = json.loads(json_match.group(1) if json_match else text)
         except Exception:
             return {"trends": [], "concerns": ["Error"], "recommendations": ["Try again"], "health_score": None, "summary": "Unavailable"}
+        with self._analyses_lock:
+            self._analyses[fingerprint] = result
+            while len(self._analyses) > self._analyses_max:
+                self._analyses.popitem(last=False)
+        return result
 
 gemini_service = GeminiService()
\ No newline at end of file
@@ -0,0 +1,74 @@
+from typing import Dict, List, Sequence
+import numpy as np
+import pandas as pd
+
+BUCKETS = {'1h': '60min', '6h': '360min', '1d': '1D', '1w': '7D', '30d': '30D'}
+PERCENTILES = (0.5, 0.9, 0.95)
+
+
+def aggregate(timestamps: Sequence, values: Sequence[float], bucket: str = '1d') -> List[Dict]:
+    """Per-bucket count/min/max/mean and percentiles for one metric series; empty buckets are skipped."""
+    if len(values) == 0:
+        return []
+    series = pd.Series(np.asarray(values, dtype=float), index=pd.to_datetime(list(timestamps), utc=True)).sort_index()
+    grouped = series.resample(BUCKETS[bucket])
+    stats = grouped.agg(['count', 'min', 'max', 'mean'])
+    quantiles = grouped.quantile(list(PERCENTILES)).unstack()
+    stats = stats.join(quantiles.rename(columns=lambda q: f"p{int(q * 100)}"))
+    stats = stats[stats['count'] > 0].round(2)
+    return [{'start': start.isoformat(), **{k: (int(v) if k == 'count' else float(v)) for k, v in row.items()}} for start, row in stats.iterrows()]
+
+
+def summarize(metrics: Sequence[Dict]) -> Dict[str, Dict]:
+    """Per metric_type window statistics: count, latest, mean/min/max/std and the least-squares trend per day."""
+    by_type = {}
+    for m in metrics:
+        try:
+            value = float(m.get('value'))
+        except (TypeError, ValueError):
+            continue
+        if m.get('recorded_at') is not None and np.isfinite(value):
+            by_type.setdefault(m.get('metric_type') or 'other', []).append((m['recorded_at'], value, m.get('unit')))
+    summary = {}
+    for metric_type, rows in sorted(by_type.items()):
+        index = pd.to_datetime([r[0] for r in rows], utc=True)
+        order = np.argsort(index.asi8)
+        days = np.asarray((index[order] - index[order[0]]) / pd.Timedelta(days=1), dtype=float)
+        values = np.asarray([r[1] for r in rows])[order]
+        slope = float(np.polyfit(days, values, 1)[0]) if len(values) > 1 and days[-1] > 0 else 0.0
+        summary[metric_type] = {
+            'unit': rows[order[-1]][2], 'count': int(len(values)), 'latest': round(float(values[-1]), 2),
+            'mean': round(float(values.mean()), 2), 'min': round(float(values.min()), 2), 'max': round(float(values.max()), 2),
+            'std': round(float(values.std()), 2), 'slope_per_day': round(slope, 3),
+            'first': index[order[0]].isoformat(), 'last': index[order[-1]].isoformat(),
+        }
+    return summary
+
+
+def lttb(xs: np.ndarray, ys: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the series' visual shape."""
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = xs[end:next_end].mean(), ys[end:next_end].mean()
+        areas = np.abs((xs[a] - avg_x) * (ys[start:end] - ys[a]) - (xs[a] - xs[start:end]) * (avg_y - ys[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(timestamps: Sequence, values: Sequence[float], points: int) -> List[List]:
+    """[[iso_timestamp, value], ...] reduced to at most `points` with LTTB, in time order."""
+    if len(values) == 0:
+        return []
+    index = pd.to_datetime(list(timestamps), utc=True)
+    order = np.argsort(index.asi8)
+    xs, ys = index.asi8[order].astype(float), np.asarray(values, dtype=float)[order]
+    return [[index[order[i]].isoformat(), float(ys[i])] for i in lttb(xs, ys, points)]
@@ -0,0 +1,65 @@
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from flask import current_app, jsonify, request
+from google.cloud import firestore
+
+
+def encode_cursor(value, doc_id: str) -> str:
+    """Packs the last row's order-by value and doc id into an opaque, URL-safe token."""
+    payload = {"id": doc_id, "v": value.isoformat() if isinstance(value, datetime) else value, "dt": isinstance(value, datetime)}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+class BadCursor(ValueError):
+    """A `cursor` request arg that encode_cursor() didn't produce; the app answers it with 400."""
+
+
+def decode_cursor(cursor: str) -> Tuple[object, str]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value = datetime.fromisoformat(payload["v"]) if payload.get("dt") else payload["v"]
+        return value, str(payload["id"])
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise BadCursor(cursor) from e
+
+
+def paginate(query, collection, order_field: str, direction=firestore.Query.DESCENDING, cursor: Optional[str] = None,
+             limit: Optional[int] = None, fields: Optional[List[str]] = None) -> Tuple[List[Dict], Optional[str]]:
+    """Fetches one page of `query` ordered by order_field (doc id as tie-breaker).
+
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    limit = limit or current_app.config.get('ITEMS_PER_PAGE', 20)
+    query = query.order_by(order_field, direction=direction).order_by('__name__', direction=direction)
+    if fields:
+        query = query.select(list(dict.fromkeys(fields + [order_field])))
+    if cursor:
+        value, doc_id = decode_cursor(cursor)
+        query = query.start_after({order_field: value, '__name__': collection.document(doc_id)})
+    docs = list(query.limit(limit).stream())
+    items = [{"id": doc.id, **doc.to_dict()} for doc in docs]
+    next_cursor = encode_cursor(items[-1].get(order_field), docs[-1].id) if len(docs) == limit else None
+    return items, next_cursor
+
+
+def page_limit() -> int:
+    return max(1, min(request.args.get('limit', type=int) or current_app.config.get('ITEMS_PER_PAGE', 20), 100))
+
+
+def user_page(repo, user_id: str, fields: Optional[List[str]] = None):
+    """One page of a user's entries from a repository, using the `cursor` and `limit` request args."""
+    return repo.page(user_id, cursor=request.args.get('cursor'), limit=page_limit(), fields=fields)
+
+
+def page_response(items: List[Dict], next_cursor: Optional[str]):
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+
+def list_response(items: List[Dict], next_cursor: Optional[str]):
+    """A page in the plain-list shape older endpoints returned; the next cursor goes in X-Next-Cursor."""
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Runs werkzeug password derivations in a process pool so they never hold a request thread's GIL.
+
+    At most `max_pending` derivations are queued or running; callers beyond that wait up to
+    `timeout` seconds for a slot and then get HasherBusy. `method` is the werkzeug hash spec
+    (e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'); hashes made with any other spec
+    report needs_rehash() so they can be upgraded on the next successful login.
+    """
+
+    def __init__(self, method: str = 'scrypt:32768:8:1', workers: Optional[int] = None, max_pending: int = 64, timeout: float = 10.0):
+        self.method = method
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherBusy('Too many password operations in flight')
+        try:
+            future = self._executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        return bool(password_hash) and self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        return password_hash.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
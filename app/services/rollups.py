@@ -0,0 +1,174 @@
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from google.api_core.exceptions import Conflict
+from google.cloud import firestore
+
+BATCH_LIMIT = 500
+CREATE_ATTEMPTS = 5
+
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, (int, float)) else 0.0
+
+
+def _minutes_between(start, end) -> float:
+    try:
+        start, end = [t if isinstance(t, datetime) else datetime.fromisoformat(t) for t in (start, end)]
+        return max((end - start).total_seconds() / 60, 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _health(doc: Dict) -> Dict:
+    metric = re.sub(r'[^a-z0-9_]', '_', (doc.get('metric_type') or 'other').lower())
+    return {metric: {'sum': _number(doc.get('value')), 'count': 1}}
+
+
+def _meals(doc: Dict) -> Dict:
+    return {'count': 1, 'calories': _number(doc.get('total_calories')), 'protein_g': _number(doc.get('protein_g')),
+            'carbs_g': _number(doc.get('carbs_g')), 'fat_g': _number(doc.get('fat_g'))}
+
+
+def _sleep(doc: Dict) -> Dict:
+    return {'count': 1, 'minutes': _minutes_between(doc.get('sleep_start'), doc.get('sleep_end')), 'quality_sum': _number(doc.get('sleep_quality'))}
+
+
+def _fitness(doc: Dict) -> Dict:
+    return {'count': 1, 'minutes': _number(doc.get('duration_minutes')), 'calories_burned': _number(doc.get('calories_burned'))}
+
+
+# collection -> (section name in the rollup doc, increments for one new document)
+ROLLUPS = {
+    'health_metrics': ('health', _health),
+    'meals': ('meals', _meals),
+    'sleep_sessions': ('sleep', _sleep),
+    'fitness': ('fitness', _fitness),
+}
+
+
+def _increments(values: Dict) -> Dict:
+    return {k: _increments(v) if isinstance(v, dict) else firestore.Increment(v) for k, v in values.items()}
+
+
+def accumulate(rollup: Dict, collection: str, doc: Dict) -> None:
+    """Adds one document to an in-memory rollup, matching what add_with_rollups increments in Firestore."""
+    section, extract = ROLLUPS[collection]
+    _merge(rollup.setdefault(section, {}), extract(doc))
+
+
+def _merge(target: Dict, values: Dict) -> None:
+    for k, v in values.items():
+        if isinstance(v, dict):
+            _merge(target.setdefault(k, {}), v)
+        else:
+            target[k] = target.get(k, 0) + v
+
+
+def period_ids(day: date) -> List[str]:
+    year, week, _ = day.isocalendar()
+    return [f"day-{day.isoformat()}", f"week-{year}-W{week:02d}"]
+
+
+def add_with_rollups(db, collection: str, doc: Dict, at: Optional[datetime] = None) -> str:
+    """Writes a new document and its increments to the user's day and week rollups in one atomic batch."""
+    section, extract = ROLLUPS[collection]
+    day = (at or datetime.now(timezone.utc)).date()
+    doc_ref = db.collection(collection).document()
+    rollups_ref = db.collection('users').document(doc['user_id']).collection('rollups')
+    batch = db.batch()
+    batch.set(doc_ref, doc)
+    for period_id in period_ids(day):
+        batch.set(rollups_ref.document(period_id), {'period': period_id, section: _increments(extract(doc))}, merge=True)
+    batch.commit()
+    return doc_ref.id
+
+
+def day_ids(days: int = 7, end: Optional[date] = None) -> List[str]:
+    end = end or datetime.now(timezone.utc).date()
+    return [f"day-{(end - timedelta(days=i)).isoformat()}" for i in reversed(range(days))]
+
+
+def week_ids(weeks: int = 4, end: Optional[date] = None) -> List[str]:
+    end = end or datetime.now(timezone.utc).date()
+    return [period_ids(end - timedelta(weeks=i))[1] for i in reversed(range(weeks))]
+
+
+def _day(value) -> date:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return (value.astimezone(timezone.utc) if value.tzinfo else value).date()
+    return datetime.now(timezone.utc).date()
+
+
+def create_batch(db, items: List[Tuple[object, Dict]], extra_writes=lambda items: []) -> int:
+    """Creates (doc_ref, doc) pairs in one batch, along with the merge-sets extra_writes(items) returns.
+
+    create() fails the whole batch if any doc already exists (e.g. a concurrent import of
+    the same file wrote it first), so nothing is applied twice; the batch is retried without
+    the docs that exist. Returns how many docs this call created.
+    """
+    for _ in range(CREATE_ATTEMPTS):
+        if not items:
+            return 0
+        batch = db.batch()
+        for ref, doc in items:
+            batch.create(ref, doc)
+        for ref, data in extra_writes(items):
+            batch.set(ref, data, merge=True)
+        try:
+            batch.commit()
+            return len(items)
+        except Conflict:
+            existing = {snapshot.id for snapshot in db.get_all([ref for ref, _ in items], field_paths=[]) if snapshot.exists}
+            items = [(ref, doc) for ref, doc in items if ref.id not in existing]
+    raise RuntimeError(f"Could not create {len(items)} documents after {CREATE_ATTEMPTS} attempts")
+
+
+def add_many_with_rollups(db, collection: str, items: Iterable[Tuple[object, Dict]], time_field: str) -> int:
+    """Bulk version of add_with_rollups for (doc_ref, doc) pairs.
+
+    Documents land in their own day/week (from doc[time_field]); each batch of at most
+    BATCH_LIMIT ops creates its documents together with their increments summed per period,
+    counting only the documents the batch actually created.
+    """
+    section = ROLLUPS[collection][0]
+
+    def periods(doc):
+        return [(doc['user_id'], period_id) for period_id in period_ids(_day(doc.get(time_field)))]
+
+    def increments(created):
+        totals = {}
+        for _, doc in created:
+            for key in periods(doc):
+                accumulate(totals.setdefault(key, {}), collection, doc)
+        return [(db.collection('users').document(user_id).collection('rollups').document(period_id),
+                 {'period': period_id, section: _increments(values[section])}) for (user_id, period_id), values in totals.items()]
+
+    pending, keys, written = [], set(), 0
+    for ref, doc in items:
+        doc_keys = set(periods(doc))
+        if len(pending) + 1 + len(keys | doc_keys) > BATCH_LIMIT:
+            written += create_batch(db, pending, increments)
+            pending, keys = [], set()
+        pending.append((ref, doc))
+        keys |= doc_keys
+    if pending:
+        written += create_batch(db, pending, increments)
+    return written
+
+
+def read_days(db, user_id: str, days: int = 7, end: Optional[date] = None) -> List[Dict]:
+    """The last `days` daily rollups (oldest first) in one batched read; missing days come back empty."""
+    rollups_ref = db.collection('users').document(user_id).collection('rollups')
+    refs = [rollups_ref.document(period_id) for period_id in day_ids(days, end)]
+    found = {doc.id: doc.to_dict() for doc in db.get_all(refs) if doc.exists}
+    return [found.get(ref.id, {'period': ref.id}) for ref in refs]
+
+
+def read_weeks(db, user_id: str, weeks: int = 4, end: Optional[date] = None) -> List[Dict]:
+    rollups_ref = db.collection('users').document(user_id).collection('rollups')
+    refs = [rollups_ref.document(period_id) for period_id in week_ids(weeks, end)]
+    found = {doc.id: doc.to_dict() for doc in db.get_all(refs) if doc.exists}
+    return [found.get(ref.id, {'period': ref.id}) for ref in refs]
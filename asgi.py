@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""ASGI entry point for the blueprint app:
+
+    ASYNC_FIRESTORE=1 uvicorn asgi:application --workers 2
+
+asgiref's WsgiToAsgi runs every request of a process through one thread-sensitive
+thread, so a slow request holds up all the others. `application` instead runs each
+request's WSGI part on a pool of ASGI_THREADS threads, and Flask's async views
+(dashboard, /ai/chat) are handed back to the server's event loop, where they await
+Firestore and Gemini alongside other requests.
+
+Without uvicorn, serve the WSGI app from a threaded server instead, e.g.
+`gunicorn -k gthread --threads 16 "app:create_app('production')"`.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from app import create_app
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that runs requests concurrently on `executor` instead of one shared thread."""
+
+    def __init__(self, wsgi_application, executor, duplicate_header_limit=100):
+        super().__init__(wsgi_application, duplicate_header_limit)
+        run = sync_to_async(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False, executor=executor)
+        self.instance_class = type('ThreadedWsgiToAsgiInstance', (WsgiToAsgiInstance,), {'run_wsgi_app': run})
+
+    async def __call__(self, scope, receive, send):
+        await self.instance_class(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+def create_application(wsgi_app, threads=None):
+    threads = threads or int(os.environ.get('ASGI_THREADS', 32))
+    return ThreadedWsgiToAsgi(wsgi_app, ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi'))
+
+
+application = create_application(create_app(os.environ.get('FLASK_CONFIG', 'production')))
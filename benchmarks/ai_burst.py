@@ -0,0 +1,100 @@
+"""Burst of Gemini calls against a simulated quota, with and without the shared AIClient.
+
+FakeGemini answers in `latency` seconds but returns 429 above `quota` requests per second
+or `capacity` concurrent requests, and a share of the prompts repeat (e.g. the same task
+title being scored by several users). The raw row calls it directly, as the routes used to:
+
+    python benchmarks/ai_burst.py [--requests 200] [--concurrency 50] [--quota 20] [--repeat 0.3]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ai_client import AIClient, AIUnavailable, CircuitBreaker
+
+
+class TooManyRequests(Exception):
+    code = 429
+
+
+class FakeGemini:
+    def __init__(self, quota, capacity, latency):
+        self.quota, self.capacity, self.latency = quota, capacity, latency
+        self.calls, self.in_flight, self.window = 0, 0, []
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        with self._lock:
+            now = time.monotonic()
+            self.calls += 1
+            self.window = [t for t in self.window if now - t < 1.0] + [now]
+            if len(self.window) > self.quota or self.in_flight >= self.capacity:
+                raise TooManyRequests('429 Resource has been exhausted')
+            self.in_flight += 1
+        try:
+            time.sleep(self.latency)
+            return f"reply to {prompt}"
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def run(label, call, prompts, concurrency, fake):
+    outcomes, latencies = {'ok': 0, 'busy': 0, 'error': 0}, []
+
+    def one(prompt):
+        started = time.perf_counter()
+        try:
+            call(prompt)
+            outcome = 'ok'
+        except AIUnavailable:
+            outcome = 'busy'
+        except Exception:
+            outcome = 'error'
+        return outcome, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for outcome, latency in pool.map(one, prompts):
+            outcomes[outcome] += 1
+            latencies.append(latency)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f"{label:<12} ok {outcomes['ok']:4d}  busy {outcomes['busy']:4d}  failed {outcomes['error']:4d}   "
+          f"{outcomes['ok'] / elapsed:6.1f} ok/s   p50 {latencies[len(latencies) // 2] * 1000:6.0f} ms   "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:6.0f} ms   upstream calls {fake.calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--quota', type=int, default=20, help='upstream requests per second before 429s')
+    parser.add_argument('--capacity', type=int, default=8, help='upstream concurrent requests before 429s')
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--repeat', type=float, default=0.3, help='share of prompts that repeat a popular one')
+    args = parser.parse_args()
+
+    random.seed(7)
+    prompts = [f"task {random.randrange(5)}" if random.random() < args.repeat else f"task {i}" for i in range(args.requests)]
+    print(f"{args.requests} requests, {args.concurrency} concurrent, quota {args.quota}/s, capacity {args.capacity}")
+
+    fake = FakeGemini(args.quota, args.capacity, args.latency)
+    run('raw', fake.generate, prompts, args.concurrency, fake)
+
+    time.sleep(1.0)
+    fake = FakeGemini(args.quota, args.capacity, args.latency)
+    client = AIClient(rate=args.quota * 0.9, burst=args.capacity, max_concurrent=args.capacity, queue_timeout=10.0,
+                      breaker=CircuitBreaker(threshold=10, reset_after=2.0))
+    run('AIClient', lambda prompt: client.call(lambda: fake.generate(prompt), key=prompt), prompts, args.concurrency, fake)
+    print(f"             {client.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Cold start of app.py (the serverless entry point): import time, first /login response, and
+which top-level packages the import time goes to.
+
+Each run is a fresh interpreter with `python -X importtime`. The "eager" row pre-imports the
+SDKs app.py used to import at module level, so the difference is what lazy startup saves:
+
+    python benchmarks/cold_start.py [--runs 5] [--top 8]
+
+With EAGER_INIT=1 and real credentials, app.py also creates its clients at import time,
+which adds the Firebase/Gemini setup on top of these numbers.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+EAGER_SDKS = ['firebase_admin.firestore', 'firebase_admin.auth', 'google.generativeai',
+              'google_auth_oauthlib.flow', 'googleapiclient.discovery', 'numpy']
+
+PROBE = """
+import importlib.util, json, sys, time
+started = time.perf_counter()
+for name in {preload!r}:
+    importlib.import_module(name)
+spec = importlib.util.spec_from_file_location('lifeos_main', 'app.py')
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+response = module.app.test_client().get('/login')
+first = time.perf_counter()
+print(json.dumps({{'import_ms': (imported - started) * 1000, 'first_request_ms': (first - imported) * 1000, 'status': response.status_code}}))
+"""
+
+
+def probe(preload):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE.format(preload=preload)],
+                            cwd=ROOT, capture_output=True, text=True, env={**os.environ, 'EAGER_INIT': ''})
+    if result.returncode != 0:
+        raise SystemExit(result.stderr[-2000:])
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    packages = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.startswith('   '):
+            continue  # nested import, already counted in its parent's cumulative time
+        packages[name.strip().split('.')[0]] += int(cumulative) / 1000
+    return timings, packages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    args = parser.parse_args()
+
+    for label, preload in (('lazy (default)', []), ('eager SDK imports', EAGER_SDKS)):
+        runs = [probe(preload) for _ in range(args.runs)]
+        import_ms = statistics.median(t['import_ms'] for t, _ in runs)
+        first_ms = statistics.median(t['first_request_ms'] for t, _ in runs)
+        print(f"{label:<20} import {import_ms:7.1f} ms   first /login {first_ms:6.1f} ms   (median of {args.runs})")
+        packages = defaultdict(list)
+        for _, breakdown in runs:
+            for name, ms in breakdown.items():
+                packages[name].append(ms)
+        for name, samples in sorted(packages.items(), key=lambda item: -statistics.median(item[1]))[:args.top]:
+            print(f"    {name:<28} {statistics.median(samples):7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
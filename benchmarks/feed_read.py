@@ -0,0 +1,103 @@
+"""Feed read latency: the old global scan of `social` vs FeedService.read on fan-out buckets.
+
+Publishes posts through FeedService (fan-out on write, plus a few high-fan-out authors whose
+posts are merged at read time) into the in-memory Firestore stand-in from load_test.py, then
+times the first and a later page for one viewer against streaming every post newest first,
+as social.index used to. The stand-in has no indexes, so the `in` query on `social` for the
+high-fan-out authors still scans in memory; the scan row shows what a full read costs:
+
+    python benchmarks/feed_read.py [--posts 10000 1000000] [--reads 20] [--latency 0]
+
+The 1M row takes about seven minutes (seeding through publish, then unindexed scans); pass
+--posts 10000 for a quick run.
+
+Each read also checks that paging through the feed returns the same posts as the scan.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from google.cloud import firestore
+
+from app.services.feed import FeedService
+from load_test import MemoryFirestore
+
+AUTHORS = 1_000
+VIEWERS = 20
+FOLLOWING = 50
+HIGH_FANOUT = 3
+PAGE = 20
+PAGES = 3
+
+
+def build(total_posts, latency):
+    db = MemoryFirestore({}, 0.0)
+    authors = [f"author{i}" for i in range(AUTHORS)]
+    high_fanout = authors[:HIGH_FANOUT]
+    for i in range(VIEWERS):
+        db.collection('users').document(f"viewer{i}").set({'friends': high_fanout + random.sample(authors[HIGH_FANOUT:], FOLLOWING)})
+    for author in high_fanout:
+        db.collection('feed_authors').document(author).set({'high_fanout': True})
+
+    service = FeedService(fanout_limit=VIEWERS)
+    for i in range(total_posts):
+        service.publish(db, {'user_id': random.choice(authors), 'content': 'update', 'post_type': 'update', 'created_at': float(i)})
+    service._pool.shutdown(wait=True)
+    db.latency = latency
+    return db, service
+
+
+def scan_read(db, viewer_id):
+    # Old social.index: stream every post, newest first, and keep the ones the viewer follows.
+    friends = set(db.collection('users').document(viewer_id).get().to_dict()['friends'])
+    posts = db.collection('social').order_by('created_at', direction=firestore.Query.DESCENDING).stream()
+    return [doc.id for doc in posts if doc.to_dict()['user_id'] in friends]
+
+
+def feed_pages(db, service, viewer_id):
+    ids, cursor = [], None
+    for _ in range(PAGES):
+        items, cursor = service.read(db, viewer_id, limit=PAGE, cursor=cursor)
+        ids += [item['id'] for item in items]
+        if cursor is None:
+            break
+    return ids, cursor
+
+
+def timed(reads, fn, *args):
+    samples = []
+    for _ in range(reads):
+        started = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--reads', type=int, default=20, help='timed reads per row')
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated seconds per Firestore query')
+    args = parser.parse_args()
+
+    random.seed(7)
+    print(f"{'posts':>8} {'scan p50 ms':>12} {'page 1 p50 ms':>14} {f'page {PAGES} p50 ms':>14}  pages match scan")
+    for total in args.posts:
+        db, service = build(total, args.latency)
+        viewer = 'viewer0'
+        ids, _ = feed_pages(db, service, viewer)
+        _, page_cursor = service.read(db, viewer, limit=PAGE)
+        for _ in range(PAGES - 2):
+            _, page_cursor = service.read(db, viewer, limit=PAGE, cursor=page_cursor)
+        print(f"{total:>8} {timed(args.reads, scan_read, db, viewer):>12.2f} {timed(args.reads, service.read, db, viewer, PAGE):>14.2f} "
+              f"{timed(args.reads, service.read, db, viewer, PAGE, page_cursor):>14.2f}  {ids == scan_read(db, viewer)[:len(ids)]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""Dashboard throughput through the ASGI entry point, driven by concurrent ASGI clients.
+
+Each row sends GET / requests straight into an ASGI application (no sockets) from
+`--concurrency` clients on one event loop, the way uvicorn would:
+
+- asgiref's plain WsgiToAsgi, which runs every request on one shared thread;
+- asgi.py's threaded adapter with the sync Firestore client and with an AsyncClient;
+- the real `asgi.application`, built from the environment with the SQLite backend.
+
+Firestore is an in-memory stand-in that sleeps LATENCY seconds per query (time.sleep
+for the sync client, asyncio.sleep for the async one), so no credentials or emulator
+are needed:
+
+    python benchmarks/load_test.py [--requests 400] [--concurrency 16] [--latency 0.03]
+
+To load-test a real deployment instead, point any HTTP load tool at
+`uvicorn asgi:application` with ASYNC_FIRESTORE=1 and the Firestore emulator
+(FIRESTORE_EMULATOR_HOST) running.
+"""
+import argparse
+import asyncio
+import itertools
+import operator
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask_login import UserMixin
+
+USER_ID = 'bench-user'
+
+
+OPS = {'==': operator.eq, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+       'in': lambda field, values: field in values, 'array_contains': lambda field, value: value in (field or [])}
+
+
+class Snapshot:
+    def __init__(self, doc_id, data):
+        self.id, self._data = doc_id, data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class DocumentRef:
+    def __init__(self, store, path, doc_id):
+        self.store, self.path, self.id = store, path, doc_id
+
+    def collection(self, name):
+        return self.store.collection(f"{self.path}/{self.id}/{name}")
+
+    def get(self, field_paths=None):
+        return Snapshot(self.id, self.store.docs.get(self.path, {}).get(self.id))
+
+    def set(self, data, merge=False):
+        docs = self.store.docs.setdefault(self.path, {})
+        docs[self.id] = {**docs.get(self.id, {}), **data} if merge else dict(data)
+
+
+class Batch:
+    def __init__(self):
+        self.writes = []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((ref, data, merge))
+
+    def commit(self):
+        for ref, data, merge in self.writes:
+            ref.set(data, merge=merge)
+
+
+class Query:
+    """The collection/query subset the dashboard and FeedService use: where (==, ranges, in,
+    array_contains), order_by (incl. __name__), start_after, limit, select and stream."""
+
+    def __init__(self, store, name, filters=(), order=(), limit=None, after=None):
+        self.store, self.name, self.filters, self.order, self._limit, self._after = store, name, filters, order, limit, after
+
+    def _with(self, **changes):
+        state = {'filters': self.filters, 'order': self.order, 'limit': self._limit, 'after': self._after, **changes}
+        return type(self)(self.store, self.name, **state)
+
+    def document(self, doc_id):
+        return DocumentRef(self.store, self.name, doc_id)
+
+    def add(self, data):
+        ref = self.document(f"d{next(self.store.ids)}")
+        ref.set(data)
+        return None, ref
+
+    def where(self, field, op, value):
+        return self._with(filters=self.filters + ((field, OPS[op], value),))
+
+    def order_by(self, field, direction='ASCENDING'):
+        return self._with(order=self.order + ((field, direction == 'DESCENDING'),))
+
+    def start_after(self, values):
+        return self._with(after=tuple(getattr(values[f], 'id', values[f]) for f, _ in self.order))
+
+    def limit(self, count):
+        return self._with(limit=count)
+
+    def select(self, fields):
+        return self
+
+    def _key(self, doc_id, data):
+        return tuple(doc_id if f == '__name__' else data.get(f) for f, _ in self.order)
+
+    def _is_after(self, key):
+        for (_, descending), value, bound in zip(self.order, key, self._after):
+            if value != bound:
+                return value < bound if descending else value > bound
+        return False
+
+    def _rows(self):
+        rows = [(doc_id, data) for doc_id, data in self.store.docs.get(self.name, {}).items()
+                if all(op(data.get(f), v) for f, op, v in self.filters)]
+        for field, descending in reversed(self.order):
+            rows.sort(key=lambda row: row[0] if field == '__name__' else row[1].get(field), reverse=descending)
+        if self._after is not None:
+            rows = [row for row in rows if self._is_after(self._key(*row))]
+        return [Snapshot(doc_id, data) for doc_id, data in rows[:self._limit]]
+
+    def stream(self):
+        time.sleep(self.store.latency)
+        return iter(self._rows())
+
+
+class AsyncQuery(Query):
+    async def stream(self):
+        await asyncio.sleep(self.store.latency)
+        for snapshot in self._rows():
+            yield snapshot
+
+
+class MemoryFirestore:
+    def __init__(self, docs, latency, asynchronous=False):
+        self.docs, self.latency, self.asynchronous = docs, latency, asynchronous
+        self.ids = itertools.count()
+
+    def collection(self, name):
+        return (AsyncQuery if self.asynchronous else Query)(self, name)
+
+    def batch(self):
+        return Batch()
+
+
+class BenchUser(UserMixin):
+    id, username = USER_ID, 'bench'
+
+
+def seed():
+    now = datetime.now(timezone.utc)
+    return {
+        'health_metrics': {f"m{i}": {'user_id': USER_ID, 'metric_type': 'heart_rate', 'value': 60 + i % 20, 'unit': 'bpm',
+                                     'recorded_at': now - timedelta(hours=i)} for i in range(50)},
+        'tasks': {f"t{i}": {'user_id': USER_ID, 'title': f"Task {i}", 'status': 'pending', 'priority': 'medium',
+                            'due_date': now + timedelta(days=i)} for i in range(20)},
+        'fitness': {f"f{i}": {'user_id': USER_ID, 'activity_type': 'run', 'duration_minutes': 30, 'calories_burned': 300,
+                              'performed_at': now - timedelta(days=i)} for i in range(20)},
+    }
+
+
+async def asgi_get(application, path, cookie):
+    """One GET through an ASGI application; returns the response status."""
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+             'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+             'headers': [(b'host', b'bench.local'), (b'cookie', cookie.encode())],
+             'client': ('127.0.0.1', 50000), 'server': ('bench.local', 80)}
+    received, status = False, None
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await asyncio.Event().wait()  # the client never disconnects
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    return status
+
+
+def session_cookie(flask_app, user_id):
+    signed = flask_app.session_interface.get_signing_serializer(flask_app).dumps({'_user_id': str(user_id)})
+    return f"{flask_app.config['SESSION_COOKIE_NAME']}={signed}"
+
+
+def run(label, application, flask_app, total, concurrency, user_id=USER_ID):
+    cookie = session_cookie(flask_app, user_id)
+
+    async def clients():
+        pending, statuses = iter(range(total)), []
+
+        async def client():
+            for _ in pending:
+                statuses.append(await asgi_get(application, '/', cookie))
+
+        await asyncio.gather(*(asgi_get(application, '/', cookie) for _ in range(concurrency)))  # warm up
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return statuses, time.perf_counter() - started
+
+    statuses, elapsed = asyncio.run(clients())
+    errors = sum(status != 200 for status in statuses)
+    print(f"{label:<34} {total / elapsed:8.1f} req/s   {elapsed / total * 1000 * concurrency:7.1f} ms/req   errors={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.03, help='simulated seconds per Firestore query')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ.update(STORAGE_BACKEND='sql', DATABASE_URL=f"sqlite:///{tmp}/bench.db", FLASK_CONFIG='development')
+    from asgiref.wsgi import WsgiToAsgi
+    import asgi
+    from app import create_app, load_user, login_manager
+    from dashboard_loader import dashboard_loader
+
+    dashboard_loader.ttl = 0
+    docs = seed()
+    firestore_app = lambda **clients: create_app('development', STORAGE_BACKEND='firestore', **clients)
+
+    print(f"{args.requests} dashboard requests, {args.concurrency} concurrent clients, {args.latency * 1000:.0f} ms per query")
+    login_manager.user_loader(lambda user_id: BenchUser() if user_id == USER_ID else None)
+    app = firestore_app(firestore_db=MemoryFirestore(docs, args.latency))
+    run('WsgiToAsgi (one thread), sync', WsgiToAsgi(app), app, args.requests, args.concurrency)
+    run('asgi.py threaded, sync client', asgi.create_application(app), app, args.requests, args.concurrency)
+    app = firestore_app(firestore_db=MemoryFirestore(docs, args.latency), async_db=MemoryFirestore(docs, args.latency, asynchronous=True))
+    run('asgi.py threaded, AsyncClient', asgi.create_application(app), app, args.requests, args.concurrency)
+
+    app = asgi.application.wsgi_application
+    repos = app.config['repos']
+    with app.app_context():
+        user_id = repos.users.add({'username': 'bench', 'email': 'bench@example.com', 'password_hash': '-'})
+        for collection, repo in (('health_metrics', repos.metrics), ('tasks', repos.tasks), ('fitness', repos.fitness)):
+            for doc in docs[collection].values():
+                repo.add({**doc, 'user_id': user_id})
+    login_manager.user_loader(load_user)
+    run('asgi.application, SQLite file', asgi.application, app, args.requests, args.concurrency, user_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Login throughput: password checks inline on request threads vs the PasswordHasher process pool.
+
+Each "login" is one check_password_hash against a stored hash. A side thread
+ticks every 5 ms while the logins run; its worst delay shows how long other
+requests in the same worker would stall:
+
+    python benchmarks/password_hashing.py [--logins 64] [--concurrency 16] [--method scrypt:32768:8:1]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from werkzeug.security import check_password_hash, generate_password_hash
+from app.services.passwords import PasswordHasher
+
+PASSWORD = 'correct horse battery staple'
+
+
+class TickMonitor(threading.Thread):
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self.interval, self.worst, self._done = interval, 0.0, threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            started = time.perf_counter()
+            time.sleep(self.interval)
+            self.worst = max(self.worst, time.perf_counter() - started - self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def run(label, check, stored, logins, concurrency, cores):
+    monitor = TickMonitor()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: check(stored, PASSWORD), range(min(concurrency, logins))))
+        monitor.start()
+        started = time.perf_counter()
+        ok = sum(pool.map(lambda _: check(stored, PASSWORD), range(logins)))
+        elapsed = time.perf_counter() - started
+    monitor.stop()
+    rate = logins / elapsed
+    print(f"{label:<26} {rate:8.1f} logins/s   {rate / cores:7.1f} per core   worst tick stall {monitor.worst * 1000:7.1f} ms   ok={ok}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--method', default='scrypt:32768:8:1', help='werkzeug hash spec, e.g. pbkdf2:sha256:600000')
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    stored = generate_password_hash(PASSWORD, args.method)
+    print(f"{args.logins} logins, {args.concurrency} concurrent, {args.method}, {cores} cores")
+    run('inline (request threads)', check_password_hash, stored, args.logins, args.concurrency, cores)
+    hasher = PasswordHasher(method=args.method, workers=cores, max_pending=args.concurrency)
+    try:
+        run('PasswordHasher pool', hasher.verify, stored, args.logins, args.concurrency, cores)
+    finally:
+        hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,19 @@ class Config:
     AI_ENABLED = bool(os.environ.get('GEMINI_API_KEY'))
     ITEMS_PER_PAGE = 20
     FIREBASE_CREDENTIALS = os.environ.get('FIREBASE_CREDENTIALS', 'firebase-credentials.json')
+    CHAT_SESSION_MAX = int(os.environ.get('CHAT_SESSION_MAX', 500))
+    CHAT_HISTORY_TOKEN_LIMIT = int(os.environ.get('CHAT_HISTORY_TOKEN_LIMIT', 3000))
+    CHAT_SPILL_DIR = os.environ.get('CHAT_SPILL_DIR')
+    HEALTH_ANALYSIS_WINDOW = int(os.environ.get('HEALTH_ANALYSIS_WINDOW', 100))
+    HEALTH_ANALYSIS_CACHE_SIZE = int(os.environ.get('HEALTH_ANALYSIS_CACHE_SIZE', 1000))
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None  # None = one per core
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 64))
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'firestore')  # firestore | sql
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(basedir, 'lifeos.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    IMPORT_MAX_BYTES = int(os.environ.get('IMPORT_MAX_BYTES', 50 * 1024 * 1024))
+    ASYNC_FIRESTORE = os.environ.get('ASYNC_FIRESTORE', '').lower() in ('1', 'true', 'yes')  # for the asgi.py deployment
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class DashboardLoader:
+    """Runs a dashboard's independent queries concurrently and caches the result per user.
+
+    A query that errors or misses the shared timeout gets its default value and is
+    listed under `partial`; partial results are not cached. A query that timed out keeps
+    its worker until it returns, so at most `max_pending` queries (running or queued) are
+    in flight across all loads; past that, queries are skipped as partial instead of
+    queueing behind stuck ones.
+    """
+
+    def __init__(self, workers=8, timeout=2.0, ttl=30, max_entries=5000, max_pending=None):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_pending = max_pending or workers * 2
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._pending = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _submit(self, fn):
+        """A future for fn, or None when max_pending queries are already in flight."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return None
+            self._pending += 1
+        future = self._pool.submit(fn)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def load(self, user_id, queries, defaults=None):
+        """queries maps a view-model key to a zero-argument callable; defaults fills in for failed ones."""
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+        futures = {name: self._submit(fn) for name, fn in queries.items()}
+        done, _ = wait([future for future in futures.values() if future], timeout=self.timeout)
+        result, partial = {}, []
+        for name, future in futures.items():
+            if future in done and future.exception() is None:
+                result[name] = future.result()
+            else:
+                if future:
+                    future.cancel()
+                partial.append(name)
+                result[name] = (defaults or {}).get(name, [])
+                reason = 'loader saturated' if future is None else future.exception() if future in done else 'timeout'
+                print(f"⚠️ Dashboard query '{name}' failed or timed out: {reason}")
+        result['partial'] = partial
+        if not partial:
+            self._store(user_id, result)
+        return result
+
+    def _store(self, user_id, result):
+        with self._lock:
+            now = time.monotonic()
+            if len(self._cache) >= self.max_entries:
+                self._cache = {uid: entry for uid, entry in self._cache.items() if entry[0] > now}
+            self._cache[user_id] = (now + self.ttl, result)
+
+    async def load_async(self, user_id, queries, defaults=None):
+        """Same contract as load(), but queries map to zero-argument coroutine functions run on the event loop."""
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+        names = list(queries)
+        outcomes = await asyncio.gather(*(asyncio.wait_for(queries[name](), self.timeout) for name in names), return_exceptions=True)
+        result, partial = {}, []
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, BaseException):
+                partial.append(name)
+                result[name] = (defaults or {}).get(name, [])
+                print(f"⚠️ Dashboard query '{name}' failed or timed out: {outcome!r}")
+            else:
+                result[name] = outcome
+        result['partial'] = partial
+        if not partial:
+            self._store(user_id, result)
+        return result
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+
+dashboard_loader = DashboardLoader()
@@ -0,0 +1,323 @@
+import contextlib
+import datetime
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+DAY_MS = 86400000
+BACKFILL_DAYS = 30
+STEP_SOURCE = "derived:com.google.step_count.delta:com.google.android.gms:estimated_steps"
+BATCH_SIZE = 50
+
+
+def day_start(dt):
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def to_ms(dt):
+    return int(dt.timestamp() * 1000)
+
+
+def parse_buckets(response):
+    """Turns an aggregate response into {'YYYY-MM-DD': {'steps': int, 'calories': int}}."""
+    days = {}
+    for bucket in response.get('bucket', []):
+        day = datetime.datetime.fromtimestamp(int(bucket['startTimeMillis']) / 1000.0).strftime('%Y-%m-%d')
+        totals = days.setdefault(day, {'steps': 0, 'calories': 0})
+        for dataset in bucket['dataset']:
+            for point in dataset['point']:
+                if point.get('value'):
+                    val = point['value'][0]
+                    if 'intVal' in val: totals['steps'] += val['intVal']
+                    if 'fpVal' in val: totals['calories'] += int(val['fpVal'])
+    return days
+
+
+def aggregate_body(start_ms, end_ms):
+    return {"aggregateBy": [{"dataSourceId": STEP_SOURCE}, {"dataTypeName": "com.google.calories.expended"}], "bucketByTime": {"durationMillis": DAY_MS}, "startTimeMillis": start_ms, "endTimeMillis": end_ms}
+
+
+def default_http(timeout=30):
+    import httplib2
+    return httplib2.Http(timeout=timeout)
+
+
+class HttpPool:
+    """Keep-alive httplib2 connections shared by every Fit user.
+
+    httplib2.Http isn't thread-safe, so each call checks one out and returns it afterwards; at
+    most `size` are open at once. Pass `http_factory` (e.g. googleapiclient.http.HttpMockSequence)
+    to run offline.
+    """
+
+    def __init__(self, size=8, http_factory=default_http):
+        self.http_factory = http_factory
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextlib.contextmanager
+    def connection(self):
+        with self._slots:
+            try:
+                http = self._idle.get_nowait()
+            except queue.Empty:
+                http = self.http_factory()
+            try:
+                yield http
+            finally:
+                self._idle.put(http)
+
+
+class FitClientFactory:
+    """Builds a GoogleFitClient per stored connection without rebuilding the API client each time.
+
+    The fitness v1 discovery document is read once from the static copy bundled with
+    google-api-python-client (or `discovery_path`) and the service object is shared; every call
+    runs on a pooled connection with the user's own credentials. aggregate_many() sends the
+    aggregate calls of several users as HTTP batch requests.
+    """
+
+    def __init__(self, client_id=None, client_secret=None, discovery_path=None, pool=None, batch_size=BATCH_SIZE):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.discovery_path = discovery_path
+        self.pool = pool or HttpPool()
+        self.batch_size = batch_size
+        self._service = None
+        self._lock = threading.Lock()
+
+    @property
+    def service(self):
+        with self._lock:
+            if self._service is None:
+                from googleapiclient.discovery import build_from_document
+                from googleapiclient.discovery_cache import DISCOVERY_DOC_DIR
+                with open(self.discovery_path or os.path.join(DISCOVERY_DOC_DIR, 'fitness.v1.json')) as f:
+                    # The service's own http is never used: requests get a pooled, authorized one.
+                    self._service = build_from_document(f.read(), http=default_http())
+            return self._service
+
+    def credentials(self, conn):
+        from google.oauth2.credentials import Credentials
+        expiry = datetime.datetime.fromisoformat(conn['expiry']) if conn.get('expiry') else None
+        return Credentials(conn['token'], refresh_token=conn.get('refresh_token'), token_uri=conn['token_uri'],
+                           client_id=self.client_id, client_secret=self.client_secret, scopes=conn.get('scopes'), expiry=expiry)
+
+    def __call__(self, conn):
+        return GoogleFitClient(self.credentials(conn), self)
+
+    def request(self, credentials, start_ms, end_ms, http):
+        from google_auth_httplib2 import AuthorizedHttp
+        request = self.service.users().dataset().aggregate(userId="me", body=aggregate_body(start_ms, end_ms))
+        request.http = AuthorizedHttp(credentials, http=http)
+        return request
+
+    def aggregate_many(self, windows, on_credentials=None):
+        """{key: (conn, start_ms, end_ms)} -> {key: aggregate response, or the exception it failed with}.
+
+        on_credentials(key, credentials) is called for every key afterwards, so tokens refreshed
+        during the calls can be stored."""
+        results = {}
+        items = list(windows.items())
+        for i in range(0, len(items), self.batch_size):
+            chunk = items[i:i + self.batch_size]
+            credentials = {key: self.credentials(conn) for key, (conn, _, _) in chunk}
+            try:
+                with self.pool.connection() as http:
+                    batch = self.service.new_batch_http_request(callback=lambda key, response, error: results.__setitem__(key, error or response))
+                    for key, (conn, start_ms, end_ms) in chunk:
+                        batch.add(self.request(credentials[key], start_ms, end_ms, http), request_id=key)
+                    batch.execute(http=http)
+            except Exception:
+                # e.g. one user's token failing to refresh aborts the whole batch; retry the rest one by one
+                for key, (conn, start_ms, end_ms) in chunk:
+                    if key not in results:
+                        try:
+                            results[key] = GoogleFitClient(credentials[key], self).aggregate(start_ms, end_ms)
+                        except Exception as e:
+                            results[key] = e
+            if on_credentials:
+                for key, creds in credentials.items():
+                    on_credentials(key, creds)
+        return results
+
+
+class GoogleFitClient:
+    def __init__(self, credentials, factory):
+        self.credentials = credentials
+        self.factory = factory
+
+    def aggregate(self, start_ms, end_ms):
+        with self.factory.pool.connection() as http:
+            return self.factory.request(self.credentials, start_ms, end_ms, http).execute()
+
+
+class StubFitClient:
+    """Offline stand-in that returns deterministic daily buckets; set FIT_CLIENT=stub to use it."""
+
+    def __init__(self, credentials=None, steps_per_day=8000, calories_per_day=2100):
+        self.steps_per_day = steps_per_day
+        self.calories_per_day = calories_per_day
+        self.calls = []
+
+    def aggregate(self, start_ms, end_ms):
+        self.calls.append((start_ms, end_ms))
+        buckets = []
+        for start in range(start_ms, end_ms, DAY_MS):
+            offset = (start // DAY_MS) % 7
+            buckets.append({"startTimeMillis": str(start), "endTimeMillis": str(min(start + DAY_MS, end_ms)), "dataset": [
+                {"point": [{"value": [{"intVal": self.steps_per_day + offset * 500}]}]},
+                {"point": [{"value": [{"fpVal": float(self.calories_per_day + offset * 40)}]}]},
+            ]})
+        return {"bucket": buckets}
+
+
+class FitSyncEngine:
+    """Pulls only the Fit buckets newer than each user's high-water mark into the history store.
+
+    Connections live in fit_connections/{uid} (OAuth tokens plus `synced_until_ms`). The
+    high-water mark is the start of the last synced day, because that day may still be
+    accumulating and has to be fetched again next time. When the client factory has
+    aggregate_many() (FitClientFactory), sync_all() fetches every user in HTTP batches.
+    """
+
+    def __init__(self, db, store, client_factory, on_synced=None, workers=4):
+        self.db = db
+        self.store = store
+        self.client_factory = client_factory
+        self.on_synced = on_synced
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def connect(self, uid, credentials):
+        self.db.collection('fit_connections').document(uid).set({
+            "token": credentials.token, "refresh_token": credentials.refresh_token,
+            "expiry": credentials.expiry.isoformat() if credentials.expiry else None,
+            "token_uri": credentials.token_uri, "scopes": list(credentials.scopes or []),
+            "synced_until_ms": None,
+        })
+
+    def save_credentials(self, uid, conn, credentials):
+        """Stores a token the client refreshed during a sync, so the next sync reuses it instead of
+        refreshing again, and a rotated refresh token isn't lost."""
+        if credentials is None or not credentials.token or credentials.token == conn.get('token'):
+            return
+        update = {"token": credentials.token, "expiry": credentials.expiry.isoformat() if credentials.expiry else None}
+        if credentials.refresh_token and credentials.refresh_token != conn.get('refresh_token'):
+            update["refresh_token"] = credentials.refresh_token
+        try:
+            self.db.collection('fit_connections').document(uid).update(update)
+        except Exception as e:
+            print(f"⚠️ Could not store refreshed Fit token for {uid}: {e}")
+
+    def disconnect(self, uid):
+        self.db.collection('fit_connections').document(uid).delete()
+        self.store.clear(uid)
+
+    def start_ms(self, conn, now):
+        return conn.get('synced_until_ms') or to_ms(day_start(now) - datetime.timedelta(days=BACKFILL_DAYS - 1))
+
+    def sync_user(self, uid, now=None):
+        conn = self.db.collection('fit_connections').document(uid).get().to_dict()
+        if not conn:
+            return None
+        now = now or datetime.datetime.now()
+        client = self.client_factory(conn)
+        try:
+            response = client.aggregate(self.start_ms(conn, now), to_ms(now))
+        finally:
+            self.save_credentials(uid, conn, getattr(client, 'credentials', None))
+        return self.record(uid, parse_buckets(response), now)
+
+    def record(self, uid, days, now):
+        if days:
+            self.store.merge(uid, days)
+        self.db.collection('fit_connections').document(uid).update({"synced_until_ms": to_ms(day_start(now)), "last_synced_at": now.isoformat()})
+        if self.on_synced:
+            self.on_synced(uid, now)
+        return days
+
+    def sync_async(self, uid):
+        return self.pool.submit(self._safe_sync, uid)
+
+    def _safe_sync(self, uid):
+        try:
+            return self.sync_user(uid)
+        except Exception as e:
+            print(f"❌ Fit sync failed for {uid}: {e}")
+
+    def sync_all(self):
+        if not hasattr(self.client_factory, 'aggregate_many'):
+            uids = [doc.id for doc in self.db.collection('fit_connections').select([]).stream()]
+            for future in [self.sync_async(uid) for uid in uids]:
+                future.result()
+            return len(uids)
+
+        now = datetime.datetime.now()
+        windows = {doc.id: (conn, self.start_ms(conn, now), to_ms(now))
+                   for doc in self.db.collection('fit_connections').stream() if (conn := doc.to_dict())}
+        futures = []
+        responses = self.client_factory.aggregate_many(windows, on_credentials=lambda uid, creds: self.save_credentials(uid, windows[uid][0], creds))
+        for uid, response in responses.items():
+            if isinstance(response, Exception):
+                print(f"❌ Fit sync failed for {uid}: {response}")
+            else:
+                futures.append(self.pool.submit(self._safe_record, uid, parse_buckets(response), now))
+        for future in futures:
+            future.result()
+        return len(windows)
+
+    def _safe_record(self, uid, days, now):
+        try:
+            return self.record(uid, days, now)
+        except Exception as e:
+            print(f"❌ Fit sync failed for {uid}: {e}")
+
+
+class FitSyncScheduler:
+    """Runs engine.sync_all() every `interval` seconds on a daemon thread.
+
+    Every worker process that starts a scheduler ticks, but each round is claimed through a
+    transaction on locks/fit-sync, so only one of them syncs per interval. Without a
+    long-lived process (serverless), run `flask sync-fit` from cron instead.
+    """
+
+    def __init__(self, engine, interval):
+        self.engine = engine
+        self.interval = interval
+        self.holder = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def claim(self):
+        """True if this process takes the current round, i.e. no worker started one in the last 0.9 interval."""
+        from google.cloud import firestore
+        ref = self.engine.db.collection('locks').document('fit-sync')
+
+        @firestore.transactional
+        def run(transaction):
+            now = time.time()
+            started = (ref.get(transaction=transaction).to_dict() or {}).get('started_at', 0)
+            if now - started < self.interval * 0.9:
+                return False
+            transaction.set(ref, {'started_at': now, 'holder': self.holder})
+            return True
+
+        return run(self.engine.db.transaction())
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if self.claim():
+                    self.engine.sync_all()
+            except Exception as e:
+                print(f"❌ Scheduled Fit sync failed: {e}")
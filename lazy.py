@@ -0,0 +1,40 @@
+import importlib
+import threading
+
+_UNSET = object()
+
+
+class Lazy:
+    """Thread-safe lazy singleton: `factory` runs once, on first attribute access, and the proxy
+    forwards every attribute to its result. Lets module-level clients (db, genai, ...) be
+    declared at import time without paying for their SDK imports or network setup.
+    """
+
+    def __init__(self, factory, name=None):
+        self._factory = factory
+        self._name = name or getattr(factory, '__name__', 'lazy')
+        self._value = _UNSET
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        value = self._value
+        if value is _UNSET:
+            with self._lock:
+                if self._value is _UNSET:
+                    self._value = self._factory()
+                value = self._value
+        return value
+
+    @property
+    def resolved(self):
+        return self._value is not _UNSET
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        return f"<Lazy {self._name} {'resolved' if self.resolved else 'pending'}>"
+
+
+def lazy_import(module_name):
+    return Lazy(lambda: importlib.import_module(module_name), module_name)
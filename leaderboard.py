@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+
+PROFILE_DEFAULTS = {'name': 'Unknown User', 'level': 1, 'total_xp': 0, 'steps': 0}
+
+
+class SortedSet:
+    """Scores kept in a bisect-maintained list of (-score, member), so rank lookups are O(log n)."""
+
+    def __init__(self):
+        self.scores = {}
+        self.entries = []
+
+    def add(self, member, score):
+        if member in self.scores:
+            self.remove(member)
+        self.scores[member] = score
+        insort(self.entries, (-score, member))
+
+    def remove(self, member):
+        score = self.scores.pop(member, None)
+        if score is None:
+            return 0
+        del self.entries[bisect_left(self.entries, (-score, member))]
+        return 1
+
+    def rank(self, member):
+        score = self.scores.get(member)
+        return None if score is None else bisect_left(self.entries, (-score, member))
+
+
+class MemoryStore:
+    """In-process stand-in for the subset of the redis-py API the leaderboard uses."""
+
+    def __init__(self):
+        self._zsets, self._hashes, self._sets = {}, {}, {}
+        self._expires = {}
+        self._lock = threading.RLock()
+
+    def _zset(self, key):
+        """The sorted set at key, or an empty one if it is missing or past its expire()."""
+        if key in self._expires and self._expires[key] <= time.monotonic():
+            del self._expires[key]
+            self._zsets.pop(key, None)
+        return self._zsets.get(key, SortedSet())
+
+    def zadd(self, key, mapping, xx=False):
+        with self._lock:
+            zset = self._zset(key)
+            if key not in self._zsets and not xx:
+                zset = self._zsets[key] = SortedSet()
+            changed = 0
+            for member, score in mapping.items():
+                if not xx or member in zset.scores:
+                    zset.add(member, score)
+                    changed += 1
+            return changed
+
+    def zrem(self, key, *members):
+        with self._lock:
+            zset = self._zset(key)
+            return sum(zset.remove(m) for m in members)
+
+    def zscore(self, key, member):
+        with self._lock:
+            return self._zset(key).scores.get(member)
+
+    def zrevrank(self, key, member):
+        with self._lock:
+            return self._zset(key).rank(member)
+
+    def zrevrange(self, key, start, end, withscores=False):
+        with self._lock:
+            entries = self._zset(key).entries
+            window = entries[start:] if end == -1 else entries[start:end + 1]
+            return [(m, -s) for s, m in window] if withscores else [m for _, m in window]
+
+    def zcard(self, key):
+        with self._lock:
+            return len(self._zset(key).scores)
+
+    def hset(self, key, mapping):
+        with self._lock:
+            self._hashes.setdefault(key, {}).update(mapping)
+
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._hashes.get(key, {}))
+
+    def sadd(self, key, *members):
+        with self._lock:
+            self._sets.setdefault(key, set()).update(members)
+
+    def srem(self, key, *members):
+        with self._lock:
+            self._sets.get(key, set()).difference_update(members)
+
+    def smembers(self, key):
+        with self._lock:
+            return set(self._sets.get(key, set()))
+
+    def exists(self, key):
+        with self._lock:
+            self._zset(key)
+            return int(key in self._zsets)
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if not self.exists(key):
+                return 0
+            self._expires[key] = time.monotonic() + seconds
+            return 1
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        return []
+
+
+class Leaderboard:
+    """Materialized squad rankings: one sorted set per squad owner, scored by total_xp.
+
+    update_member only reaches squads in the same store, so with the per-process MemoryStore
+    a squad misses XP earned through other workers. Squads therefore expire `ttl` seconds
+    after they are built and are rebuilt from Firestore on the next view; with Redis shared
+    by every worker the TTL only bounds drift from writes that bypass update_member.
+    """
+
+    def __init__(self, store, ttl=300):
+        self.store = store
+        self.ttl = ttl
+
+    def has_squad(self, owner_uid):
+        return bool(self.store.exists(f"squad:{owner_uid}"))
+
+    def build_squad(self, owner_uid, members):
+        """Seeds a squad from full member profiles (the owner included)."""
+        for member in members:
+            self.add_member(owner_uid, member)
+
+    def add_member(self, owner_uid, member):
+        pipe = self.store.pipeline()
+        pipe.zadd(f"squad:{owner_uid}", {member['id']: member.get('total_xp', 0)})
+        pipe.expire(f"squad:{owner_uid}", self.ttl)
+        pipe.hset(f"profile:{member['id']}", mapping={f: member.get(f, default) for f, default in PROFILE_DEFAULTS.items()})
+        pipe.sadd(f"member_of:{member['id']}", owner_uid)
+        pipe.execute()
+
+    def remove_member(self, owner_uid, member_uid):
+        pipe = self.store.pipeline()
+        pipe.zrem(f"squad:{owner_uid}", member_uid)
+        pipe.srem(f"member_of:{member_uid}", owner_uid)
+        pipe.execute()
+
+    def update_member(self, uid, fields):
+        """Applies a profile change to every materialized squad the user belongs to."""
+        changes = {f: v for f, v in fields.items() if f in PROFILE_DEFAULTS}
+        if not changes:
+            return
+        pipe = self.store.pipeline()
+        pipe.hset(f"profile:{uid}", mapping=changes)
+        if 'total_xp' in changes:
+            for owner_uid in self.store.smembers(f"member_of:{uid}"):
+                pipe.zadd(f"squad:{owner_uid}", {uid: changes['total_xp']}, xx=True)  # never recreates an expired squad
+        pipe.execute()
+
+    def top(self, owner_uid, n):
+        ranked = self.store.zrevrange(f"squad:{owner_uid}", 0, n - 1, withscores=True)
+        return [{**self.store.hgetall(f"profile:{uid}"), "id": uid, "total_xp": int(score)} for uid, score in ranked]
+
+    def rank(self, owner_uid, uid):
+        rank = self.store.zrevrank(f"squad:{owner_uid}", uid)
+        return None if rank is None else rank + 1
+
+
+def create_store():
+    """Uses Redis when LEADERBOARD_REDIS_URL is set, otherwise a per-process in-memory store
+    (fine for a single worker; set the URL when running several workers or instances)."""
+    url = os.getenv("LEADERBOARD_REDIS_URL")
+    if url:
+        import redis
+        return redis.Redis.from_url(url, decode_responses=True)
+    return MemoryStore()
+
+
+leaderboard = Leaderboard(create_store(), ttl=int(os.getenv("LEADERBOARD_TTL", 300)))
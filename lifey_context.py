@@ -0,0 +1,103 @@
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class ContextBuilder:
+    """Builds Lifey's prompt from the user's most relevant tasks within a token budget.
+
+    Tasks that don't fit are folded into a per-user status/category summary that is
+    computed from Firestore and then kept current through record_task_change(). That only
+    sees this process's writes, so each summary is recomputed `summary_ttl` seconds after it
+    was loaded to pick up tasks changed through other workers.
+    """
+
+    def __init__(self, db, token_budget=1000, candidates=30, max_cached_users=1000, summary_ttl=300):
+        self.db = db
+        self.token_budget = token_budget
+        self.candidates = candidates
+        self.max_cached_users = max_cached_users
+        self.summary_ttl = summary_ttl
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tasks(self, uid, status, limit):
+        from firebase_admin import firestore
+        query = self.db.collection('tasks').where('user_id', '==', uid).where('status', '==', status).order_by('created_at', direction=firestore.Query.DESCENDING).limit(limit)
+        return [{"id": doc.id, **doc.to_dict()} for doc in query.stream()]
+
+    def _summary_counts(self, uid):
+        with self._lock:
+            entry = self._summaries.get(uid)
+            if entry and time.monotonic() - entry[0] < self.summary_ttl:
+                self._summaries.move_to_end(uid)
+                return Counter(entry[1])
+        query = self.db.collection('tasks').where('user_id', '==', uid).select(['status', 'category'])
+        counts = Counter((data.get('status'), data.get('category')) for data in (doc.to_dict() for doc in query.stream()))
+        with self._lock:
+            self._summaries[uid] = (time.monotonic(), counts)
+            self._summaries.move_to_end(uid)
+            while len(self._summaries) > self.max_cached_users:
+                self._summaries.popitem(last=False)
+        return Counter(counts)
+
+    def record_task_change(self, uid, before=None, after=None):
+        """Applies one task add/update/delete to the cached summary, if the user has one."""
+        with self._lock:
+            entry = self._summaries.get(uid)
+            if entry is None:
+                return
+            counts = entry[1]
+            if before:
+                counts[(before.get('status'), before.get('category'))] -= 1
+            if after:
+                counts[(after.get('status'), after.get('category'))] += 1
+
+    @staticmethod
+    def _rank(tasks, message):
+        words = set(re.findall(r'\w{3,}', (message or '').lower()))
+        def score(task):
+            overlap = len(words & set(re.findall(r'\w{3,}', (task.get('title') or '').lower())))
+            return (-overlap, task.get('due_date') or '9999-12-31')
+        return sorted(tasks, key=score)
+
+    @staticmethod
+    def _describe(counts, shown):
+        for task in shown:
+            counts[(task.get('status'), task.get('category'))] -= 1
+        parts = []
+        for status in ('Pending', 'Done'):
+            by_category = Counter({category: n for (s, category), n in counts.items() if s == status and n > 0})
+            total = sum(by_category.values())
+            if total:
+                breakdown = ", ".join(f"{category or 'General'} {n}" for category, n in by_category.most_common(4))
+                parts.append(f"{total} other {status.lower()} ({breakdown})")
+        return "; ".join(parts)
+
+    def build(self, uid, user_data, message):
+        header = f"You are 'Lifey', a strict AI Coach. Conditions: {(user_data.get('health_conditions') or '')[:400]}."
+        footer = f"Msg: {message}"
+        budget = self.token_budget - estimate_tokens(header) - estimate_tokens(footer)
+
+        pending = self._rank(self._tasks(uid, 'Pending', self.candidates), message)
+        done = self._tasks(uid, 'Done', 5)
+        lines, shown = [], []
+        for task in pending + done:
+            line = f"- {task.get('title')} ({task.get('status')}{', due ' + task['due_date'] if task.get('due_date') else ''})"
+            if estimate_tokens(line) > budget:
+                break
+            budget -= estimate_tokens(line)
+            lines.append(line)
+            shown.append(task)
+
+        summary = self._describe(self._summary_counts(uid), shown)
+        if summary and estimate_tokens(summary) <= budget:
+            lines.append(f"History: {summary}.")
+        return f"{header} Tasks:\n" + "\n".join(lines) + f"\n{footer}"
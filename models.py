@@ -1,20 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import g, has_request_context
 from flask_login import UserMixin
 
+
+class UserCache:
+    """Bounded LRU cache of user profile docs with a per-entry TTL."""
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry and entry[0] > time.monotonic():
+                self._data.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._data[user_id]
+            self.misses += 1
+            return None
+
+    def set(self, user_id, data):
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + self.ttl, data)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+        if has_request_context():
+            g.setdefault('_user_docs', {}).pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+
+user_cache = UserCache()
+
+
+def load_user_doc(user_id, db):
+    """Returns the user's Firestore doc as a dict (None if missing), read at most once per request."""
+    request_docs = g.setdefault('_user_docs', {}) if has_request_context() else {}
+    if user_id in request_docs:
+        return request_docs[user_id]
+    data = user_cache.get(user_id)
+    if data is None:
+        doc = db.collection('users').document(user_id).get()
+        data = doc.to_dict() if doc.exists else None
+        if data is not None:
+            user_cache.set(user_id, data)
+    request_docs[user_id] = data
+    return data
+
+
 class User(UserMixin):
-    def __init__(self, user_id, db):
+    def __init__(self, user_id, db, data=None):
         self.id = user_id
-        doc = db.collection('users').document(user_id).get()
-        data = doc.to_dict() if doc.exists else {}
-        
-        
+        if data is None:
+            data = load_user_doc(user_id, db) or {}
+
+
         self.name = data.get('name', 'Unknown User')
         self.email = data.get('email', '')
-        
-        
-        self.friend_id = data.get('friend_id', '') 
-        self.friends = data.get('friends', [])     
-        
-        
+
+
+        self.friend_id = data.get('friend_id', '')
+        self.friends = data.get('friends', [])
+
+
         self.level = data.get('level', 1)
         self.total_xp = data.get('total_xp', 0)
         self.is_connected = data.get('is_connected', False)
@@ -25,11 +90,12 @@ class User(UserMixin):
     @staticmethod
     def get(user_id, db):
         """Helper to fetch a user, returns None if they don't exist in DB."""
-        if db.collection('users').document(user_id).get().exists:
-            return User(user_id, db)
+        data = load_user_doc(user_id, db)
+        if data is not None:
+            return User(user_id, db, data)
         return None
-        
-    
+
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -38,5 +104,7 @@ class User(UserMixin):
             "level": self.level,
             "total_xp": self.total_xp,
             "steps": self.steps,
+            "calories": self.calories,
+            "is_connected": self.is_connected,
             "health_conditions": self.health_conditions
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,60 @@
+import json
+import threading
+import time
+from collections import deque
+from flask import Response, stream_with_context
+
+
+class LatencyStats:
+    """Rolling window of latency samples (ms) with percentile summaries."""
+
+    def __init__(self, window=500):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, ms):
+        with self._lock:
+            self._samples.append(ms)
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"count": 0, "p50_ms": None, "p95_ms": None}
+        pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))], 1)
+        return {"count": len(samples), "p50_ms": pick(0.5), "p95_ms": pick(0.95)}
+
+
+ttft_stats = LatencyStats()
+
+
+def sse_event(payload):
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def stream_reply(open_stream, started, on_complete=None, error_message="My brain is overheating! Try again in 30 seconds. 🧊"):
+    """Relays Gemini stream chunks as server-sent events and records time-to-first-token.
+
+    open_stream() returns the chunk iterator (e.g. generate_content(..., stream=True));
+    `started` is the perf_counter() value taken when the request arrived, and
+    on_complete receives the full reply text once the stream ends.
+    """
+    def generate():
+        parts = []
+        try:
+            for chunk in open_stream():
+                text = chunk.text
+                if not text:
+                    continue
+                if not parts:
+                    ttft_stats.record((time.perf_counter() - started) * 1000)
+                parts.append(text)
+                yield sse_event({"token": text})
+        except Exception as e:
+            print(f"⚠️ Stream Error: {e}")
+            yield sse_event({"error": error_message})
+        if parts and on_complete:
+            on_complete("".join(parts))
+        yield sse_event({"done": True})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
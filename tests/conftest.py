@@ -0,0 +1,231 @@
+import datetime
+import importlib.util
+import itertools
+import operator
+import os
+import sys
+import types
+
+import pytest
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud import firestore
+from google.cloud.firestore_v1.transforms import Increment
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OPS = {'==': operator.eq, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+       'in': lambda field, values: field in values, 'array_contains': lambda field, value: value in (field or [])}
+
+
+class Snapshot:
+    def __init__(self, reference, data):
+        self.reference, self.id, self._data = reference, reference.id, data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class DocumentRef:
+    def __init__(self, db, collection, doc_id):
+        self.db, self.collection_path, self.id = db, collection, doc_id
+        self.path = f"{collection}/{doc_id}"
+
+    def collection(self, name):
+        return Query(self.db, f"{self.path}/{name}")
+
+    def _docs(self):
+        return self.db.docs.setdefault(self.collection_path, {})
+
+    def get(self, field_paths=None, transaction=None):
+        data = self._docs().get(self.id)
+        if data is not None and field_paths:
+            data = {f: data[f] for f in field_paths if f in data}
+        return Snapshot(self, data)
+
+    def set(self, data, merge=False):
+        current = self._docs().get(self.id, {}) if merge else {}
+        self._docs()[self.id] = _apply(current, data, deep=True)
+
+    def update(self, data):
+        if self.id not in self._docs():
+            raise NotFound(self.path)
+        self._docs()[self.id] = _apply(self._docs()[self.id], data)
+
+    def create(self, data):
+        if self.id in self._docs():
+            raise AlreadyExists(self.path)
+        self.set(data)
+
+    def delete(self):
+        self._docs().pop(self.id, None)
+
+
+def _apply(current, data, deep=False):
+    """current with data written over it; set(merge=True) merges nested maps, update() replaces them."""
+    result = dict(current)
+    for field, value in data.items():
+        if deep and isinstance(value, dict):
+            value = _apply(result.get(field) if isinstance(result.get(field), dict) else {}, value, deep=True)
+        elif isinstance(value, Increment):
+            value = (result.get(field) or 0) + value.value
+        elif value is firestore.SERVER_TIMESTAMP:
+            value = datetime.datetime.now(datetime.timezone.utc)
+        result[field] = value
+    return result
+
+
+class Aggregate:
+    def __init__(self, value):
+        self.value = value
+
+
+class Query:
+    """The query subset the app uses: where, order_by (incl. __name__), start_after, limit, select, count."""
+
+    def __init__(self, db, path, filters=(), order=(), limit=None, after=None):
+        self.db, self.path, self.filters, self.order, self._limit, self._after = db, path, filters, order, limit, after
+
+    def _with(self, **changes):
+        state = {'filters': self.filters, 'order': self.order, 'limit': self._limit, 'after': self._after, **changes}
+        return Query(self.db, self.path, **state)
+
+    def document(self, doc_id=None):
+        return DocumentRef(self.db, self.path, doc_id or f"auto{next(self.db.ids)}")
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+    def where(self, field, op, value):
+        return self._with(filters=self.filters + ((field, OPS[op], value),))
+
+    def order_by(self, field, direction=firestore.Query.ASCENDING):
+        return self._with(order=self.order + ((field, direction == firestore.Query.DESCENDING),))
+
+    def start_after(self, values):
+        if isinstance(values, Snapshot):
+            values = {f: values.id if f == '__name__' else values.get(f) for f, _ in self.order}
+        return self._with(after=tuple(getattr(values[f], 'id', values[f]) for f, _ in self.order))
+
+    def limit(self, count):
+        return self._with(limit=count)
+
+    def select(self, fields):
+        return self
+
+    def _key(self, doc_id, data):
+        return tuple(doc_id if f == '__name__' else data.get(f) for f, _ in self.order)
+
+    def _is_after(self, key):
+        for (_, descending), value, bound in zip(self.order, key, self._after):
+            if value != bound:
+                return value < bound if descending else value > bound
+        return False
+
+    def _rows(self):
+        rows = [(doc_id, data) for doc_id, data in self.db.docs.get(self.path, {}).items()
+                if all(op(data.get(f), v) for f, op, v in self.filters)]
+        for field, descending in reversed(self.order):
+            rows.sort(key=lambda row: row[0] if field == '__name__' else row[1].get(field), reverse=descending)
+        if self._after is not None:
+            rows = [row for row in rows if self._is_after(self._key(*row))]
+        return rows[:self._limit]
+
+    def stream(self):
+        return iter([Snapshot(self.document(doc_id), dict(data)) for doc_id, data in self._rows()])
+
+    def get(self):
+        return list(self.stream())
+
+    def count(self):
+        return types.SimpleNamespace(get=lambda: [[Aggregate(len(self._rows()))]])
+
+
+class Batch:
+    def __init__(self):
+        self.writes, self.creates = [], []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append(lambda: ref.set(data, merge=merge))
+
+    def update(self, ref, data):
+        self.writes.append(lambda: ref.update(data))
+
+    def create(self, ref, data):
+        self.creates.append(ref)
+        self.writes.append(lambda: ref.create(data))
+
+    def delete(self, ref):
+        self.writes.append(ref.delete)
+
+    def commit(self):
+        """All or nothing, like Firestore: a create() of an existing doc fails the whole batch."""
+        for ref in self.creates:
+            if ref.get().exists:
+                raise AlreadyExists(ref.path)
+        for write in self.writes:
+            write()
+        self.writes, self.creates = [], []
+
+
+class Transaction(Batch):
+    def get_all(self, refs):
+        return [ref.get() for ref in refs]
+
+
+class MemoryFirestore:
+    """In-memory stand-in for the Firestore client: {collection path: {doc id: data}}."""
+
+    def __init__(self):
+        self.docs = {}
+        self.ids = itertools.count()
+
+    def collection(self, name):
+        return Query(self, name)
+
+    def batch(self):
+        return Batch()
+
+    def transaction(self):
+        return Transaction()
+
+    def get_all(self, refs, field_paths=None):
+        return [ref.get(field_paths) for ref in refs]
+
+
+def transactional(fn):
+    """firestore.transactional for Transaction: runs fn once, then commits its buffered writes."""
+    def run(transaction):
+        result = fn(transaction)
+        transaction.commit()
+        return result
+    return run
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    monkeypatch.setattr(firestore, 'transactional', transactional)
+    return MemoryFirestore()
+
+
+@pytest.fixture(scope='session')
+def monolith_module():
+    """app.py, loaded by path because the app/ package shadows it."""
+    sys.path.insert(0, ROOT)
+    spec = importlib.util.spec_from_file_location('lifeos_monolith', os.path.join(ROOT, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def monolith(monolith_module, memory_db, monkeypatch):
+    """app.py with its Firestore client swapped for memory_db."""
+    monkeypatch.setattr(monolith_module.db, '_value', memory_db)
+    monkeypatch.setattr(monolith_module.firestore, '_value', types.SimpleNamespace(Query=firestore.Query, transactional=transactional))
+    monolith_module.user_cache._data.clear()
+    return monolith_module
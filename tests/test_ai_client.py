@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from ai_client import AIClient, AIUnavailable, CircuitBreaker
+
+
+class Overloaded(Exception):
+    code = 503
+
+
+def fail():
+    raise Overloaded('down')
+
+
+def open_breaker(client):
+    with pytest.raises(AIUnavailable):
+        client.call(fail)
+    assert client.breaker.state == 'open'
+
+
+def test_trial_is_not_lost_when_the_trial_caller_is_turned_away():
+    client = AIClient(rate=1000, burst=1000, max_concurrent=1, queue_timeout=0.05, retries=0,
+                      breaker=CircuitBreaker(threshold=1, reset_after=0.1))
+    open_breaker(client)
+    time.sleep(0.15)
+    assert client.breaker.state == 'half-open'
+
+    holding, release = threading.Event(), threading.Event()
+
+    def hold_slot():
+        client._slots.acquire()
+        holding.set()
+        release.wait()
+        client._slots.release()
+
+    holder = threading.Thread(target=hold_slot)
+    holder.start()
+    holding.wait()
+    with pytest.raises(AIUnavailable):
+        client.call(lambda: 'unreachable')  # no slot: turned away before the trial is claimed
+    release.set()
+    holder.join()
+
+    assert client.call(lambda: 'ok') == 'ok'
+    assert client.breaker.state == 'closed'
+
+
+def test_failed_trial_reopens_and_a_later_trial_closes():
+    client = AIClient(rate=1000, burst=1000, retries=0, breaker=CircuitBreaker(threshold=1, reset_after=0.1))
+    open_breaker(client)
+    time.sleep(0.15)
+    with pytest.raises(AIUnavailable):
+        client.call(fail)
+    assert client.breaker.state == 'open'
+    with pytest.raises(AIUnavailable, match='temporarily unavailable'):
+        client.call(lambda: 'ok')
+    time.sleep(0.15)
+    assert client.call(lambda: 'ok') == 'ok'
+    assert client.breaker.state == 'closed'
+
+
+def test_trial_is_released_when_a_stream_is_interrupted():
+    client = AIClient(rate=1000, burst=1000, retries=0, breaker=CircuitBreaker(threshold=1, reset_after=0.1))
+    open_breaker(client)
+    time.sleep(0.15)
+
+    def broken_stream():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        list(client.stream(broken_stream))
+    assert list(client.stream(lambda: iter(['a', 'b']))) == ['a', 'b']
+    assert client.breaker.state == 'closed'
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.chat_sessions import ChatSessionStore, UserLocks
+
+
+class Part:
+    def __init__(self, text):
+        self.text = text
+
+
+class Content:
+    def __init__(self, role, text):
+        self.role, self.parts = role, [Part(text)]
+
+
+class Chat:
+    def __init__(self, history):
+        self.history = [Content(m['role'], ' '.join(m['parts'])) if isinstance(m, dict) else m for m in history]
+
+    def send_message(self, prompt):
+        self.history += [Content('user', prompt), Content('model', f"re: {prompt}")]
+        return Part(f"re: {prompt}")
+
+
+class Model:
+    def start_chat(self, history):
+        return Chat(history)
+
+    def generate_content(self, prompt):
+        return Part('SUMMARY')
+
+
+def texts(session):
+    return [content.parts[0].text for content in session.history]
+
+
+def test_context_is_resent_until_a_turn_completes():
+    store, model = ChatSessionStore(), Model()
+    with pytest.raises(RuntimeError):
+        with store.turn('u1', model) as (chat, is_new):
+            assert is_new
+            chat.send_message('half')
+            raise RuntimeError('stream dropped')
+    with store.turn('u1', model) as (chat, is_new):
+        assert is_new
+        chat.send_message('hello')
+    with store.turn('u1', model) as (chat, is_new):
+        assert not is_new
+        assert texts(chat) == ['hello', 're: hello']
+
+
+def test_failed_turns_roll_back_to_the_completed_history():
+    store, model = ChatSessionStore(), Model()
+    with store.turn('u1', model) as (chat, _):
+        chat.send_message('one')
+    with pytest.raises(RuntimeError):
+        with store.turn('u1', model) as (chat, _):
+            chat.send_message('two')
+            raise RuntimeError
+    assert texts(store.get('u1', model)[0]) == ['one', 're: one']
+
+
+def test_evicted_sessions_are_spilled_and_reloaded(tmp_path):
+    store, model = ChatSessionStore(max_sessions=1, spill_dir=str(tmp_path)), Model()
+    with store.turn('u1', model) as (chat, _):
+        chat.send_message('remember me')
+    with store.turn('u2', model) as (chat, _):
+        chat.send_message('hi')
+    session, is_new = store.get('u1', model)
+    assert not is_new
+    assert texts(session) == ['remember me', 're: remember me']
+
+
+def test_long_histories_are_summarized_keeping_recent_turns():
+    store, model = ChatSessionStore(token_limit=10, keep_messages=2), Model()
+    for i in range(4):
+        with store.turn('u1', model) as (chat, _):
+            chat.send_message(f"message number {i} " + 'x' * 40)
+    store.compact('u1', model)
+    history = texts(store.get('u1', model)[0])
+    assert history[0] == 'Summary of our earlier conversation: SUMMARY'
+    assert history[2:] == [f"message number 3 {'x' * 40}", f"re: message number 3 {'x' * 40}"]
+
+
+def test_users_do_not_wait_on_each_other_and_locks_are_dropped():
+    locks, inside = UserLocks(), []
+
+    def hold(user_id):
+        with locks.hold(user_id):
+            inside.append(user_id)
+            time.sleep(0.1)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=hold, args=(f"u{i}",)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - started < 0.4
+    assert len(locks) == 0
+
+
+def test_cancelled_async_waiters_do_not_leak_the_lock():
+    locks = UserLocks()
+
+    async def scenario():
+        held, release = asyncio.Event(), asyncio.Event()
+
+        async def holder():
+            async with locks.hold_async('u1'):
+                held.set()
+                await release.wait()
+
+        async def waiter():
+            async with locks.hold_async('u1'):
+                pass
+
+        holding = asyncio.create_task(holder())
+        await held.wait()
+        waiting = asyncio.create_task(waiter())
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        release.set()
+        await holding
+        async with locks.hold_async('u1'):
+            assert len(locks) == 1
+
+    asyncio.run(asyncio.wait_for(scenario(), 2))
+    assert len(locks) == 0
+
+
+def test_async_turns_wait_for_a_sync_holder():
+    locks, order = UserLocks(), []
+    held = threading.Event()
+
+    def sync_holder():
+        with locks.hold('u1'):
+            held.set()
+            time.sleep(0.1)
+            order.append('sync')
+
+    thread = threading.Thread(target=sync_holder)
+    thread.start()
+    held.wait()
+
+    async def turn():
+        async with locks.hold_async('u1'):
+            order.append('async')
+
+    asyncio.run(turn())
+    thread.join()
+    assert order == ['sync', 'async']
@@ -0,0 +1,74 @@
+from app.services.feed import FeedService
+
+
+def follow(db, viewer, *authors):
+    db.collection('users').document(viewer).set({'friends': list(authors)})
+
+
+def post(service, db, author, created_at):
+    return service.publish(db, {'user_id': author, 'content': f"{author} {created_at}", 'post_type': 'update', 'created_at': created_at})
+
+
+def read_all(service, db, viewer, limit):
+    ids, cursor = [], None
+    while True:
+        items, cursor = service.read(db, viewer, limit=limit, cursor=cursor)
+        ids += [item['created_at'] for item in items]
+        if cursor is None:
+            return ids
+
+
+def test_posts_are_fanned_out_to_followers(memory_db):
+    follow(memory_db, 'ann', 'bo')
+    follow(memory_db, 'cy')
+    service = FeedService(fanout_limit=10)
+    post(service, memory_db, 'bo', 1)
+    post(service, memory_db, 'cy', 2)
+    service._pool.shutdown(wait=True)
+
+    assert [i['user_id'] for i in service.read(memory_db, 'ann')[0]] == ['bo']
+    assert [i['user_id'] for i in service.read(memory_db, 'bo')[0]] == ['bo']  # own posts
+    item = service.read(memory_db, 'cy')[0][0]
+    assert item['post_id'] == item['id']
+
+
+def test_high_fanout_posts_are_merged_at_read_time_in_order(memory_db):
+    follow(memory_db, 'ann', 'star', 'bo')
+    memory_db.collection('feed_authors').document('star').set({'high_fanout': True})
+    service = FeedService(fanout_limit=10, authors_ttl=0)
+    for t in range(10):
+        post(service, memory_db, 'star' if t % 3 == 0 else 'bo', t)
+    service._pool.shutdown(wait=True)
+
+    assert {item['user_id'] for item in memory_db.docs['feeds/ann/items'].values()} == {'bo'}
+    assert read_all(service, memory_db, 'ann', limit=3) == list(range(9, -1, -1))
+    assert read_all(service, memory_db, 'ann', limit=4) == list(range(9, -1, -1))
+
+
+def test_authors_past_the_fanout_limit_are_flagged(memory_db):
+    for viewer in ('a', 'b', 'c'):
+        follow(memory_db, viewer, 'star')
+    service = FeedService(fanout_limit=2)
+    post(service, memory_db, 'star', 1)
+    service._pool.shutdown(wait=True)
+
+    assert memory_db.collection('feed_authors').document('star').get().to_dict() == {'high_fanout': True, 'followers': 3}
+    later = post(service, memory_db, 'star', 2)
+    assert memory_db.collection('social').document(later).get().to_dict()['fanout'] == 'read'
+    assert later not in memory_db.docs['feeds/a/items']
+
+
+def test_backfill_fans_out_existing_posts_once(memory_db):
+    follow(memory_db, 'ann', 'bo', 'star')
+    follow(memory_db, 'cy', 'star')
+    follow(memory_db, 'di', 'star')
+    for i, author in enumerate(['bo', 'star', 'bo']):
+        memory_db.collection('social').document(f"p{i}").set({'user_id': author, 'content': 'x', 'created_at': i})
+    service = FeedService(fanout_limit=2, authors_ttl=0)
+
+    assert service.backfill(memory_db) == (3, 5)
+    assert service.backfill(memory_db) == (3, 5)
+    assert memory_db.collection('social').document('p1').get().to_dict()['fanout'] == 'read'
+    assert memory_db.collection('feed_authors').document('star').get().to_dict()['high_fanout']
+    assert [i['id'] for i in service.read(memory_db, 'ann')[0]] == ['p2', 'p1', 'p0']
+    assert [i['id'] for i in service.read(memory_db, 'cy')[0]] == ['p1']
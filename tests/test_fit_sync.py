@@ -0,0 +1,100 @@
+import datetime
+import json
+import threading
+
+from googleapiclient.http import HttpMockSequence
+
+from fit_sync import (BACKFILL_DAYS, DAY_MS, FitClientFactory, FitSyncEngine, FitSyncScheduler, HttpPool,
+                      StubFitClient, day_start, to_ms)
+from timeseries import DailySeriesStore
+
+NOW = datetime.datetime(2026, 3, 10, 15, 30)
+CONNECTION = {'token': 'old-token', 'refresh_token': 'refresh', 'token_uri': 'https://oauth2.example/token',
+              'scopes': ['fitness'], 'synced_until_ms': None}
+
+
+class StubFactory:
+    def __init__(self):
+        self.clients = []
+
+    def __call__(self, conn):
+        client = StubFitClient(steps_per_day=1000)
+        self.clients.append(client)
+        return client
+
+
+def engine(db, factory=None):
+    db.collection('fit_connections').document('u1').set(dict(CONNECTION))
+    return FitSyncEngine(db, DailySeriesStore(db), factory or StubFactory(), workers=1)
+
+
+def test_first_sync_backfills_and_later_syncs_start_at_the_last_day(memory_db):
+    factory = StubFactory()
+    sync = engine(memory_db, factory)
+
+    days = sync.sync_user('u1', now=NOW)
+    assert len(days) == BACKFILL_DAYS
+    assert factory.clients[0].calls == [(to_ms(day_start(NOW) - datetime.timedelta(days=BACKFILL_DAYS - 1)), to_ms(NOW))]
+    assert memory_db.collection('fit_connections').document('u1').get().to_dict()['synced_until_ms'] == to_ms(day_start(NOW))
+
+    later = NOW + datetime.timedelta(days=1)
+    assert len(sync.sync_user('u1', now=later)) == 2  # today again, plus the new day
+    assert factory.clients[1].calls[0][0] == to_ms(day_start(NOW))
+    assert sync.store.daily('u1', NOW.date(), later.date())[0]['steps'] >= 1000
+
+
+def test_refreshed_tokens_are_written_back(memory_db):
+    class RefreshingClient(StubFitClient):
+        def __init__(self, conn):
+            super().__init__()
+            self.credentials = type('Credentials', (), {'token': 'new-token', 'refresh_token': 'rotated',
+                                                        'expiry': datetime.datetime(2026, 3, 10, 16, 30)})()
+
+    sync = engine(memory_db, RefreshingClient)
+    sync.sync_user('u1', now=NOW)
+    stored = memory_db.collection('fit_connections').document('u1').get().to_dict()
+    assert (stored['token'], stored['refresh_token'], stored['expiry']) == ('new-token', 'rotated', '2026-03-10T16:30:00')
+
+
+def test_only_one_scheduler_claims_each_round(memory_db):
+    sync = engine(memory_db)
+    first, second = FitSyncScheduler(sync, interval=60), FitSyncScheduler(sync, interval=60)
+    assert first.claim()
+    assert not second.claim()
+    assert not first.claim()
+    memory_db.collection('locks').document('fit-sync').update({'started_at': 0})
+    assert second.claim()
+
+
+def test_http_pool_reuses_connections_up_to_its_size():
+    made = []
+    pool = HttpPool(size=2, http_factory=lambda: made.append(object()) or made[-1])
+    with pool.connection() as first:
+        with pool.connection() as second:
+            assert first is not second
+    with pool.connection() as again:
+        assert again in (first, second)
+    assert len(made) == 2
+
+
+def test_client_factory_runs_offline_on_a_mock_transport():
+    bucket = {'startTimeMillis': str(to_ms(day_start(NOW))), 'endTimeMillis': str(to_ms(NOW)), 'dataset': [
+        {'point': [{'value': [{'intVal': 4321}]}]}, {'point': [{'value': [{'fpVal': 1800.5}]}]}]}
+    responses = [({'status': '200'}, json.dumps({'bucket': [bucket]})), ({'status': '200'}, json.dumps({'bucket': []}))]
+    transports = []
+
+    def mock_http():
+        transports.append(HttpMockSequence(list(responses)))
+        return transports[-1]
+
+    factory = FitClientFactory(client_id='id', client_secret='secret', pool=HttpPool(size=1, http_factory=mock_http))
+    connection = {**CONNECTION, 'expiry': (datetime.datetime.utcnow() + datetime.timedelta(hours=1)).isoformat()}
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(factory(connection).aggregate(0, DAY_MS))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(transports) == 1  # one pooled connection served both calls
+    assert sorted(len(r['bucket']) for r in results) == [0, 1]
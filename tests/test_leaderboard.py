@@ -0,0 +1,49 @@
+import time
+
+from leaderboard import Leaderboard, MemoryStore
+
+
+def squad(ttl=300):
+    board = Leaderboard(MemoryStore(), ttl=ttl)
+    board.build_squad('owner', [
+        {'id': 'owner', 'name': 'Owen', 'total_xp': 120},
+        {'id': 'ann', 'name': 'Ann', 'total_xp': 300},
+        {'id': 'bo', 'name': 'Bo', 'total_xp': 50},
+    ])
+    return board
+
+
+def test_top_and_rank_follow_total_xp():
+    board = squad()
+    assert [(m['id'], m['total_xp']) for m in board.top('owner', 2)] == [('ann', 300), ('owner', 120)]
+    assert board.top('owner', 1)[0]['name'] == 'Ann'
+    assert board.rank('owner', 'bo') == 3
+    assert board.rank('owner', 'nobody') is None
+
+
+def test_xp_updates_reorder_every_squad_the_member_is_in():
+    board = squad()
+    board.add_member('ann', {'id': 'ann', 'total_xp': 300})
+    board.add_member('ann', {'id': 'bo', 'total_xp': 50})
+
+    board.update_member('bo', {'total_xp': 400, 'name': 'Bobby', 'ignored': [1]})
+    assert board.rank('owner', 'bo') == 1
+    assert board.rank('ann', 'bo') == 1
+    assert board.top('owner', 1)[0]['name'] == 'Bobby'
+
+
+def test_removed_members_are_not_ranked_or_updated():
+    board = squad()
+    board.remove_member('owner', 'ann')
+    board.update_member('ann', {'total_xp': 999})
+    assert [m['id'] for m in board.top('owner', 3)] == ['owner', 'bo']
+
+
+def test_expired_squads_are_rebuilt_rather_than_updated():
+    board = squad(ttl=0.05)
+    assert board.has_squad('owner')
+    time.sleep(0.06)
+    assert not board.has_squad('owner')
+    board.update_member('ann', {'total_xp': 10})
+    assert not board.has_squad('owner')
+    assert board.top('owner', 3) == []
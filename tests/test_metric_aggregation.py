@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.services.metric_aggregation import aggregate, downsample, lttb
+
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def test_lttb_keeps_the_endpoints_and_the_spike():
+    xs = np.arange(1000, dtype=float)
+    ys = np.zeros(1000)
+    ys[437] = 50
+    selected = lttb(xs, ys, 20)
+    assert len(selected) == 20
+    assert selected[0] == 0 and selected[-1] == 999
+    assert 437 in selected
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_lttb_returns_every_point_when_there_is_nothing_to_drop():
+    xs = np.arange(10, dtype=float)
+    assert list(lttb(xs, xs, 10)) == list(range(10))
+    assert list(lttb(xs, xs, 2)) == list(range(10))
+
+
+def test_downsample_sorts_by_time_first():
+    stamps = [START + timedelta(hours=h) for h in range(100)]
+    values = [float(h % 7) for h in range(100)]
+    points = downsample(list(reversed(stamps)), list(reversed(values)), 10)
+    assert len(points) == 10
+    assert points[0] == [START.isoformat(), 0.0]
+    assert points[-1] == [stamps[-1].isoformat(), values[-1]]
+    assert [p[0] for p in points] == sorted(p[0] for p in points)
+
+
+def test_aggregate_skips_empty_buckets():
+    stamps = [START, START + timedelta(hours=1), START + timedelta(days=2)]
+    buckets = aggregate(stamps, [60, 80, 70], bucket='1d')
+    assert [(b['start'][:10], b['count'], b['mean'], b['max']) for b in buckets] == [('2026-03-01', 2, 70.0, 80.0), ('2026-03-03', 1, 70.0, 70.0)]
@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+import pytest
+from flask import Flask
+
+from app.services.pagination import BadCursor, decode_cursor, encode_cursor, page_limit, paginate
+
+
+@pytest.mark.parametrize('value', [datetime(2026, 3, 1, 8, 30, tzinfo=timezone.utc), 17, 2.5, 'b', None])
+def test_cursor_round_trips_the_order_value_and_id(value):
+    cursor = encode_cursor(value, 'doc/1')
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (value, 'doc/1')
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor(1, 'x')[:-3], 'e30'])
+def test_foreign_cursors_are_rejected(cursor):
+    with pytest.raises(BadCursor):
+        decode_cursor(cursor)
+
+
+def test_paging_breaks_ties_on_the_document_id(memory_db):
+    posts = memory_db.collection('posts')
+    for i in range(5):
+        posts.document(f"p{i}").set({'created_at': 1 if i < 3 else 2, 'body': i})
+
+    seen, cursor = [], None
+    while True:
+        items, cursor = paginate(posts, posts, 'created_at', cursor=cursor, limit=2)
+        seen += [item['id'] for item in items]
+        if cursor is None:
+            break
+    assert seen == ['p4', 'p3', 'p2', 'p1', 'p0']
+
+
+@pytest.mark.parametrize('arg, expected', [('', 20), ('5', 5), ('0', 20), ('-3', 1), ('500', 100)])
+def test_page_limit_is_clamped(arg, expected):
+    app = Flask(__name__)
+    app.config['ITEMS_PER_PAGE'] = 20
+    with app.test_request_context(f"/?limit={arg}"):
+        assert page_limit() == expected
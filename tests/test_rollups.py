@@ -0,0 +1,51 @@
+from datetime import date, datetime, timezone
+
+from app.services.rollups import accumulate, add_many_with_rollups, add_with_rollups, period_ids, read_days, read_weeks
+
+DAY = datetime(2026, 3, 4, 9, tzinfo=timezone.utc)  # a Wednesday in ISO week 10
+
+
+def test_period_ids_use_iso_weeks():
+    assert period_ids(date(2026, 1, 1)) == ['day-2026-01-01', 'week-2026-W01']
+    assert period_ids(date(2027, 1, 1)) == ['day-2027-01-01', 'week-2026-W53']
+
+
+def test_entries_increment_their_day_and_week(memory_db):
+    add_with_rollups(memory_db, 'meals', {'user_id': 'u1', 'total_calories': 500, 'protein_g': 30}, at=DAY)
+    add_with_rollups(memory_db, 'meals', {'user_id': 'u1', 'total_calories': 250}, at=DAY)
+    add_with_rollups(memory_db, 'health_metrics', {'user_id': 'u1', 'metric_type': 'Heart Rate', 'value': 60}, at=DAY)
+
+    day, = read_days(memory_db, 'u1', 1, end=DAY.date())
+    assert day['meals'] == {'count': 2, 'calories': 750, 'protein_g': 30, 'carbs_g': 0, 'fat_g': 0}
+    assert day['health'] == {'heart_rate': {'sum': 60, 'count': 1}}
+    assert read_weeks(memory_db, 'u1', 1, end=DAY.date())[0]['meals']['count'] == 2
+    assert len(memory_db.docs['meals']) == 2
+
+
+def test_missing_periods_read_back_empty_and_oldest_first(memory_db):
+    add_with_rollups(memory_db, 'fitness', {'user_id': 'u1', 'duration_minutes': 30}, at=DAY)
+    days = read_days(memory_db, 'u1', 3, end=date(2026, 3, 5))
+    assert [d['period'] for d in days] == ['day-2026-03-03', 'day-2026-03-04', 'day-2026-03-05']
+    assert days[0] == {'period': 'day-2026-03-03'}
+    assert days[1]['fitness']['minutes'] == 30
+
+
+def test_bulk_adds_count_each_doc_once_in_its_own_period(memory_db):
+    sleep = memory_db.collection('sleep_sessions')
+    docs = [{'user_id': 'u1', 'sleep_start': f"2026-03-0{d}T23:00:00", 'sleep_end': f"2026-03-0{d + 1}T07:00:00", 'sleep_quality': 8}
+            for d in (2, 3, 3)]
+    items = [(sleep.document(f"s{i}"), doc) for i, doc in enumerate(docs)]
+    sleep.document('s0').set(docs[0])  # already imported: neither written nor counted again
+
+    assert add_many_with_rollups(memory_db, 'sleep_sessions', items, 'sleep_start') == 2
+    days = read_days(memory_db, 'u1', 2, end=date(2026, 3, 3))
+    assert 'sleep' not in days[0]
+    assert days[1]['sleep'] == {'count': 2, 'minutes': 960, 'quality_sum': 16}
+
+
+def test_accumulate_matches_the_stored_increments(memory_db):
+    doc = {'user_id': 'u1', 'duration_minutes': 45, 'calories_burned': 300}
+    add_with_rollups(memory_db, 'fitness', doc, at=DAY)
+    rollup = {}
+    accumulate(rollup, 'fitness', doc)
+    assert read_days(memory_db, 'u1', 1, end=DAY.date())[0]['fitness'] == rollup['fitness']
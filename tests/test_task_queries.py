@@ -0,0 +1,26 @@
+def add_tasks(db, uid, count, status='Pending'):
+    for i in range(count):
+        db.collection('tasks').document(f"{uid}-{i}").set({'user_id': uid, 'title': f"task {i}", 'status': status, 'created_at': i})
+
+
+def test_pages_only_the_owners_tasks_newest_first(monolith, memory_db):
+    add_tasks(memory_db, 'alice', 5)
+    add_tasks(memory_db, 'bob', 3)
+
+    first, cursor = monolith.get_user_tasks('alice', limit=2)
+    assert [t['id'] for t in first] == ['alice-4', 'alice-3']
+    second, cursor = monolith.get_user_tasks('alice', limit=2, start_after=cursor)
+    assert [t['id'] for t in second] == ['alice-2', 'alice-1']
+    last, cursor = monolith.get_user_tasks('alice', limit=2, start_after=cursor)
+    assert [t['id'] for t in last] == ['alice-0']
+    assert cursor is None
+
+
+def test_counts_are_scoped_to_the_owner_and_status(monolith, memory_db):
+    add_tasks(memory_db, 'alice', 4)
+    memory_db.collection('tasks').document('done').set({'user_id': 'alice', 'status': 'Done', 'created_at': 9})
+    add_tasks(memory_db, 'bob', 3)
+
+    assert monolith.count_user_tasks('alice') == 5
+    assert monolith.count_user_tasks('alice', 'Done') == 1
+    assert monolith.count_user_tasks('bob', 'Done') == 0
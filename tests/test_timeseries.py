@@ -0,0 +1,42 @@
+import datetime
+
+from timeseries import DTYPE, MONTH_DAYS, DailySeriesStore
+
+
+def test_days_are_packed_into_one_doc_per_month(memory_db):
+    store = DailySeriesStore(memory_db)
+    store.merge('u1', {'2026-01-31': {'steps': 9000, 'calories': 2100}, '2026-02-01': {'steps': 4000}})
+
+    months = memory_db.docs['users/u1/fit_months']
+    assert sorted(months) == ['2026-01', '2026-02']
+    assert len(months['2026-01']['steps']) == MONTH_DAYS * DTYPE.itemsize
+
+
+def test_range_spans_months_and_fills_gaps_with_zero(memory_db):
+    store = DailySeriesStore(memory_db)
+    store.merge('u1', {'2026-01-30': {'steps': 100}, '2026-02-02': {'steps': 200, 'calories': 50}})
+
+    assert store.daily('u1', '2026-01-30', '2026-02-02') == [
+        {'date': '2026-01-30', 'steps': 100, 'calories': 0},
+        {'date': '2026-01-31', 'steps': 0, 'calories': 0},
+        {'date': '2026-02-01', 'steps': 0, 'calories': 0},
+        {'date': '2026-02-02', 'steps': 200, 'calories': 50},
+    ]
+
+
+def test_merge_overwrites_only_the_days_given(memory_db):
+    store = DailySeriesStore(memory_db)
+    store.merge('u1', {'2026-03-01': {'steps': 10}, '2026-03-02': {'steps': 20}})
+    store.merge('u1', {'2026-03-02': {'steps': 25}, '2026-03-03': {'steps': -5}})
+    assert [d['steps'] for d in store.daily('u1', '2026-03-01', '2026-03-03')] == [10, 25, 0]
+
+
+def test_rollups_and_rolling_means(memory_db):
+    store = DailySeriesStore(memory_db)
+    start = datetime.date(2026, 3, 2)  # a Monday
+    store.merge('u1', {(start + datetime.timedelta(days=i)).isoformat(): {'steps': 1000 * (i + 1)} for i in range(14)})
+
+    weeks = store.rollup('u1', start, start + datetime.timedelta(days=13))
+    assert [(w['period'], w['days'], w['steps_total']) for w in weeks] == [('2026-W10', 7, 28000), ('2026-W11', 7, 77000)]
+    means = store.rolling_mean('u1', start, start + datetime.timedelta(days=7), window=7)
+    assert means == [{'date': '2026-03-08', 'mean': 4000.0}, {'date': '2026-03-09', 'mean': 5000.0}]
@@ -0,0 +1,65 @@
+import pytest
+
+from unique_keys import KeyTaken, UniqueKeys, doc_id
+
+
+def new_user(db, uid):
+    return db.collection('users').document(uid)
+
+
+def test_doc_ids_normalize_and_escape_reserved_values():
+    assert doc_id('email', ' Ann@Example.com ') == 'ann@example.com'
+    assert doc_id('friend_code', 'ab12') == 'AB12'
+    assert doc_id('username', 'a/b') == 'a%2Fb'
+    assert doc_id('username', '..') == '%2E%2E'
+    assert doc_id('username', '__x__') == '%5F%5Fx%5F%5F'
+
+
+def test_signup_claims_keys_with_the_user_doc(memory_db):
+    keys = UniqueKeys(memory_db)
+    keys.create_user(new_user(memory_db, 'u1'), {'name': 'Ann'}, {'username': 'Ann', 'email': 'ann@example.com'})
+
+    assert memory_db.collection('users').document('u1').get().to_dict() == {'name': 'Ann', 'username': 'Ann', 'email': 'ann@example.com'}
+    assert keys.lookup('username', 'ANN') == 'u1'
+    with pytest.raises(KeyTaken) as taken:
+        keys.create_user(new_user(memory_db, 'u2'), {}, {'username': 'ann '})
+    assert taken.value.key == 'username'
+    assert not new_user(memory_db, 'u2').get().exists
+
+
+def test_friend_code_collisions_are_retried(memory_db):
+    keys = UniqueKeys(memory_db, attempts=3)
+    codes = iter(['AAAA', 'AAAA', 'BBBB'])
+    assert keys.create_user(new_user(memory_db, 'u1'), {}, friend_code=lambda: next(codes)) == 'AAAA'
+    assert keys.create_user(new_user(memory_db, 'u2'), {}, friend_code=lambda: next(codes)) == 'BBBB'
+    assert keys.lookup('friend_code', 'bbbb') == 'u2'
+
+
+def test_released_keys_can_be_claimed_again(memory_db):
+    keys = UniqueKeys(memory_db)
+    keys.create_user(new_user(memory_db, 'u1'), {}, {'username': 'ann'})
+    keys.release('username', 'ann', 'u2')
+    assert keys.lookup('username', 'ann') == 'u1'
+    new_user(memory_db, 'u1').update({'username': 'annie'})  # renamed, so the legacy fallback won't reclaim it
+    keys.release('username', 'ann', 'u1')
+    keys.create_user(new_user(memory_db, 'u2'), {}, {'username': 'ann'})
+    assert keys.lookup('username', 'ann') == 'u2'
+
+
+def test_legacy_users_are_found_only_while_the_fallback_is_on(memory_db):
+    memory_db.collection('users').document('old').set({'username': 'carl'})
+    assert UniqueKeys(memory_db, legacy_lookup=False).lookup('username', 'carl') is None
+    assert UniqueKeys(memory_db, legacy_lookup=True).lookup('username', 'carl') == 'old'
+    assert UniqueKeys(memory_db, legacy_lookup=False).lookup('username', 'carl') == 'old'  # claimed on the hit
+
+
+def test_backfill_claims_existing_users_and_reports_conflicts(memory_db):
+    users = memory_db.collection('users')
+    users.document('a').set({'username': 'Sam', 'email': 'sam@example.com', 'friend_id': 'X1'})
+    users.document('b').set({'username': 'sam', 'email': 'other@example.com'})
+
+    created, conflicts = UniqueKeys(memory_db).backfill()
+    assert created == 4
+    assert conflicts == [('username', 'sam', 'b')]
+    assert UniqueKeys(memory_db, legacy_lookup=False).lookup('friend_code', 'x1') == 'a'
+    assert UniqueKeys(memory_db).backfill() == (0, [('username', 'sam', 'b')])
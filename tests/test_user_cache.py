@@ -0,0 +1,89 @@
+import time
+
+from flask import Flask
+
+from models import UserCache, load_user_doc, user_cache
+
+
+class CountingDb:
+    """Counts profile reads on top of memory_db."""
+
+    def __init__(self, db):
+        self.db, self.reads = db, 0
+
+    def collection(self, name):
+        collection = self.db.collection(name)
+        counter = self
+
+        class Collection:
+            def document(self, doc_id):
+                ref = collection.document(doc_id)
+                get = ref.get
+
+                def counted_get(*args, **kwargs):
+                    counter.reads += 1
+                    return get(*args, **kwargs)
+
+                ref.get = counted_get
+                return ref
+
+        return Collection()
+
+
+def test_entries_expire_and_the_oldest_is_evicted():
+    cache = UserCache(max_size=2, ttl=0.05)
+    cache.set('a', {'name': 'A'})
+    cache.set('b', {'name': 'B'})
+    assert cache.get('a') == {'name': 'A'}
+    cache.set('c', {'name': 'C'})  # 'b' is least recently used
+    assert cache.get('b') is None
+    time.sleep(0.06)
+    assert cache.get('a') is None
+    assert cache.stats()['hits'] == 1
+
+
+def test_profile_is_read_once_per_request_and_then_served_from_the_cache(memory_db):
+    memory_db.collection('users').document('u1').set({'name': 'Ann', 'total_xp': 40})
+    db, app = CountingDb(memory_db), Flask(__name__)
+    user_cache._data.clear()
+
+    with app.test_request_context():
+        assert load_user_doc('u1', db)['name'] == 'Ann'
+        assert load_user_doc('u1', db)['name'] == 'Ann'
+    with app.test_request_context():
+        assert load_user_doc('u1', db)['total_xp'] == 40
+    assert db.reads == 1
+
+
+def test_invalidate_drops_both_the_cached_and_the_request_copy(memory_db):
+    memory_db.collection('users').document('u1').set({'name': 'Ann'})
+    db, app = CountingDb(memory_db), Flask(__name__)
+    user_cache._data.clear()
+
+    with app.test_request_context():
+        load_user_doc('u1', db)
+        memory_db.collection('users').document('u1').set({'name': 'Anna'})
+        user_cache.invalidate('u1')
+        assert load_user_doc('u1', db)['name'] == 'Anna'
+    assert db.reads == 2
+
+
+def test_completing_a_task_credits_the_committed_total_once(monolith, memory_db):
+    users, tasks = memory_db.collection('users'), memory_db.collection('tasks')
+    users.document('u1').set({'total_xp': 490, 'level': 1})
+    tasks.document('t1').set({'user_id': 'u1', 'status': 'Pending', 'xp': 20})
+    monolith.user_cache.set('u1', {'total_xp': 0, 'level': 1})  # stale profile must not be the base
+
+    task, fields = monolith.finish_task(tasks.document('t1'), 'u1')
+    assert fields == {'total_xp': 510, 'level': 2}
+    assert monolith.finish_task(tasks.document('t1'), 'u1')[1] is None
+    assert users.document('u1').get().to_dict()['total_xp'] == 510
+    assert tasks.document('t1').get().to_dict()['xp_credited'] == 20
+
+
+def test_other_users_cannot_complete_a_task(monolith, memory_db):
+    memory_db.collection('users').document('u2').set({'total_xp': 0})
+    memory_db.collection('tasks').document('t1').set({'user_id': 'u1', 'status': 'Pending', 'xp': 20})
+
+    assert monolith.finish_task(memory_db.collection('tasks').document('t1'), 'u2')[1] is None
+    assert memory_db.collection('tasks').document('t1').get().to_dict()['status'] == 'Pending'
@@ -0,0 +1,140 @@
+import threading
+
+from ai_client import AIUnavailable
+from xp_scorer import PROVISIONAL_XP, ScoreCache, XPScoringQueue, parse_scores
+
+
+class Recorder:
+    def __init__(self, expected):
+        self.saved, self.done = {}, threading.Event()
+        self.expected = expected
+
+    def __call__(self, task_id, xp):
+        self.saved[task_id] = xp
+        if len(self.saved) >= self.expected:
+            self.done.set()
+
+
+def test_parse_scores_keeps_one_allowed_value_per_task():
+    assert parse_scores("1. Laundry: 10\n2. Marathon - 100\n3. Thing: 7", 4) == [10, 100, None, None]
+
+
+def test_queued_titles_are_scored_together():
+    calls, recorder = [], Recorder(3)
+
+    def score_batch(titles):
+        calls.append(list(titles))
+        return [20] * len(titles)
+
+    queue = XPScoringQueue(score_batch, recorder, workers=1, max_batch=10, batch_wait=0.2)
+    for task_id in ('a', 'b', 'c'):
+        assert queue.submit(task_id, f"Task {task_id}")
+    assert recorder.done.wait(2)
+    assert recorder.saved == {'a': 20, 'b': 20, 'c': 20}
+    assert calls == [['task a', 'task b', 'task c']]
+
+
+def test_failed_batches_are_requeued_before_settling():
+    attempts, recorder = [], Recorder(1)
+
+    def score_batch(titles):
+        attempts.append(titles)
+        if len(attempts) < 3:
+            raise AIUnavailable('busy')
+        return [50]
+
+    queue = XPScoringQueue(score_batch, recorder, workers=1, batch_wait=0, requeues=5, requeue_delay=0.01)
+    queue.submit('a', 'Write thesis')
+    assert recorder.done.wait(2)
+    assert recorder.saved == {'a': 50}
+    assert len(attempts) == 3
+
+
+def test_provisional_xp_is_saved_once_requeues_run_out():
+    recorder = Recorder(1)
+
+    def score_batch(titles):
+        raise AIUnavailable('down')
+
+    queue = XPScoringQueue(score_batch, recorder, workers=1, batch_wait=0, requeues=1, requeue_delay=0.01)
+    queue.submit('a', 'Anything')
+    assert recorder.done.wait(2)
+    assert recorder.saved == {'a': PROVISIONAL_XP}
+
+
+def test_a_requeue_into_a_full_queue_leaves_the_task_pending():
+    recorder = Recorder(1)
+    queue = XPScoringQueue(lambda titles: [5], recorder, workers=0, max_pending=1)
+    assert queue.submit('a', 'first')
+    assert not queue.submit('b', 'second')
+    queue._requeue('c', 'third', 1)
+    assert queue._queue.qsize() == 1
+    assert recorder.saved == {}
+
+
+def test_score_now_skips_failed_batches_for_the_next_run():
+    results = iter([[10, 20], AIUnavailable('down')])
+
+    def score_batch(titles):
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    recorder = Recorder(99)
+    queue = XPScoringQueue(score_batch, recorder, workers=0, max_batch=2)
+    assert queue.score_now([('a', 'One'), ('b', 'Two'), ('c', 'Three')]) == 2
+    assert recorder.saved == {'a': 10, 'b': 20}
+
+
+def test_rescoring_a_completed_task_corrects_the_owners_total(monolith, memory_db):
+    users, tasks = memory_db.collection('users'), memory_db.collection('tasks')
+    users.document('u1').set({'total_xp': 480, 'level': 1})
+    tasks.document('t1').set({'user_id': 'u1', 'status': 'Pending', 'xp': PROVISIONAL_XP, 'xp_pending': True})
+    monolith.finish_task(tasks.document('t1'), 'u1')
+    assert users.document('u1').get().to_dict()['total_xp'] == 490
+
+    monolith.save_task_xp('t1', 50)
+    monolith.save_task_xp('t1', 50)
+    assert users.document('u1').get().to_dict() == {'total_xp': 530, 'level': 2}
+    assert tasks.document('t1').get().to_dict()['xp_credited'] == 50
+
+
+def test_scoring_a_pending_task_leaves_the_total_alone(monolith, memory_db):
+    memory_db.collection('users').document('u1').set({'total_xp': 100})
+    memory_db.collection('tasks').document('t1').set({'user_id': 'u1', 'status': 'Pending', 'xp': PROVISIONAL_XP, 'xp_pending': True})
+    monolith.save_task_xp('t1', 100)
+    assert memory_db.collection('users').document('u1').get().to_dict()['total_xp'] == 100
+    assert memory_db.collection('tasks').document('t1').get().to_dict()['xp'] == 100
+
+
+def test_score_cache_matches_normalized_titles_per_prompt_version(tmp_path):
+    cache = ScoreCache(str(tmp_path / 'xp.sqlite'), prompt_version='v1')
+    cache.set('  Walk the   DOG ', 20)
+    assert cache.get('walk the dog') == 20
+    assert ScoreCache(str(tmp_path / 'xp.sqlite'), prompt_version='v2').get('walk the dog') is None
+
+
+def test_score_cache_survives_restarts_and_expires(tmp_path):
+    path = str(tmp_path / 'xp.sqlite')
+    ScoreCache(path, prompt_version='v1').set('Read a book', 10)
+    assert ScoreCache(path, prompt_version='v1', max_size=1).get('read a book') == 10
+
+    cache = ScoreCache(path, prompt_version='v1', ttl=-1)
+    cache.set('Stale', 5)
+    assert cache.get('stale') is None
+
+
+def test_cached_titles_skip_the_model(tmp_path):
+    cache, calls, recorder = ScoreCache(str(tmp_path / 'xp.sqlite'), prompt_version='v1'), [], Recorder(99)
+    cache.set('Known task', 50)
+
+    def score_batch(titles):
+        calls.append(titles)
+        return [5] * len(titles)
+
+    queue = XPScoringQueue(score_batch, recorder, cache=cache, workers=0)
+    assert queue.score_now([('a', 'Known  task'), ('b', 'New task')]) == 2
+    assert recorder.saved == {'a': 50, 'b': 5}
+    assert calls == [['new task']]
+    assert cache.get('new task') == 5
@@ -0,0 +1,95 @@
+import datetime
+import numpy as np
+
+METRICS = ('steps', 'calories')
+DTYPE = np.dtype('<u4')
+MONTH_DAYS = 31
+MAX_RANGE_DAYS = 731  # longest history one request may read (25 month docs)
+
+
+def parse_day(day):
+    return datetime.datetime.strptime(day, '%Y-%m-%d').date() if isinstance(day, str) else day
+
+
+def months_between(start, end):
+    month = start.replace(day=1)
+    while month <= end:
+        yield month
+        month = (month + datetime.timedelta(days=MONTH_DAYS + 1)).replace(day=1)
+
+
+class DailySeriesStore:
+    """Per-user daily metric arrays, packed as little-endian uint32 bytes in one doc per month.
+
+    users/{uid}/fit_months/{YYYY-MM} holds one 31-slot array per metric (0 = no data),
+    so a year of history is 12 small reads and never touches the profile document.
+    """
+
+    def __init__(self, db, collection='fit_months'):
+        self.db = db
+        self.collection = collection
+
+    def _months_ref(self, uid):
+        return self.db.collection('users').document(uid).collection(self.collection)
+
+    @staticmethod
+    def _unpack(data, metric):
+        raw = (data or {}).get(metric)
+        return np.frombuffer(raw, dtype=DTYPE).copy() if raw else np.zeros(MONTH_DAYS, dtype=DTYPE)
+
+    def merge(self, uid, days):
+        """Writes {'YYYY-MM-DD': {'steps': .., 'calories': ..}} into the month chunks it touches."""
+        by_month = {}
+        for day, totals in days.items():
+            by_month.setdefault(day[:7], []).append((int(day[8:10]) - 1, totals))
+        months_ref = self._months_ref(uid)
+        existing = {doc.id: doc.to_dict() for doc in self.db.get_all([months_ref.document(m) for m in by_month]) if doc.exists}
+        batch = self.db.batch()
+        for month, entries in by_month.items():
+            arrays = {metric: self._unpack(existing.get(month), metric) for metric in METRICS}
+            for index, totals in entries:
+                for metric in METRICS:
+                    arrays[metric][index] = max(0, int(totals.get(metric, 0)))
+            batch.set(months_ref.document(month), {metric: arrays[metric].tobytes() for metric in METRICS})
+        batch.commit()
+
+    def range(self, uid, start_day, end_day):
+        """Returns (dates, {metric: np.ndarray}) covering start_day..end_day inclusive."""
+        start, end = parse_day(start_day), parse_day(end_day)
+        months = list(months_between(start, end))
+        months_ref = self._months_ref(uid)
+        chunks = {doc.id: doc.to_dict() for doc in self.db.get_all([months_ref.document(m.strftime('%Y-%m')) for m in months]) if doc.exists}
+        dates = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+        month_lengths = [((m + datetime.timedelta(days=MONTH_DAYS + 1)).replace(day=1) - m).days for m in months]
+        series = {}
+        for metric in METRICS:
+            joined = np.concatenate([self._unpack(chunks.get(m.strftime('%Y-%m')), metric)[:n] for m, n in zip(months, month_lengths)])
+            series[metric] = joined[start.day - 1:start.day - 1 + len(dates)].astype(np.int64)
+        return dates, series
+
+    def daily(self, uid, start_day, end_day):
+        dates, series = self.range(uid, start_day, end_day)
+        return [{"date": d.isoformat(), **{metric: int(series[metric][i]) for metric in METRICS}} for i, d in enumerate(dates)]
+
+    def rollup(self, uid, start_day, end_day, period='week'):
+        """Totals and daily means per ISO week ('week') or calendar month ('month')."""
+        dates, series = self.range(uid, start_day, end_day)
+        labels = np.array([f"{d.isocalendar()[0]}-W{d.isocalendar()[1]:02d}" if period == 'week' else d.strftime('%Y-%m') for d in dates])
+        rollups = []
+        for label in dict.fromkeys(labels):
+            mask = labels == label
+            rollups.append({"period": str(label), "days": int(mask.sum()), **{
+                f"{metric}_{stat}": value for metric in METRICS
+                for stat, value in (("total", int(series[metric][mask].sum())), ("mean", round(float(series[metric][mask].mean()), 1)))
+            }})
+        return rollups
+
+    def rolling_mean(self, uid, start_day, end_day, metric='steps', window=7):
+        dates, series = self.range(uid, start_day, end_day)
+        values = series[metric].astype(float)
+        means = np.convolve(values, np.ones(window), 'valid') / window if len(values) >= window else np.array([])
+        return [{"date": d.isoformat(), "mean": round(float(m), 1)} for d, m in zip(dates[window - 1:], means)]
+
+    def clear(self, uid):
+        for doc in self._months_ref(uid).select([]).stream():
+            doc.reference.delete()
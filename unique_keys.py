@@ -0,0 +1,153 @@
+import os
+from urllib.parse import quote
+
+# key -> (index collection, field on the user doc)
+INDEXES = {
+    'friend_code': ('friend_codes', 'friend_id'),
+    'username': ('usernames', 'username'),
+    'email': ('emails', 'email'),
+}
+BATCH_LIMIT = 500
+# Query users by profile field when the index misses; turn off once backfill-unique-keys has run.
+LEGACY_LOOKUP = os.getenv('UNIQUE_KEYS_LEGACY_LOOKUP', '1').lower() in ('1', 'true', 'yes')
+
+
+class KeyTaken(Exception):
+    def __init__(self, key, value):
+        super().__init__(f"{key} '{value}' is already taken")
+        self.key = key
+        self.value = value
+
+
+def normalize(key, value):
+    value = (value or '').strip()
+    return value.upper() if key == 'friend_code' else value.lower()
+
+
+def doc_id(key, value):
+    """Index doc id for a value: URL-quoted, with the ids Firestore reserves ('.', '..', '__x__') escaped too."""
+    escaped = quote(normalize(key, value), safe='@.+-_')
+    if escaped in ('.', '..') or (escaped.startswith('__') and escaped.endswith('__')):
+        escaped = escaped.replace('.', '%2E').replace('_', '%5F')
+    return escaped
+
+
+class UniqueKeys:
+    """Reservation documents ({index}/{value} -> {'uid': ...}) that make friend codes, usernames
+    and emails unique and turn lookups into single-document reads.
+
+    Keys are claimed in the same transaction that writes the user doc, so two signups can
+    never hold the same value. Until `flask backfill-unique-keys` has run, `legacy_lookup`
+    finds users created before the index existed by querying their profile field when the
+    index has no entry, and claims the key for them. That costs a query on every miss, so
+    set UNIQUE_KEYS_LEGACY_LOOKUP=0 once the backfill is done.
+    """
+
+    def __init__(self, db, attempts=5, legacy_lookup=LEGACY_LOOKUP):
+        self.db = db
+        self.attempts = attempts
+        self.legacy_lookup = legacy_lookup
+
+    def _ref(self, key, value):
+        return self.db.collection(INDEXES[key][0]).document(doc_id(key, value))
+
+    def lookup(self, key, value):
+        """The uid holding `value`, or None."""
+        if not normalize(key, value):
+            return None
+        doc = self._ref(key, value).get()
+        if doc.exists:
+            return (doc.to_dict() or {}).get('uid')
+        return self._legacy_owner(key, value) if self.legacy_lookup else None
+
+    def _legacy_owner(self, key, value):
+        """Falls back to the users collection for accounts that predate the index, claiming the key on a hit."""
+        from google.api_core.exceptions import AlreadyExists
+        from google.cloud import firestore
+        field, candidates = INDEXES[key][1], list(dict.fromkeys([value.strip(), normalize(key, value)]))
+        docs = list(self.db.collection('users').where(field, 'in', candidates).select([]).limit(1).stream())
+        if not docs:
+            return None
+        try:
+            self._ref(key, value).create({'uid': docs[0].id, 'created_at': firestore.SERVER_TIMESTAMP})
+        except AlreadyExists:
+            return self.lookup(key, value)  # claimed concurrently; the index doc wins
+        return docs[0].id
+
+    def create_user(self, user_ref, data, keys=None, friend_code=None):
+        """Writes the user doc and claims `keys` ({key: value}) atomically; raises KeyTaken on a collision.
+
+        With a `friend_code` generator a fresh code is claimed as well, retrying on collision.
+        """
+        keys = {k: v for k, v in (keys or {}).items() if normalize(k, v)}
+        for key, value in keys.items():
+            owner = self.lookup(key, value)
+            if owner is not None and owner != user_ref.id:
+                raise KeyTaken(key, value)
+        for attempt in range(self.attempts if friend_code else 1):
+            claim = dict(keys, friend_code=friend_code()) if friend_code else keys
+            try:
+                self._claim(self.db.transaction(), user_ref, {**data, **self._fields(claim)}, claim)
+                return claim.get('friend_code')
+            except KeyTaken as e:
+                if e.key != 'friend_code' or attempt == self.attempts - 1:
+                    raise
+
+    @staticmethod
+    def _fields(claim):
+        return {INDEXES[key][1]: value for key, value in claim.items()}
+
+    def _claim(self, transaction, user_ref, data, claim):
+        from google.cloud import firestore
+        refs = {key: self._ref(key, value) for key, value in claim.items()}
+
+        @firestore.transactional
+        def run(transaction):
+            held = {doc.reference.path: doc for doc in transaction.get_all(list(refs.values()))}
+            for key, ref in refs.items():
+                doc = held.get(ref.path)
+                if doc is not None and doc.exists and (doc.to_dict() or {}).get('uid') != user_ref.id:
+                    raise KeyTaken(key, claim[key])
+            for ref in refs.values():
+                transaction.set(ref, {'uid': user_ref.id, 'created_at': firestore.SERVER_TIMESTAMP})
+            transaction.set(user_ref, data, merge=True)
+
+        run(transaction)
+
+    def release(self, key, value, uid):
+        """Frees a key held by uid (e.g. after a username change)."""
+        if self.lookup(key, value) == uid:
+            self._ref(key, value).delete()
+
+    def backfill(self, keys=tuple(INDEXES)):
+        """Claims the keys of every existing user; returns (created, conflicts) where conflicts lists
+        (key, value, uid) for values already held by another user."""
+        from google.cloud import firestore
+        fields = [INDEXES[key][1] for key in keys]
+        created, conflicts, pending = 0, [], []
+
+        def flush():
+            nonlocal created
+            held = {doc.reference.path: doc for doc in self.db.get_all([ref for ref, _, _, _ in pending]) if doc.exists}
+            batch, claimed = self.db.batch(), {}
+            for ref, key, value, uid in pending:
+                owner = (held[ref.path].to_dict() or {}).get('uid') if ref.path in held else claimed.get(ref.path)
+                if owner is None:
+                    batch.set(ref, {'uid': uid, 'created_at': firestore.SERVER_TIMESTAMP})
+                    claimed[ref.path] = uid
+                    created += 1
+                elif owner != uid:
+                    conflicts.append((key, value, uid))
+            batch.commit()
+            pending.clear()
+
+        for doc in self.db.collection('users').select(fields).stream():
+            data = doc.to_dict() or {}
+            for key in keys:
+                if normalize(key, data.get(INDEXES[key][1])):
+                    pending.append((self._ref(key, data[INDEXES[key][1]]), key, data[INDEXES[key][1]], doc.id))
+            if len(pending) >= BATCH_LIMIT - len(keys):
+                flush()
+        if pending:
+            flush()
+        return created, conflicts
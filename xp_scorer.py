@@ -0,0 +1,181 @@
+import hashlib
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from ai_client import AIUnavailable
+
+XP_VALUES = (5, 10, 20, 50, 100)
+PROVISIONAL_XP = 10
+
+
+def parse_scores(text, count):
+    """Pulls one allowed XP value per task out of a model reply; None where the reply has no usable value."""
+    numbers = [int(found[-1]) for found in (re.findall(r'\d+', line) for line in text.splitlines()) if found]
+    scores = [n if n in XP_VALUES else None for n in numbers[:count]]
+    return scores + [None] * (count - len(scores))
+
+
+def normalize_title(title):
+    return " ".join((title or "").lower().split())
+
+
+class ScoreCache:
+    """Two-tier XP cache keyed on the normalized title and prompt version: an LRU dict in front of SQLite."""
+
+    def __init__(self, path, prompt_version, max_size=2048, ttl=30 * 86400):
+        self.prompt_version = prompt_version
+        self.max_size = max_size
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS xp_scores (key TEXT PRIMARY KEY, xp INTEGER NOT NULL, expires_at REAL NOT NULL)")
+        self._db.execute("DELETE FROM xp_scores WHERE expires_at < ?", (time.time(),))
+        self._db.commit()
+
+    def key(self, title):
+        return hashlib.sha256(f"{self.prompt_version}:{normalize_title(title)}".encode()).hexdigest()
+
+    def _remember(self, key, xp, expires_at):
+        self._memory[key] = (xp, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def get(self, title):
+        key, now = self.key(title), time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[1] > now:
+                self._memory.move_to_end(key)
+                return entry[0]
+            row = self._db.execute("SELECT xp, expires_at FROM xp_scores WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+            if row:
+                self._remember(key, *row)
+                return row[0]
+        return None
+
+    def set(self, title, xp):
+        key, expires_at = self.key(title), time.time() + self.ttl
+        with self._lock:
+            self._remember(key, xp, expires_at)
+            self._db.execute("INSERT OR REPLACE INTO xp_scores (key, xp, expires_at) VALUES (?, ?, ?)", (key, xp, expires_at))
+            self._db.commit()
+
+
+class XPScoringQueue:
+    """Scores task titles in the background, several titles per model call.
+
+    score_batch(titles) -> list of XP values, on_scored(task_id, xp) persists one result.
+    Successful scores are written to the optional ScoreCache. When scoring fails outright the
+    tasks are queued again after a growing delay (up to `requeues` times) and keep their
+    provisional XP meanwhile, instead of being settled at PROVISIONAL_XP straight away; a
+    requeue that finds the queue full leaves the task pending for the next score_now() run.
+
+    The workers and requeue timers are daemon threads, so they need a long-lived process; on a
+    serverless host (vercel.json) they stop with the invocation and queued tasks stay pending.
+    There, run score_now() over the pending tasks on a schedule (app.py: rescore-pending-xp).
+    """
+
+    def __init__(self, score_batch, on_scored, cache=None, workers=2, max_batch=10, batch_wait=0.25, max_pending=500, requeues=5, requeue_delay=30):
+        self.score_batch = score_batch
+        self.on_scored = on_scored
+        self.cache = cache
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.requeues = requeues
+        self.requeue_delay = requeue_delay
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._workers = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, task_id, title):
+        """Queues a task for scoring; returns False when the queue is full and the provisional XP stays."""
+        try:
+            self._queue.put_nowait((task_id, title, 0))
+            return True
+        except queue.Full:
+            return False
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _score(self, titles):
+        """One score_batch call; retries and backoff belong to the AI client. None means requeue."""
+        try:
+            return self.score_batch(titles)
+        except AIUnavailable as e:
+            print(f"⚠️ XP scoring deferred: {e}")
+        except Exception as e:
+            print(f"⚠️ XP scoring failed: {e}")
+        return None
+
+    def _requeue(self, task_id, title, requeues):
+        try:
+            self._queue.put_nowait((task_id, title, requeues))
+        except queue.Full:
+            print(f"⚠️ XP queue full; task {task_id} stays pending for the next rescore")
+
+    def _lookup(self, titles):
+        """XP per normalized title from the cache, then one score_batch call for the rest.
+        Returns (known, scores); scores is None when that call failed."""
+        known = {normalize_title(title): self.cache.get(title) if self.cache else None for title in titles}
+        missing = [title for title, xp in known.items() if xp is None]
+        scores = self._score(missing) if missing else []
+        for title, xp in zip(missing, scores or []):
+            known[title] = xp
+            if self.cache and xp is not None:
+                self.cache.set(title, xp)
+        return known, scores
+
+    def _save(self, task_id, xp):
+        try:
+            self.on_scored(task_id, xp)
+            return True
+        except Exception as e:
+            print(f"⚠️ Could not save XP for task {task_id}: {e}")
+            return False
+
+    def score_now(self, tasks):
+        """Scores (task_id, title) pairs in the calling thread, max_batch titles per call, for hosts
+        where the workers don't outlive a request. Tasks whose batch failed are left pending for
+        the next run; returns how many were saved."""
+        tasks, saved = list(tasks), 0
+        for start in range(0, len(tasks), self.max_batch):
+            batch = tasks[start:start + self.max_batch]
+            known, scores = self._lookup([title for _, title in batch])
+            for task_id, title in batch:
+                xp = known[normalize_title(title)]
+                if xp is None and scores is None:
+                    continue
+                saved += self._save(task_id, xp or PROVISIONAL_XP)
+        return saved
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            known, scores = self._lookup([title for _, title, _ in batch])
+            for task_id, title, requeues in batch:
+                xp = known[normalize_title(title)]
+                if xp is None and scores is None and requeues < self.requeues:
+                    timer = threading.Timer(self.requeue_delay * 2 ** requeues, self._requeue, (task_id, title, requeues + 1))
+                    timer.daemon = True
+                    timer.start()
+                    continue
+                self._save(task_id, xp or PROVISIONAL_XP)
+            for _ in batch:
+                self._queue.task_done()